@@ -1,28 +1,52 @@
+import time
+_inicio_script = time.perf_counter()
 import streamlit as st
-import pandas as pd
-import sqlite3
 import os
+from arranque import reportar_inicio
+from almacen_sqlite import (AlmacenSQLite, huella_archivos, ejecutar_con_limite, exportar_consulta,
+                            MAX_FILAS_RESULTADO, TIEMPO_MAX_CONSULTA_S)
+# pandas y la lectura de libros (ingesta) se importan al procesar archivos, no en la página vacía
+
+# Filas por página del resultado y carpeta de las exportaciones completas
+FILAS_POR_PAGINA = 100
+DIRECTORIO_EXPORTACIONES = os.environ.get("AUDITORIAS_EXPORTACIONES_DIR", "exportaciones")
+MAX_MB_DESCARGA = 200 # Exportaciones más grandes solo quedan en disco (límite de mensajes de Streamlit)
+
+# Columnas que se usan seguido para filtrar o cruzar: tienen índice en datos_unificados
+COLUMNAS_INDICE = ['Nombre de Técnico/Copiar el del Wfm', 'Rut / tecnico', 'Empresa', 'Fecha', 'Fuente']
 
 def cargar_todas_las_hojas(file, nombre_archivo):
-    xl = pd.ExcelFile(file)
-    hojas = xl.sheet_names
+    from ingesta import iterar_hojas
+    avisos = []
     frames = []
 
-    for hoja in hojas:
-        try:
-            df = xl.parse(hoja)
-            df.columns = df.columns.map(str)  # Asegura nombres de columnas como strings
-            df['Fuente'] = f"{nombre_archivo} - {hoja}"
-            frames.append(df)
-        except Exception as e:
-            st.warning(f"⚠️ No se pudo procesar la hoja '{hoja}': {e}")
+    # Las hojas se parsean en paralelo (pool de procesos) y llegan en el orden del libro
+    for hoja, df in iterar_hojas(file, avisos):
+        df.columns = df.columns.map(str)  # Asegura nombres de columnas como strings
+        df['Fuente'] = f"{nombre_archivo} - {hoja}"
+        frames.append(df)
+
+    for aviso in avisos:
+        st.warning(f"⚠️ {aviso}")
     return frames
 
-def unir_y_cargar_en_sqlite(lista_dfs):
-    df_unificado = pd.concat(lista_dfs, ignore_index=True, sort=False).fillna("")
-    conn = sqlite3.connect(":memory:")  # También puedes usar "data.db" si quieres persistencia
-    df_unificado.to_sql("datos_unificados", conn, index=False, if_exists="replace")
-    return conn
+def unir_y_cargar_en_sqlite(lista_dfs, huella):
+    import pandas as pd
+    # Sin fillna(""): los vacíos quedan como NULL y cada columna conserva su tipo (fechas, números)
+    df_unificado = pd.concat(lista_dfs, ignore_index=True, sort=False)
+    almacen.cargar(huella, df_unificado, COLUMNAS_INDICE)
+
+def huella_subidas(archivo_v1, archivo_v2):
+    # La huella se calcula una vez por par de archivos subidos; los reruns la leen de session_state
+    ids = (archivo_v1.file_id, archivo_v2.file_id)
+    guardada = st.session_state.get('huella_cra')
+    if guardada is None or guardada[0] != ids:
+        guardada = (ids, huella_archivos(archivo_v1.getvalue(), archivo_v2.getvalue()))
+        st.session_state['huella_cra'] = guardada
+    return guardada[1]
+
+# Bases SQLite en disco por huella de V1+V2: se cargan una vez y se reutilizan entre reruns y sesiones
+almacen = AlmacenSQLite()
 
 # Streamlit app
 st.title("Unión de Archivos Excel para Consultas SQL")
@@ -31,19 +55,79 @@ archivo_v1 = st.file_uploader("📂 Cargar archivo V1", type=["xlsx"])
 archivo_v2 = st.file_uploader("📂 Cargar archivo V2", type=["xlsx"])
 
 if archivo_v1 and archivo_v2:
-    with st.spinner("Procesando archivos..."):
-        dfs_v1 = cargar_todas_las_hojas(archivo_v1, "V1")
-        dfs_v2 = cargar_todas_las_hojas(archivo_v2, "V2")
-        conn_sqlite = unir_y_cargar_en_sqlite(dfs_v1 + dfs_v2)
-        st.success("✅ Archivos unidos y cargados en base SQLite")
-
-        # Consulta libre
-        consulta = st.text_area("🧠 Escribe tu consulta SQL sobre `datos_unificados`:", 
-                                "SELECT * FROM datos_unificados LIMIT 100")
-        if st.button("🔍 Ejecutar consulta"):
-            try:
-                resultado = pd.read_sql_query(consulta, conn_sqlite)
-                st.dataframe(resultado)
-            except Exception as e:
-                st.error(f"❌ Error en consulta: {e}")
+    huella = huella_subidas(archivo_v1, archivo_v2)
+    # conectar devuelve None si la base no existe, también si otra sesión la eliminó al recortar el almacén
+    conn_sqlite = almacen.conectar(huella)
+    if conn_sqlite is None:
+        with st.spinner("Procesando archivos..."):
+            dfs_v1 = cargar_todas_las_hojas(archivo_v1, "V1")
+            dfs_v2 = cargar_todas_las_hojas(archivo_v2, "V2")
+            unir_y_cargar_en_sqlite(dfs_v1 + dfs_v2, huella)
+        conn_sqlite = almacen.conectar(huella)
+        if conn_sqlite is not None:
+            st.success("✅ Archivos unidos y cargados en base SQLite")
+    else:
+        st.success("✅ Archivos ya cargados: se reutiliza su base SQLite")
+
+    if conn_sqlite is None:
+        st.error("❌ La base SQLite se eliminó mientras se cargaba (el almacén está al límite de su tamaño). Vuelve a intentarlo.")
+    else:
+        try:
+            # Consulta libre
+            consulta = st.text_area("🧠 Escribe tu consulta SQL sobre `datos_unificados`:", 
+                                    "SELECT * FROM datos_unificados LIMIT 100")
+            tiempo_max = st.number_input("⏱️ Tiempo máximo de la consulta (segundos)", min_value=1.0,
+                                         value=TIEMPO_MAX_CONSULTA_S, step=5.0)
+            if st.button("🔍 Ejecutar consulta"):
+                try:
+                    # Se leen a lo sumo MAX_FILAS_RESULTADO filas (fetchmany por lotes); el resto queda para la exportación
+                    columnas, filas, truncado = ejecutar_con_limite(conn_sqlite, consulta, MAX_FILAS_RESULTADO, tiempo_max)
+                    st.session_state['resultado_cra'] = {
+                        'huella': huella, 'consulta': consulta,
+                        'columnas': columnas, 'filas': filas, 'truncado': truncado,
+                    }
+                    st.session_state['pagina_cra'] = 1
+                except Exception as e:
+                    st.session_state.pop('resultado_cra', None)
+                    st.error(f"❌ Error en consulta: {e}")
+
+            # El resultado queda en session_state: cambiar de página no vuelve a ejecutar la consulta
+            resultado = st.session_state.get('resultado_cra')
+            if resultado is not None and resultado['huella'] == huella:
+                if not resultado['columnas']:
+                    st.info("La consulta no devuelve filas.")
+                else:
+                    import pandas as pd
+                    filas = resultado['filas']
+                    total_paginas = max(1, -(-len(filas) // FILAS_POR_PAGINA))
+                    if resultado['truncado']:
+                        st.warning(f"⚠️ El resultado tiene más de {MAX_FILAS_RESULTADO:,} filas: se muestran las primeras {MAX_FILAS_RESULTADO:,}. Usa la exportación para obtenerlo completo.")
+                    pagina = st.number_input(f"Página (de {total_paginas:,}; {len(filas):,} filas)", min_value=1,
+                                             max_value=total_paginas, step=1, key='pagina_cra')
+                    inicio = (pagina - 1) * FILAS_POR_PAGINA
+                    pagina_df = pd.DataFrame.from_records(filas[inicio:inicio + FILAS_POR_PAGINA], columns=resultado['columnas'])
+                    # Columnas con números y textos mezclados (como Kilometraje) se muestran como texto
+                    for columna in pagina_df.columns[pagina_df.dtypes == object]:
+                        if len({type(valor) for valor in pagina_df[columna].dropna()}) > 1:
+                            pagina_df[columna] = pagina_df[columna].astype("string")
+                    st.dataframe(pagina_df)
+
+                    # Exportación del resultado completo, sin límite de filas: se escribe en disco lote a lote
+                    col_formato, col_exportar = st.columns([1, 2])
+                    formato = col_formato.radio("Formato", ["csv", "parquet"], horizontal=True)
+                    if col_exportar.button("💾 Exportar resultado completo"):
+                        os.makedirs(DIRECTORIO_EXPORTACIONES, exist_ok=True)
+                        ruta = os.path.join(DIRECTORIO_EXPORTACIONES, f"consulta_{time.strftime('%Y%m%d_%H%M%S')}.{formato}")
+                        try:
+                            with st.spinner("Exportando..."):
+                                total = exportar_consulta(conn_sqlite, resultado['consulta'], ruta, formato, tiempo_max)
+                            st.success(f"✅ {total:,} filas exportadas en **{os.path.abspath(ruta)}**")
+                            if os.path.getsize(ruta) <= MAX_MB_DESCARGA * 1024 * 1024:
+                                with open(ruta, "rb") as f:
+                                    st.download_button("⬇️ Descargar", f.read(), file_name=os.path.basename(ruta))
+                        except Exception as e:
+                            st.error(f"❌ Error al exportar: {e}")
+        finally:
+            conn_sqlite.close()
 
+reportar_inicio(st, _inicio_script, "CRA_consulta.py")
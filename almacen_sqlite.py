@@ -0,0 +1,384 @@
+import csv
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager, suppress
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+
+# Carpeta y tamaño máximo del almacén (configurables por variables de entorno)
+DIRECTORIO_ALMACEN = os.environ.get(
+    "AUDITORIAS_ALMACEN_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_auditorias", "sqlite"),
+)
+LIMITE_ALMACEN_MB = float(os.environ.get("AUDITORIAS_ALMACEN_MAX_MB", "1024"))
+EDAD_MAX_TEMPORAL_S = 10 * 60 # Una base .tmp más antigua quedó de una carga interrumpida
+SUFIJOS_TEMPORALES = (".tmp", ".tmp-wal", ".tmp-shm", ".tmp-journal")
+
+# Versión del formato de las bases. Cambiarla invalida las ya guardadas.
+VERSION_ALMACEN = 2
+
+TABLA = "datos_unificados"
+FILAS_POR_LOTE = 5000 # Filas por llamada a executemany / fetchmany
+
+# Límites de las consultas libres (configurables por variables de entorno)
+MAX_FILAS_RESULTADO = int(os.environ.get("AUDITORIAS_MAX_FILAS_CONSULTA", "10000"))
+TIEMPO_MAX_CONSULTA_S = float(os.environ.get("AUDITORIAS_TIEMPO_MAX_CONSULTA_S", "30"))
+INSTRUCCIONES_POR_CONTROL = 10000 # Cada cuántas instrucciones de SQLite se revisa el tiempo
+
+
+class TiempoAgotado(Exception):
+    """La consulta superó su tiempo máximo y SQLite la interrumpió."""
+
+
+def huella_archivos(*contenidos):
+    """Hash SHA-256 (hex) de varios archivos en orden: el mismo par V1/V2 da siempre la misma base."""
+    huellas = [hashlib.sha256(contenido).hexdigest() for contenido in contenidos]
+    return hashlib.sha256("|".join(huellas).encode()).hexdigest()
+
+
+def identificador(nombre):
+    """Nombre de tabla o columna entre comillas dobles, para usarlo tal cual en SQL."""
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _categoria(valor):
+    """Categoría de tipo de un valor no nulo de una columna object."""
+    if hasattr(valor, "item"): # Escalares de numpy
+        valor = valor.item()
+    if isinstance(valor, (bool, int)):
+        return "INTEGER"
+    if isinstance(valor, float):
+        return "INTEGER" if valor.is_integer() else "REAL"
+    if isinstance(valor, (datetime, date)):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def inferir_tipo(serie):
+    """
+    Tipo declarado de una columna: INTEGER, REAL, TIMESTAMP o TEXT.
+
+    Las columnas numéricas y de fecha se toman de su dtype (un float sin decimales es INTEGER). En una
+    columna object manda la categoría de la mayoría de sus valores: en una columna mayormente numérica
+    con algunos textos (como Kilometraje Camioneta), SQLite guarda los números como números y los
+    textos que no lo son quedan como texto.
+    """
+    kind = serie.dtype.kind
+    if kind in "iub":
+        return "INTEGER"
+    if kind == "f":
+        valores = serie.dropna()
+        return "INTEGER" if valores.empty or (valores == valores.round()).all() else "REAL"
+    if kind == "M":
+        return "TIMESTAMP"
+    conteo = {}
+    for valor in serie.dropna().tolist():
+        categoria = _categoria(valor)
+        conteo[categoria] = conteo.get(categoria, 0) + 1
+    if not conteo:
+        return "TEXT"
+    if conteo.get("REAL") and conteo.get("INTEGER"):
+        conteo["REAL"] += conteo.pop("INTEGER") # Enteros y decimales mezclados: la columna es REAL
+    return max(conteo, key=conteo.get)
+
+
+def _es_nulo(valor):
+    """True para None, NaN, NaT y pd.NA (los únicos valores distintos de sí mismos o sin comparación)."""
+    try:
+        return valor is None or bool(valor != valor)
+    except TypeError: # pd.NA no tiene valor de verdad
+        return True
+
+
+def _valor_sqlite(valor):
+    """Convierte un valor de pandas/numpy a uno que sqlite3 sabe guardar (los nulos quedan como NULL)."""
+    if _es_nulo(valor):
+        return None
+    if isinstance(valor, datetime):
+        return valor.isoformat(" ")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if hasattr(valor, "item"): # Escalares de numpy
+        return valor.item()
+    return valor
+
+
+def _valores_columna(serie):
+    """Valores de una columna listos para executemany."""
+    if serie.dtype.kind in "iubf":
+        return serie.tolist() # tolist ya entrega int/float/bool de Python (SQLite guarda NaN como NULL)
+    return [_valor_sqlite(valor) for valor in serie.tolist()]
+
+
+class AlmacenSQLite:
+    """
+    Bases SQLite en disco con la tabla datos_unificados, direccionadas por la huella de los archivos.
+
+    Cada base es un archivo '<huella>-v<version>.sqlite' que se carga una sola vez (en una transacción,
+    en modo WAL) y luego se reutiliza entre reruns, sesiones y reinicios del servidor. Al superar el
+    límite se eliminan las menos usadas (LRU por mtime), como en CacheParquet.
+    """
+
+    def __init__(self, directorio=None, limite_mb=None):
+        self.directorio = directorio or DIRECTORIO_ALMACEN
+        limite_mb = LIMITE_ALMACEN_MB if limite_mb is None else limite_mb
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+
+    def ruta(self, huella):
+        return os.path.join(self.directorio, f"{huella}-v{VERSION_ALMACEN}.sqlite")
+
+    def existe(self, huella):
+        return os.path.exists(self.ruta(huella))
+
+    def conectar(self, huella):
+        """
+        Conexión de solo lectura a la base de la huella (None si no existe).
+
+        La base es compartida entre sesiones, así que las consultas libres no pueden modificarla.
+        """
+        ruta = os.path.abspath(self.ruta(huella))
+        try:
+            # mode=rw no crea la base si falta (otra sesión pudo eliminarla al recortar el almacén)
+            conn = sqlite3.connect(f"{Path(ruta).as_uri()}?mode=rw", uri=True, check_same_thread=False)
+        except sqlite3.OperationalError:
+            return None
+        conn.execute("PRAGMA query_only = ON")
+        # Marcar la base como usada recientemente para el orden LRU
+        with suppress(FileNotFoundError):
+            os.utime(ruta, None)
+        return conn
+
+    def cargar(self, huella, df, columnas_indice=()):
+        """
+        Crea la base de la huella con el contenido de df y devuelve su ruta.
+
+        Cada columna de columnas_indice presente en df recibe un índice; al final se ejecuta ANALYZE
+        para que el planificador de consultas sepa cuándo conviene usarlos.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self.ruta(huella)
+        # Nombre temporal único: las sesiones de Streamlit son hilos del mismo proceso y dos pueden
+        # cargar la misma huella a la vez
+        fd, ruta_temporal = tempfile.mkstemp(dir=self.directorio, prefix=f"{huella}-", suffix=".tmp")
+        os.close(fd)
+        try:
+            self._escribir(ruta_temporal, df, [columna for columna in columnas_indice if columna in df.columns])
+            os.replace(ruta_temporal, ruta) # Escritura atómica: nunca se abre una base a medias
+        except Exception:
+            self._eliminar(ruta_temporal)
+            raise
+        self._recortar()
+        return ruta
+
+    def _escribir(self, ruta, df, columnas_indice):
+        columnas = [identificador(columna) for columna in df.columns]
+        definicion = ", ".join(f"{columna} {inferir_tipo(df[nombre])}" for columna, nombre in zip(columnas, df.columns))
+        insertar = f"INSERT INTO {identificador(TABLA)} VALUES ({', '.join('?' * len(columnas))})"
+        filas = zip(*(_valores_columna(df[columna]) for columna in df.columns))
+
+        conn = sqlite3.connect(ruta, isolation_level=None) # Transacción manejada a mano
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("BEGIN")
+            conn.execute(f"CREATE TABLE {identificador(TABLA)} ({definicion})")
+            while lote := list(islice(filas, FILAS_POR_LOTE)):
+                conn.executemany(insertar, lote)
+            # Los índices se crean con la tabla ya llena: es más rápido que mantenerlos fila a fila
+            for i, columna in enumerate(columnas_indice):
+                conn.execute(f"CREATE INDEX {identificador(f'idx_{TABLA}_{i}')} ON {identificador(TABLA)} ({identificador(columna)})")
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)") # Todo queda en el archivo principal antes de moverlo
+        finally:
+            conn.close()
+
+    def _eliminar(self, ruta):
+        for sufijo in ("", "-wal", "-shm"):
+            with suppress(OSError): # Ya eliminada, o en Windows abierta por otra sesión: queda para el próximo recorte
+                os.remove(ruta + sufijo)
+
+    def _recortar(self):
+        """
+        Elimina bases de otras versiones y, si se supera el límite, las menos usadas.
+
+        Las bases temporales de más de EDAD_MAX_TEMPORAL_S (cargas interrumpidas) se eliminan; las
+        recientes son cargas en curso de otra sesión: no se tocan, pero cuentan para el límite.
+        """
+        sufijo = f"-v{VERSION_ALMACEN}.sqlite"
+        entradas = []
+        en_curso = 0
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            with suppress(FileNotFoundError): # Otra sesión pudo borrarla en paralelo
+                if nombre.endswith(SUFIJOS_TEMPORALES):
+                    info = os.stat(ruta)
+                    if time.time() - info.st_mtime > EDAD_MAX_TEMPORAL_S:
+                        with suppress(OSError):
+                            os.remove(ruta)
+                    else:
+                        en_curso += info.st_size
+                    continue
+                if not nombre.endswith(".sqlite"):
+                    continue
+                if not nombre.endswith(sufijo):
+                    self._eliminar(ruta) # Formato obsoleto
+                    continue
+                info = os.stat(ruta)
+                entradas.append((info.st_mtime, info.st_size, ruta))
+
+        total = en_curso + sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.limite_bytes:
+                break
+            self._eliminar(ruta)
+            total -= tamano
+
+
+@contextmanager
+def limite_tiempo(conn, segundos):
+    """
+    Interrumpe lo que conn esté ejecutando si pasan más de `segundos` (progress handler de SQLite).
+
+    El control corre dentro de SQLite mientras avanza la consulta, así una consulta descontrolada
+    termina con TiempoAgotado en vez de bloquear el servidor.
+    """
+    limite = time.monotonic() + segundos
+    conn.set_progress_handler(lambda: time.monotonic() > limite, INSTRUCCIONES_POR_CONTROL)
+    try:
+        yield
+    except sqlite3.OperationalError as e:
+        if str(e) == "interrupted":
+            raise TiempoAgotado(f"La consulta superó el tiempo máximo de {segundos:g} s y fue cancelada.") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def ejecutar_con_limite(conn, consulta, limite_filas=None, tiempo_max_s=None):
+    """
+    Ejecuta la consulta leyendo con fetchmany hasta limite_filas filas.
+
+    Devuelve (columnas, filas, truncado): truncado indica que el resultado tiene más filas que el
+    límite, que no se leyeron. Una sentencia sin resultado devuelve columnas vacías.
+    """
+    limite_filas = MAX_FILAS_RESULTADO if limite_filas is None else limite_filas
+    with limite_tiempo(conn, TIEMPO_MAX_CONSULTA_S if tiempo_max_s is None else tiempo_max_s):
+        cursor = conn.execute(consulta)
+        try:
+            if cursor.description is None:
+                return [], [], False
+            columnas = [descripcion[0] for descripcion in cursor.description]
+            filas = []
+            while len(filas) < limite_filas:
+                lote = cursor.fetchmany(min(FILAS_POR_LOTE, limite_filas - len(filas)))
+                if not lote:
+                    break
+                filas.extend(lote)
+            truncado = len(filas) == limite_filas and cursor.fetchone() is not None
+        finally:
+            cursor.close()
+    return columnas, filas, truncado
+
+
+class _ColumnaMixta(Exception):
+    """Un lote trae en una columna valores que no caben en el tipo Parquet elegido con el primero."""
+
+    def __init__(self, columna):
+        super().__init__(columna)
+        self.columna = columna
+
+
+def _tipo_arrow(valores):
+    """Tipo Arrow de una columna de resultado: int64 o float64 si solo tiene números, si no string."""
+    import pyarrow as pa
+    tipos = {type(valor) for valor in valores if valor is not None}
+    if tipos and tipos <= {int}:
+        return pa.int64()
+    if tipos and tipos <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+def _escribir_csv(cursor, ruta):
+    filas = 0
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow([descripcion[0] for descripcion in cursor.description])
+        while lote := cursor.fetchmany(FILAS_POR_LOTE):
+            escritor.writerows(lote)
+            filas += len(lote)
+    return filas
+
+
+def _escribir_parquet(cursor, ruta, como_texto):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    esquema = escritor = None
+    filas = 0
+    try:
+        while lote := cursor.fetchmany(FILAS_POR_LOTE):
+            valores = list(zip(*lote))
+            if escritor is None:
+                # El tipo de cada columna se fija con el primer lote
+                esquema = pa.schema([
+                    (columna, pa.string() if columna in como_texto else _tipo_arrow(valores_columna))
+                    for columna, valores_columna in zip(columnas, valores)
+                ])
+                escritor = pq.ParquetWriter(ruta, esquema)
+            arreglos = []
+            for columna, tipo, valores_columna in zip(columnas, esquema.types, valores):
+                if tipo == pa.string():
+                    valores_columna = [None if valor is None else str(valor) for valor in valores_columna]
+                try:
+                    arreglos.append(pa.array(valores_columna, type=tipo))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    raise _ColumnaMixta(columna)
+            escritor.write_table(pa.Table.from_arrays(arreglos, schema=esquema))
+            filas += len(lote)
+        if escritor is None: # Resultado vacío: solo el esquema
+            pq.write_table(pa.table({columna: pa.array([], type=pa.string()) for columna in columnas}), ruta)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return filas
+
+
+def exportar_consulta(conn, consulta, ruta, formato, tiempo_max_s=None):
+    """
+    Escribe el resultado completo de la consulta en ruta ('csv' o 'parquet'), lote a lote con fetchmany.
+
+    En memoria nunca hay más de un lote. En Parquet, si una columna que parecía numérica trae texto
+    más adelante, se vuelve a exportar con esa columna como texto. Devuelve la cantidad de filas.
+    """
+    fd, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".", prefix=os.path.basename(ruta) + ".", suffix=".tmp")
+    os.close(fd)
+    como_texto = set()
+    try:
+        while True:
+            with limite_tiempo(conn, TIEMPO_MAX_CONSULTA_S if tiempo_max_s is None else tiempo_max_s):
+                cursor = conn.execute(consulta)
+                try:
+                    if cursor.description is None:
+                        raise ValueError("La consulta no devuelve filas para exportar.")
+                    if formato == "csv":
+                        filas = _escribir_csv(cursor, ruta_temporal)
+                    else:
+                        try:
+                            filas = _escribir_parquet(cursor, ruta_temporal, como_texto)
+                        except _ColumnaMixta as e:
+                            como_texto.add(e.columna)
+                            continue
+                finally:
+                    cursor.close()
+            os.replace(ruta_temporal, ruta)
+            return filas
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(ruta_temporal)
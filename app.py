@@ -1,23 +1,23 @@
-import pandas as pd
+import time
+_inicio_script = time.perf_counter() # Antes de cualquier import: mide el arranque completo del script
 import streamlit as st
-import plotly.express as px
-import unicodedata
-import io
 from datetime import date
-import traceback # Opcional: para debug de errores detallados
+from arranque import reportar_inicio
+# Los módulos pesados (pandas, plotly, pt, cálculo de secciones) se importan al usarlos por primera vez:
+# la página vacía, antes de subir un archivo, solo necesita streamlit.
 # Asegúrate de que xlsxwriter esté instalado: pip install xlsxwriter openpyxl
-from pt import process_data
 
+# Columnas con filtro por igualdad en la Pestaña 1 (tienen índice invertido)
+columnas_filtro_tab1 = ['Nombre de Técnico/Copiar el del Wfm', 'Empresa', 'Tipo de Auditoria']
+# Columnas con búsqueda por subcadena en la Pestaña 1 (tienen índice de trigramas)
+columnas_busqueda_tab1 = ['Patente Camioneta', 'Número de Orden de Trabajo/ ID externo']
 
-# --- Función de Normalización ---
-def normalizar_texto(texto):
-    """Normaliza texto: elimina espacios, acentos, tildes y convierte a minúsculas."""
-    if isinstance(texto, str):
-        texto = str(texto).strip().lower() # Convertir explícitamente a string por seguridad
-        nfd_form = unicodedata.normalize('NFD', texto)
-        return ''.join(c for c in nfd_form if unicodedata.category(c) != 'Mn')
-    # Maneja casos donde el input no sea string, como NaN o None
-    return '' # Devuelve string vacío si no es string para evitar errores en operaciones de string
+
+def valores_categoria(serie):
+    """Valores distintos (ordenados, como texto) de una columna, leídos del diccionario si es categórica."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return [str(valor) for valor in serie.cat.categories]
+    return sorted(serie.dropna().astype(str).unique().tolist())
 
 
 # --- Configuración inicial de la app ---
@@ -32,7 +32,6 @@ archivo = st.file_uploader("Sube el archivo Excel con los datos de auditoría",
 # --- Lógica de Carga y Preprocesamiento del Archivo ---
 # Solo cargamos y procesamos el archivo si se ha subido uno Y es diferente al que ya tenemos en session_state
 if archivo is not None:
-    # --- CORRECCIÓN AQUÍ: Usamos name y size para comparar si es un nuevo archivo ---
     # Verificamos si NO hay datos cargados, O si el nombre/tamaño del archivo subido
     # son diferentes a los que guardamos en session_state del archivo anterior.
     if 'data' not in st.session_state or \
@@ -41,101 +40,34 @@ if archivo is not None:
 
         st.info(f"Cargando y procesando archivo '{archivo.name}'...")
         try:
-            # Leer el archivo Excel
-            xls = pd.ExcelFile(archivo)
-            hojas = xls.sheet_names
-            # Cargar cada hoja y concatenar, permitiendo a pandas inferir tipos
-            df_list = []
-            for hoja in hojas:
-                try:
-                    df_list.append(xls.parse(hoja))
-                except Exception as e:
-                     st.warning(f"No se pudo leer la hoja '{hoja}': {e}")
-                     continue # Saltar a la siguiente hoja si falla
-
-            if df_list:
-                 data = pd.concat(df_list, ignore_index=True)
-                 
-            else:
-                 st.error("No se pudo cargar ninguna hoja del archivo Excel.")
-                 data = pd.DataFrame() # Crear DataFrame vacío si no se cargó nada
+            from ingesta import cargar_datos
+            from indices import construir_indices, construir_indices_trigramas
+            from ultima_auditoria import renovar_ultima_auditoria
+            from perfil_nulos import PerfilNulos
 
+            # Lectura + preparación general de datos. Si el mismo contenido ya se procesó
+            # (en esta u otra sesión, o antes de reiniciar el servidor), se lee desde la cache Parquet.
+            data, huella_datos, avisos = cargar_datos(archivo)
+            for aviso in avisos:
+                st.warning(aviso)
 
-            # --- Preparación General de Datos (Aplicar una sola vez al cargar) ---
             if not data.empty:
-                # Normalizar nombres de columnas (Esto ya lo tenías)
-                data.columns = data.columns.str.strip()
-
-                # Normalizar columnas clave que se usarán en varios análisis
-                cols_to_normalize_str = ['Nombre de Técnico/Copiar el del Wfm', 'Información del Auditor']
-                for col in cols_to_normalize_str:
-                    if col in data.columns:
-                         # Rellenar posibles NaN antes de aplicar la normalización
-                         # La función normalizar_texto ahora maneja no-strings y devuelve ''
-                         data[col] = data[col].apply(normalizar_texto)
-                    else:
-                        # Añadir la columna si falta para evitar KeyErrors posteriores
-                         data[col] = ''
-
-
-                # Normalizar y limpiar estado de auditoría
-                if 'Estado de Auditoria' in data.columns:
-                    data['Estado de Auditoria'] = data['Estado de Auditoria'].astype(str).str.strip().str.lower()
-                    data['Estado de Auditoria'] = data['Estado de Auditoria'].replace({'nan': 'desconocido', '': 'desconocido'})
-                else:
-                    data['Estado de Auditoria'] = 'desconocido' # Añadir si falta
-
-                # Convertir la columna de fecha a datetime
-                if 'Fecha' in data.columns:
-                    data['Fecha'] = pd.to_datetime(data['Fecha'], errors='coerce') # NaT si falla
-                # Notas: filas con Fecha=NaT o columnas no encontradas se manejarán en cada análisis que use fechas.
-                    
-                col_km = 'Kilometraje Camioneta'
-                if col_km in data.columns:
-                    # Intenta convertir la columna a tipo numérico.
-                    # errors='coerce' convierte valores no válidos a NaN.
-                    data[col_km] = pd.to_numeric(data[col_km], errors='coerce')
-                    # Opcional: Si prefieres NaN a 0, comenta la línea de fillna(0)
-                    # data[col_km] = data[col_km].fillna(0) # Si quieres 0 en lugar de NaN
-                else:
-                     # Añadir la columna si falta con valores nulos (para evitar errores)
-                     data[col_km] = pd.NA # O np.nan
-
-                     # --- Manejar la columna Número de Orden de Trabajo/ ID externo ---
-                col_id_trabajo = 'Número de Orden de Trabajo/ ID externo' # Asegurarse de usar la variable definida antes
-                if col_id_trabajo in data.columns:
-                    # Convertir la columna a tipo string explícitamente
-                    data[col_id_trabajo] = data[col_id_trabajo].astype(str)
-                    # Opcional: Si después de convertir a string quedan valores 'nan' (por NaNs originales), puedes reemplazarlos por ''
-                    data[col_id_trabajo] = data[col_id_trabajo].replace('nan', '')
-                else:
-                    # Si la columna falta, añadirla como vacía para evitar KeyErrors posteriores
-                    data[col_id_trabajo] = ''
-
-                    # --- NUEVA CORRECCIÓN: Manejar la columna Rut / tecnico ---
-                col_rut_tecnico = 'Rut / tecnico' # Definir la variable para el nombre de la columna
-                if col_rut_tecnico in data.columns:
-                    # Convertir la columna ENTERA a tipo string
-                    # Esto asegura que todos los valores (números, strings, NaNs) se conviertan a su representación de texto
-                    data[col_rut_tecnico] = data[col_rut_tecnico].astype(str)
-                    # Opcional: Reemplazar la representación de string de NaN ('nan') por una cadena vacía si lo prefieres
-                    data[col_rut_tecnico] = data[col_rut_tecnico].replace('nan', '')
-                else:
-                    # Si la columna 'Rut / tecnico' falta, añadirla como columna de strings vacías
-                    data[col_rut_tecnico] = ''
-
-                # Opcional: Limpiar filas completamente vacías que podrían venir de hojas extra
-                original_rows = len(data)
-                data.dropna(how='all', inplace=True)
-                if len(data) < original_rows:
-                     st.info(f"Se eliminaron {original_rows - len(data)} filas completamente vacías.")
-
-
+                # Vista "última auditoría por técnico": si el archivo nuevo solo agrega filas al anterior,
+                # se actualizan únicamente los técnicos de las filas nuevas
+                st.session_state['ultima_auditoria'] = renovar_ultima_auditoria(
+                    data, st.session_state.get('data'), st.session_state.get('ultima_auditoria')
+                )
                 # --- Almacenar el DataFrame procesado y la info del archivo en session_state ---
                 st.session_state['data'] = data
+                st.session_state['huella_datos'] = huella_datos # Hash del contenido, identifica el dataset
+                # Índices invertidos (valor -> posiciones de fila) para los filtros de la Pestaña 1
+                st.session_state['indices_filtro'] = construir_indices(data, columnas_filtro_tab1)
+                # Índices de trigramas para las búsquedas por Patente y Orden de Trabajo
+                st.session_state['indices_busqueda'] = construir_indices_trigramas(data, columnas_busqueda_tab1)
+                # Perfil de nulos (bits de validez por columna, datos por fila y por auditor) para completitud y stock
+                st.session_state['perfil_nulos'] = PerfilNulos(data)
                 st.session_state['uploaded_file_name'] = archivo.name # Guardamos el nombre
                 st.session_state['uploaded_file_size'] = archivo.size # Guardamos el tamaño
-                # Ya NO guardamos archivo.id
 
                 st.success("Archivo cargado y procesado correctamente.")
 
@@ -147,6 +79,11 @@ if archivo is not None:
                  # Si data está vacía después de cargar, limpiar session_state
                  st.warning("⚠️ El archivo Excel cargado está vacío o no contiene datos procesables.")
                  if 'data' in st.session_state: del st.session_state['data']
+                 if 'huella_datos' in st.session_state: del st.session_state['huella_datos']
+                 if 'indices_filtro' in st.session_state: del st.session_state['indices_filtro']
+                 if 'indices_busqueda' in st.session_state: del st.session_state['indices_busqueda']
+                 if 'ultima_auditoria' in st.session_state: del st.session_state['ultima_auditoria']
+                 if 'perfil_nulos' in st.session_state: del st.session_state['perfil_nulos']
                  if 'uploaded_file_name' in st.session_state: del st.session_state['uploaded_file_name']
                  if 'uploaded_file_size' in st.session_state: del st.session_state['uploaded_file_size']
 
@@ -155,9 +92,14 @@ if archivo is not None:
             st.error(f"Ocurrió un error al cargar o procesar el archivo: {e}")
             # Limpiar session_state en caso de error
             if 'data' in st.session_state: del st.session_state['data']
+            if 'huella_datos' in st.session_state: del st.session_state['huella_datos']
+            if 'indices_filtro' in st.session_state: del st.session_state['indices_filtro']
+            if 'indices_busqueda' in st.session_state: del st.session_state['indices_busqueda']
+            if 'ultima_auditoria' in st.session_state: del st.session_state['ultima_auditoria']
+            if 'perfil_nulos' in st.session_state: del st.session_state['perfil_nulos']
             if 'uploaded_file_name' in st.session_state: del st.session_state['uploaded_file_name']
             if 'uploaded_file_size' in st.session_state: del st.session_state['uploaded_file_size']
-            # Mostrar el traceback completo para depuración si es necesario
+            # Mostrar el traceback completo para depuración si es necesario (import traceback aquí)
             # st.code(traceback.format_exc())
 
     else:
@@ -168,19 +110,48 @@ if archivo is not None:
 # --- Bloque Principal que se ejecuta SOLO si 'data' está en session_state ---
 # Este bloque contiene todas las pestañas y su contenido
 if 'data' in st.session_state:
+    import pandas as pd
+    import plotly.express as px
+    from indices import construir_indices, construir_indices_trigramas, filtrar_posiciones, intersectar
+    from ultima_auditoria import construir_ultima_auditoria
+    from perfil_nulos import PerfilNulos
+    from stock_critico import HERRAMIENTAS_CRITICAS, EPP_CRITICOS, EPP_VITALES
+    from cache_secciones import cache_secciones
+    import secciones
+
     data = st.session_state['data'] # Recuperar el DataFrame de session_state
+    if 'indices_filtro' not in st.session_state: # Por si los datos llegaron sin pasar por la carga
+        st.session_state['indices_filtro'] = construir_indices(data, columnas_filtro_tab1)
+    indices_filtro = st.session_state['indices_filtro']
+    if 'indices_busqueda' not in st.session_state:
+        st.session_state['indices_busqueda'] = construir_indices_trigramas(data, columnas_busqueda_tab1)
+    indices_busqueda = st.session_state['indices_busqueda']
+    if 'ultima_auditoria' not in st.session_state:
+        st.session_state['ultima_auditoria'] = construir_ultima_auditoria(data)
+    ultima_auditoria = st.session_state['ultima_auditoria']
+    if 'perfil_nulos' not in st.session_state:
+        st.session_state['perfil_nulos'] = PerfilNulos(data)
+    perfil_nulos = st.session_state['perfil_nulos']
 
     # Verificar si el DataFrame no está vacío después de recuperarlo
     if not data.empty:
 
-        # --- Realizar filtrados comunes aquí si aplican a ambas pestañas ---
-        # Por ejemplo, filtrar por auditorías finalizadas, ya que se usa en varias secciones
+        # --- Datos comunes a ambas pestañas ---
+        # Cada sección se calcula con su función de `secciones` a través de cache_secciones, con clave
+        # (huella del dataset, sección, parámetros): un rerun solo recalcula la sección cuyo filtro cambió.
+        huella_datos = st.session_state.get('huella_datos')
+
+        def seccion(nombre, calcular, *parametros):
+            return cache_secciones.obtener(huella_datos, nombre, parametros, calcular)
+
+        # Las secciones de auditorías finalizadas solo aplican si existe la columna de estado
+        # (data['Estado de Auditoria'] ya está normalizada)
         if 'Estado de Auditoria' in data.columns:
-             # data['Estado de Auditoria'] ya está normalizada
-             data_finalizadas = data[data['Estado de Auditoria'] == 'finalizada'].copy()
+             columnas_finalizadas = data.columns
+             total_finalizadas = seccion('total_finalizadas', lambda: secciones.total_finalizadas(data))
         else:
-             # No hay columna de estado, data_finalizadas estará vacía
-             data_finalizadas = pd.DataFrame()
+             columnas_finalizadas = pd.Index([])
+             total_finalizadas = 0
 
 
         # --- Definición de Pestañas ---
@@ -202,15 +173,16 @@ if 'data' in st.session_state:
 
 
             # Asegurarse de que las columnas existen antes de usar unique
-            tecnicos = sorted(data[col_tec_nombre].unique().tolist()) if col_tec_nombre in data.columns else []
+            # Las dimensiones son categóricas: las opciones salen del diccionario de categorías, no de las filas
+            tecnicos = valores_categoria(data[col_tec_nombre]) if col_tec_nombre in data.columns else []
             tecnicos = [t for t in tecnicos if t.strip() != '' and t.lower() != 'nan'] # Limpiar vacíos/nan
             tecnico = st.selectbox("👷‍♂️ Técnico", ["Todos"] + tecnicos, key="filtro_tecnico_tab1") # Añadir key
 
-            empresas = sorted(data[col_empresa].astype(str).unique().tolist()) if col_empresa in data.columns else []
+            empresas = valores_categoria(data[col_empresa]) if col_empresa in data.columns else []
             empresas = [e for e in empresas if e.strip() != '' and e.lower() != 'nan'] # Limpiar vacíos/nan
             empresa = st.selectbox("🏢 Empresa", ["Todas"] + empresas, key="filtro_empresa_tab1") # Añadir key
 
-            tipos_auditoria = sorted(data[col_tipo_auditoria].astype(str).unique().tolist()) if col_tipo_auditoria in data.columns else []
+            tipos_auditoria = valores_categoria(data[col_tipo_auditoria]) if col_tipo_auditoria in data.columns else []
             tipos_auditoria = [t for t in tipos_auditoria if t.strip() != '' and t.lower() != 'nan'] # Limpiar vacíos/nan
             tipo = st.selectbox("🔍 Tipo de Auditoría", ["Todas"] + tipos_auditoria, key="filtro_tipo_auditoria_tab1") # Añadir key
 
@@ -218,23 +190,29 @@ if 'data' in st.session_state:
             orden_trabajo = st.text_input("📄 Buscar por Número de Orden de Trabajo / ID Externo", key="filtro_orden_trabajo_tab1").strip() if col_orden_trabajo in data.columns else ""
 
             # Aplicar Filtros
-            df_filtrado = data.copy() # Usar una copia para filtrar
+            # Técnico, Empresa y Tipo se resuelven intersectando los índices invertidos y tomando solo
+            # esas filas (sin copiar ni recorrer todo el DataFrame)
+            filtros_igualdad = {}
+            if tecnico != "Todos" and col_tec_nombre in indices_filtro:
+                 filtros_igualdad[col_tec_nombre] = tecnico
 
+            if empresa != "Todas" and col_empresa in indices_filtro:
+                 filtros_igualdad[col_empresa] = empresa
 
-            if tecnico != "Todos" and col_tec_nombre in df_filtrado.columns:
-                 df_filtrado = df_filtrado[df_filtrado[col_tec_nombre] == tecnico]
+            if tipo != "Todas" and col_tipo_auditoria in indices_filtro:
+                 filtros_igualdad[col_tipo_auditoria] = tipo
 
-            if empresa != "Todas" and col_empresa in df_filtrado.columns:
-                 df_filtrado = df_filtrado[df_filtrado[col_empresa].astype(str) == empresa]
+            posiciones_filtro = filtrar_posiciones(indices_filtro, filtros_igualdad)
 
-            if tipo != "Todas" and col_tipo_auditoria in df_filtrado.columns:
-                 df_filtrado = df_filtrado[df_filtrado[col_tipo_auditoria].astype(str) == tipo]
+            # Patente y Orden de Trabajo: candidatos del índice de trigramas, verificados como subcadena
+            # (sin distinguir mayúsculas) y cruzados con las posiciones de los filtros anteriores
+            if patente and col_patente in indices_busqueda:
+                 posiciones_filtro = intersectar(posiciones_filtro, indices_busqueda[col_patente].buscar(patente))
 
-            if patente and col_patente in df_filtrado.columns:
-                 df_filtrado = df_filtrado[df_filtrado[col_patente].astype(str).str.contains(patente, case=False, na=False)]
+            if orden_trabajo and col_orden_trabajo in indices_busqueda:
+                 posiciones_filtro = intersectar(posiciones_filtro, indices_busqueda[col_orden_trabajo].buscar(orden_trabajo))
 
-            if orden_trabajo and col_orden_trabajo in df_filtrado.columns:
-                 df_filtrado = df_filtrado[df_filtrado[col_orden_trabajo].astype(str).str.contains(orden_trabajo, case=False, na=False)]
+            df_filtrado = data if posiciones_filtro is None else data.iloc[posiciones_filtro]
 
 
             st.markdown("### 📊 Datos filtrados")
@@ -246,14 +224,13 @@ if 'data' in st.session_state:
             st.markdown("### 🏆 Ranking Técnicos más Auditados (Finalizadas)")
 
             columnas_ranking_tecnicos = [col_tec_nombre, col_empresa, col_fecha, 'Estado de Auditoria']
-            if all(col in data_finalizadas.columns for col in columnas_ranking_tecnicos) and col_fecha in data_finalizadas.columns: # Usar data_finalizadas
-                 # Aseguramos que data_finalizadas tiene fecha válida
-                 data_finalizadas_ranking = data_finalizadas[data_finalizadas[col_fecha].notna()].copy()
+            if all(col in columnas_finalizadas for col in columnas_ranking_tecnicos) and col_fecha in columnas_finalizadas:
+                 # Rango de fechas de las auditorías finalizadas con fecha válida
+                 rango_ranking = seccion('rango_fechas_ranking', lambda: secciones.rango_fechas_finalizadas(data))
 
-                 if not data_finalizadas_ranking.empty:
+                 if rango_ranking is not None:
                       # Selección de rango de fechas
-                      fecha_min_ranking = data_finalizadas_ranking[col_fecha].min().date()
-                      fecha_max_ranking = data_finalizadas_ranking[col_fecha].max().date()
+                      fecha_min_ranking, fecha_max_ranking = rango_ranking
 
                       fechas = st.date_input(
                           "📅 Selecciona el rango de fechas (opcional)",
@@ -263,40 +240,19 @@ if 'data' in st.session_state:
                           key="rango_fechas_ranking_tecnicos"
                       )
 
-                      # Si se seleccionaron fechas válidas (lista de 2 elementos)
+                      # Si se seleccionaron fechas válidas (lista de 2 elementos), el rango es parámetro de la sección
+                      fecha_inicio = fecha_fin = None
                       if isinstance(fechas, list) and len(fechas) == 2:
-                          fecha_inicio, fecha_fin = fechas
                           # Asegurarse que las fechas seleccionadas son date objects
-                          if isinstance(fecha_inicio, date) and isinstance(fecha_fin, date):
-                              # Filtro por rango de fecha
-                              mask = (data_finalizadas_ranking[col_fecha] >= pd.to_datetime(fecha_inicio)) & (data_finalizadas_ranking[col_fecha] <= pd.to_datetime(fecha_fin))
-                              data_finalizadas_ranking_filtrado = data_finalizadas_ranking.loc[mask].copy()
+                          if isinstance(fechas[0], date) and isinstance(fechas[1], date):
+                              fecha_inicio, fecha_fin = fechas
                           else:
-                              data_finalizadas_ranking_filtrado = data_finalizadas_ranking.copy()
                               st.warning("Rango de fechas seleccionado inválido.")
 
-                      else:
-                          data_finalizadas_ranking_filtrado = data_finalizadas_ranking.copy()
-
+                      # Agrupar por Técnico y Empresa
+                      ranking = seccion('ranking_tecnicos', lambda: secciones.ranking_tecnicos(data, fecha_inicio, fecha_fin), fecha_inicio, fecha_fin)
 
-                      if not data_finalizadas_ranking_filtrado.empty:
-                           # Agrupar por Técnico y Empresa
-                           ranking = (
-                               data_finalizadas_ranking_filtrado
-                               .groupby([col_tec_nombre, col_empresa])
-                               .agg(
-                                    Cantidad_de_Auditorias=(col_fecha, 'size'), # Count non-null dates in the group
-                                    Fechas_de_Auditoria=(col_fecha, lambda x: ', '.join(sorted(x.dt.strftime('%d/%m/%Y').tolist())) if pd.api.types.is_datetime64_any_dtype(x) else 'Fechas no válidas')
-                                )
-                               .reset_index()
-                               .rename(columns={
-                                   col_tec_nombre: "Técnico",
-                                   col_empresa: "Empresa",
-                                   "Cantidad_de_Auditorias": "Cantidad de Auditorías",
-                                   "Fechas_de_Auditoria": "Fechas de Auditoría"
-                               })
-                               .sort_values(by="Cantidad de Auditorías", ascending=False)
-                           )
+                      if ranking is not None:
                            st.dataframe(ranking, use_container_width=True)
                       else:
                            st.info("⚠️ No hay auditorías finalizadas con fecha válida en el rango de fechas seleccionado.")
@@ -315,14 +271,8 @@ if 'data' in st.session_state:
             columnas_necesarias_empresa = [col_empresa, 'Estado de Auditoria']
             if all(col in data.columns for col in columnas_necesarias_empresa):
 
-                 if not data_finalizadas.empty:
-                      auditorias_empresa = (
-                          data_finalizadas[col_empresa]
-                          .value_counts()
-                          .rename_axis(col_empresa)
-                          .reset_index(name='Cantidad de Auditorías Finalizadas')
-                      )
-                      auditorias_empresa = auditorias_empresa[auditorias_empresa[col_empresa].str.strip() != '']
+                 if total_finalizadas > 0:
+                      auditorias_empresa = seccion('auditorias_empresa', lambda: secciones.auditorias_por_empresa(data))
 
 
                       st.dataframe(auditorias_empresa, use_container_width=True)
@@ -359,49 +309,20 @@ if 'data' in st.session_state:
             st.markdown("---")
             st.markdown("### 🔧 Técnicos con Stock Crítico de Herramientas")
 
-            herramientas_criticas = [ # Tu lista de herramientas críticas
-                "Power meter GPON", "VFL Luz visible para localizar fallas", "Limpiador de conectores tipo “One Click”",
-                "Deschaquetador de primera cubierta para DROP", "Deschaquetador de recubrimiento de FO 125micras Tipo Miller",
-                "Cortadora de precisión 3 pasos", "Regla de corte", "Alcohol isopropilico 99%",
-                "Paños secos para FO", "Crimper para cable UTP", "Deschaquetador para cables con cubierta redonda (UTP, RG6 )",
-                "Tester para cable UTP"
-            ]
+            herramientas_criticas = HERRAMIENTAS_CRITICAS # Lista compartida con el reporte por lotes
 
             herramientas_criticas_existentes = [h for h in herramientas_criticas if h in data.columns]
             columnas_stock_herramientas = [col_tec_nombre, col_empresa, col_fecha, 'Estado de Auditoria'] + herramientas_criticas_existentes
 
             if all(col in data.columns for col in columnas_stock_herramientas[:4]) and herramientas_criticas_existentes:
-                 data_finalizadas_stock_herr = data[(data['Estado de Auditoria'] == 'finalizada') & (data[col_fecha].notna())].copy()
-
-                 if not data_finalizadas_stock_herr.empty:
-                      idx_ultima_auditoria = data_finalizadas_stock_herr.groupby(col_tec_nombre)[col_fecha].idxmax()
-                      data_ultima_auditoria_herr = data_finalizadas_stock_herr.loc[idx_ultima_auditoria].reset_index(drop=True)
-
-                      def obtener_herramientas_faltantes(row):
-                           faltantes = []
-                           for herramienta in herramientas_criticas_existentes:
-                               valor = row.get(herramienta)
-                               if pd.isna(valor) or str(valor).strip().lower() in ["no", "falta", "0"]:
-                                   faltantes.append(herramienta)
-                           return faltantes
+                 # Matriz de faltantes (técnicos x herramientas) sobre la última auditoría de cada técnico (vista materializada)
+                 resultado_stock_herramientas = seccion('stock_critico_herramientas', lambda: secciones.stock_critico(
+                     data, ultima_auditoria, herramientas_criticas_existentes,
+                     "Herramientas Faltantes", 'Cantidad de Técnicos con Stock Crítico Herramientas', perfil=perfil_nulos
+                 ))
 
-                      columnas_para_stock_herr_procesar = [col_tec_nombre, col_empresa, col_fecha] + herramientas_criticas_existentes
-                      stock_critico_herramientas = data_ultima_auditoria_herr[columnas_para_stock_herr_procesar].copy()
-
-                      stock_critico_herramientas["Herramientas Faltantes"] = stock_critico_herramientas.apply(obtener_herramientas_faltantes, axis=1)
-                      stock_critico_herramientas = stock_critico_herramientas[stock_critico_herramientas["Herramientas Faltantes"].map(len) > 0]
-
-                      stock_critico_herramientas["Cantidad Faltantes"] = stock_critico_herramientas["Herramientas Faltantes"].map(len)
-                      stock_critico_herramientas = stock_critico_herramientas.sort_values(by="Cantidad Faltantes", ascending=False)
-                      stock_critico_herramientas = stock_critico_herramientas.rename(columns={col_tec_nombre: "Técnico"})
-
-                      def agregar_icono_herramientas(row):
-                           if row["Cantidad Faltantes"] >= 2: return f"🔴 {row['Técnico']}"
-                           elif row["Cantidad Faltantes"] == 1: return f"🟡 {row['Técnico']}"
-                           else: return row['Técnico']
-
-                      stock_critico_herramientas["Técnico Con Icono"] = stock_critico_herramientas.apply(agregar_icono_herramientas, axis=1)
-                      stock_critico_herramientas["Herramientas Faltantes"] = stock_critico_herramientas["Herramientas Faltantes"].apply(lambda x: ", ".join(x))
+                 if resultado_stock_herramientas is not None:
+                      stock_critico_herramientas, empresas_stock_critico_herramientas = resultado_stock_herramientas
 
                       total_tecnicos_stock_critico_herramientas = stock_critico_herramientas.shape[0]
                       st.markdown(f"**🔥 Total técnicos con stock crítico de herramientas: {total_tecnicos_stock_critico_herramientas}**")
@@ -410,7 +331,7 @@ if 'data' in st.session_state:
                       empresas_disponibles_herr_tabla = [e for e in empresas_disponibles_herr_tabla if e.strip() != '' and e.lower() != 'nan']
                       empresa_seleccionada_herr_tabla = st.selectbox("🔎 Filtrar por Empresa:", options=["Todas"] + empresas_disponibles_herr_tabla, key="filtro_empresa_stock_herr_tabla")
 
-                      stock_critico_herramientas_general = stock_critico_herramientas.copy()
+                      stock_critico_herramientas_general = stock_critico_herramientas # Resultado compartido: no se modifica
 
                       if empresa_seleccionada_herr_tabla != "Todas":
                            stock_critico_herramientas = stock_critico_herramientas[stock_critico_herramientas[col_empresa] == empresa_seleccionada_herr_tabla]
@@ -420,10 +341,10 @@ if 'data' in st.session_state:
                           use_container_width=True
                       )
 
-                      buffer_herramientas = io.BytesIO()
-                      with pd.ExcelWriter(buffer_herramientas, engine='xlsxwriter') as writer:
-                           stock_critico_herramientas[["Técnico Con Icono", col_empresa, col_fecha, "Herramientas Faltantes"]].rename(columns={"Técnico Con Icono": "Técnico"}).to_excel(writer, index=False, sheet_name='Stock_Critico_Herramientas')
-                      buffer_herramientas.seek(0)
+                      buffer_herramientas = seccion('excel_stock_herramientas', lambda: secciones.exportar_excel(
+                          stock_critico_herramientas[["Técnico Con Icono", col_empresa, col_fecha, "Herramientas Faltantes"]].rename(columns={"Técnico Con Icono": "Técnico"}),
+                          'Stock_Critico_Herramientas'
+                      ), empresa_seleccionada_herr_tabla)
 
                       st.download_button(
                           label="📥 Descargar Técnicos con Stock Crítico Herramientas (Tabla Filtrada)",
@@ -436,14 +357,6 @@ if 'data' in st.session_state:
                       st.subheader("📈 Técnicos con Stock Crítico de Herramientas por Empresa")
 
                       if not stock_critico_herramientas_general.empty:
-                           empresas_stock_critico_herramientas = (
-                               stock_critico_herramientas_general.groupby(col_empresa)
-                               .size()
-                               .reset_index(name='Cantidad de Técnicos con Stock Crítico Herramientas')
-                               .sort_values(by='Cantidad de Técnicos con Stock Crítico Herramientas', ascending=False)
-                           )
-                           empresas_stock_critico_herramientas = empresas_stock_critico_herramientas[empresas_stock_critico_herramientas[col_empresa].str.strip() != '']
-
                            if not empresas_stock_critico_herramientas.empty:
                                 fig_stock_herramientas = px.bar(
                                     empresas_stock_critico_herramientas,
@@ -478,53 +391,22 @@ if 'data' in st.session_state:
             st.markdown("---")
             st.markdown("### 🦺 Técnicos con Stock Crítico de EPP")
 
-            epp_criticos = [ # Tu lista de EPP críticos
-                "Conos de seguridad", "Refugio de PVC", "Casco de Altura", "Barbiquejo",
-                "Legionario Para Casco", "Guantes Cabritilla", "Guantes Dielectricos",
-                "Guantes trabajo Fino", "Zapatos de Seguridad Dielectricos",
-                "LENTE DE SEGURIDAD (CLAROS Y OSCUROS)", "Arnes Dielectrico",
-                "Estrobo Dielectrico", "Cuerda de vida /Dielectrico", "Chaleco reflectante",
-                "DETECTOR DE TENSION TIPO LAPIZ CON LINTERNA", "Bloqueador Solar"
-            ]
-            epp_vitales = ["Casco de Altura", "Zapatos de Seguridad Dielectricos", "Arnes Dielectrico", "Estrobo Dielectrico"] # Tu lista EPP vitales
+            epp_criticos = EPP_CRITICOS # Listas compartidas con el reporte por lotes
+            epp_vitales = EPP_VITALES
 
 
             epp_criticos_existentes = [e for e in epp_criticos if e in data.columns]
             columnas_stock_epp = [col_tec_nombre, col_empresa, col_fecha, 'Estado de Auditoria'] + epp_criticos_existentes
 
             if all(col in data.columns for col in columnas_stock_epp[:4]) and epp_criticos_existentes:
-                 data_finalizadas_stock_epp = data[(data['Estado de Auditoria'] == 'finalizada') & (data[col_fecha].notna())].copy()
-
-                 if not data_finalizadas_stock_epp.empty:
-                      idx_ultima_auditoria_epp = data_finalizadas_stock_epp.groupby(col_tec_nombre)[col_fecha].idxmax()
-                      data_ultima_auditoria_epp = data_finalizadas_stock_epp.loc[idx_ultima_auditoria_epp].reset_index(drop=True)
+                 # Misma matriz de faltantes; el icono se decide solo por los EPP vitales
+                 resultado_stock_epp = seccion('stock_critico_epp', lambda: secciones.stock_critico(
+                     data, ultima_auditoria, epp_criticos_existentes,
+                     "EPP Faltantes", 'Cantidad de Técnicos con Stock Crítico EPP', items_severidad=epp_vitales, perfil=perfil_nulos
+                 ))
 
-                      def obtener_epp_faltantes(row):
-                           faltantes = []
-                           for epp in epp_criticos_existentes:
-                               valor = row.get(epp)
-                               if pd.isna(valor) or str(valor).strip().lower() in ["no", "falta", "0"]:
-                                   faltantes.append(epp)
-                           return faltantes
-
-                      columnas_para_stock_epp_procesar = [col_tec_nombre, col_empresa, col_fecha] + epp_criticos_existentes
-                      stock_critico_epp = data_ultima_auditoria_epp[columnas_para_stock_epp_procesar].copy()
-
-                      stock_critico_epp["EPP Faltantes"] = stock_critico_epp.apply(obtener_epp_faltantes, axis=1)
-                      stock_critico_epp = stock_critico_epp[stock_critico_epp["EPP Faltantes"].map(len) > 0]
-
-                      stock_critico_epp["Cantidad Faltantes"] = stock_critico_epp["EPP Faltantes"].map(len)
-                      stock_critico_epp = stock_critico_epp.sort_values(by="Cantidad Faltantes", ascending=False)
-                      stock_critico_epp = stock_critico_epp.rename(columns={col_tec_nombre: "Técnico"})
-
-                      def agregar_icono_epp(row):
-                           faltantes_vitales = [epp for epp in row["EPP Faltantes"] if epp in epp_vitales]
-                           if len(faltantes_vitales) >= 2: return f"🔴 {row['Técnico']}"
-                           elif len(faltantes_vitales) == 1: return f"🟡 {row['Técnico']}"
-                           else: return row['Técnico']
-
-                      stock_critico_epp["Técnico Con Icono"] = stock_critico_epp.apply(agregar_icono_epp, axis=1)
-                      stock_critico_epp["EPP Faltantes"] = stock_critico_epp["EPP Faltantes"].apply(lambda x: ", ".join(x))
+                 if resultado_stock_epp is not None:
+                      stock_critico_epp, empresas_stock_critico_epp = resultado_stock_epp
 
                       total_tecnicos_stock_critico_epp = stock_critico_epp.shape[0]
                       st.markdown(f"**🔥 Total técnicos con stock crítico de EPP: {total_tecnicos_stock_critico_epp}**")
@@ -533,7 +415,7 @@ if 'data' in st.session_state:
                       empresas_disponibles_epp_tabla = [e for e in empresas_disponibles_epp_tabla if e.strip() != '' and e.lower() != 'nan']
                       empresa_seleccionada_epp_tabla = st.selectbox("🔎 Filtrar por Empresa:", options=["Todas"] + empresas_disponibles_epp_tabla, key="filtro_empresa_stock_epp_tabla")
 
-                      stock_critico_epp_general = stock_critico_epp.copy()
+                      stock_critico_epp_general = stock_critico_epp # Resultado compartido: no se modifica
 
                       if empresa_seleccionada_epp_tabla != "Todas":
                            stock_critico_epp = stock_critico_epp[stock_critico_epp[col_empresa] == empresa_seleccionada_epp_tabla]
@@ -544,10 +426,10 @@ if 'data' in st.session_state:
                           use_container_width=True
                       )
 
-                      buffer_epp = io.BytesIO()
-                      with pd.ExcelWriter(buffer_epp, engine='xlsxwriter') as writer:
-                           stock_critico_epp[["Técnico Con Icono", col_empresa, col_fecha, "EPP Faltantes"]].rename(columns={"Técnico Con Icono": "Técnico"}).to_excel(writer, index=False, sheet_name='Stock_Critico_EPP')
-                      buffer_epp.seek(0)
+                      buffer_epp = seccion('excel_stock_epp', lambda: secciones.exportar_excel(
+                          stock_critico_epp[["Técnico Con Icono", col_empresa, col_fecha, "EPP Faltantes"]].rename(columns={"Técnico Con Icono": "Técnico"}),
+                          'Stock_Critico_EPP'
+                      ), empresa_seleccionada_epp_tabla)
 
                       st.download_button(
                           label="📥 Descargar Técnicos con Stock Crítico EPP (Tabla Filtrada)",
@@ -560,14 +442,6 @@ if 'data' in st.session_state:
                       st.subheader("📈 Técnicos con Stock Crítico de EPP por Empresa")
 
                       if not stock_critico_epp_general.empty:
-                           empresas_stock_critico_epp = (
-                               stock_critico_epp_general.groupby(col_empresa)
-                               .size()
-                               .reset_index(name='Cantidad de Técnicos con Stock Crítico EPP')
-                               .sort_values(by='Cantidad de Técnicos con Stock Crítico EPP', ascending=False)
-                           )
-                           empresas_stock_critico_epp = empresas_stock_critico_epp[empresas_stock_critico_epp[col_empresa].str.strip() != '']
-
                            if not empresas_stock_critico_epp.empty:
                                 fig_stock_epp = px.bar(
                                     empresas_stock_critico_epp,
@@ -615,9 +489,10 @@ if 'data' in st.session_state:
             st.metric(label="🔥 Total Técnicos con EPP Crítico", value=total_tecnicos_stock_critico_epp)
             st.metric(label="🔧 Total Técnicos con Herramientas Críticas", value=total_tecnicos_stock_critico_herramientas)
 
-            if archivo:
-                # Llamamos a la función de KPIs
-                kpis, empresa_kpis_df, total_auditorias, data = process_data(archivo)
+            # Reporte de KPIs sobre el DataFrame ya cargado; el cálculo se reutiliza
+            # mientras la huella del dataset no cambie, así un rerun solo vuelve a dibujar
+            from pt import process_data # Reporte de KPIs: se importa al llegar a él
+            process_data(data, st.session_state.get('huella_datos'))
 
 
         # --- Contenido de la Pestaña 2 ---
@@ -636,19 +511,13 @@ if 'data' in st.session_state:
             # --- SECCIÓN: Ranking de Auditores por Trabajos Realizados (FINALIZADAS) ---
             st.markdown("### Ranking de Auditores por Trabajos Realizados (Finalizadas)") # Título ajustado
 
-            # Verificar que las columnas necesarias existen en data_finalizadas
-            columnas_ranking_auditores = [col_auditor, col_estado] # Estado ya usado para crear data_finalizadas
-            if col_auditor in data_finalizadas.columns:
-
-                 if not data_finalizadas.empty: # data_finalizadas ya filtrada y con Auditor normalizado
-                      # Agrupar por auditor y contar las auditorías finalizadas
-                      ranking_auditores = (
-                          data_finalizadas.groupby(col_auditor) # Auditor ya normalizado
-                          .size()
-                          .reset_index(name="Cantidad de Auditorías Finalizadas") # Renombrado
-                          .rename(columns={col_auditor: "Auditor"})
-                          .sort_values(by="Cantidad de Auditorías Finalizadas", ascending=False)
-                      )
+            # Verificar que las columnas necesarias existen (con estado: columnas_finalizadas)
+            columnas_ranking_auditores = [col_auditor, col_estado]
+            if col_auditor in columnas_finalizadas:
+
+                 if total_finalizadas > 0:
+                      # Agrupar por auditor (ya normalizado) y contar las auditorías finalizadas
+                      ranking_auditores = seccion('ranking_auditores', lambda: secciones.ranking_auditores(data))
                       st.dataframe(ranking_auditores, use_container_width=True)
                  else:
                       st.info(f"No hay auditorías marcadas como '{'finalizada'}' en el archivo para calcular el ranking de auditores.")
@@ -661,26 +530,14 @@ if 'data' in st.session_state:
             st.markdown("---") # Separador
             st.subheader("🗓️ Auditorías por Auditor por Día ") # Título ajustado
 
-            # Validar y preparar datos para este cálculo específico
-            # Necesitamos al menos Fecha válida, Auditor válido e ID de trabajo válido
-            # Usamos el DataFrame 'data' que ya tiene la Fecha convertida (con NaT) y Auditor normalizado
-            data_para_conteo_diario = data.dropna(subset=[col_fecha, col_auditor, col_id_trabajo]).copy()
+            # --- 1. Conteo por día y auditor ---
+            # Solo filas con Fecha válida, Auditor válido e ID de trabajo válido ('data' ya tiene la Fecha
+            # convertida, con NaT, y el Auditor normalizado). None si no queda ninguna fila.
+            conteo_auditorias_diario = seccion('conteo_auditorias_diario', lambda: secciones.conteo_auditorias_diario(data))
 
-            if not data_para_conteo_diario.empty:
+            if conteo_auditorias_diario is not None:
                  # Asegurarnos que la columna Fecha es datetime
-                 if pd.api.types.is_datetime64_any_dtype(data_para_conteo_diario[col_fecha]):
-
-                     # --- 1. Calcular el conteo por día y auditor ---
-                     conteo_auditorias_diario = data_para_conteo_diario.groupby([
-                         data_para_conteo_diario[col_fecha].dt.date, # Agrupar solo por la fecha (el día)
-                         data_para_conteo_diario[col_auditor]        # Agrupar por el auditor (ya normalizado)
-                     ])[col_id_trabajo].nunique().reset_index() # nunique() cuenta valores únicos por grupo
-
-                     # Renombrar las columnas resultantes
-                     conteo_auditorias_diario.columns = ['Fecha', 'Auditor', 'Total_Auditorias']
-
-                     # Ordenar el resultado por fecha y auditor (opcional)
-                     conteo_auditorias_diario = conteo_auditorias_diario.sort_values(by=['Fecha', 'Auditor'])
+                 if pd.api.types.is_datetime64_any_dtype(data[col_fecha]):
 
 
                      # --- 2. Agregar el filtro por fecha específica ---
@@ -756,13 +613,10 @@ if 'data' in st.session_state:
             st.markdown("### Distribución de Auditorías Finalizadas entre Empresas con Fechas")
 
             columnas_necesarias_distribucion = [col_auditor, col_empresa, col_fecha]
-            if all(col in data_finalizadas.columns for col in columnas_necesarias_distribucion) and col_fecha in data_finalizadas.columns:
-                 # Asegurarse que 'Fecha' en data_finalizadas es datetime
-                 if pd.api.types.is_datetime64_any_dtype(data_finalizadas[col_fecha]):
-                      distribucion_auditorias = data_finalizadas.groupby([col_auditor, col_empresa]).agg(
-                          Cantidad_de_Auditorias=(col_fecha, 'size'),
-                          Fechas_de_Auditoria=(col_fecha, lambda x: ', '.join(sorted(x.dt.strftime('%d/%m/%Y').tolist())) if pd.api.types.is_datetime64_any_dtype(x) else 'Fechas no válidas')
-                      ).reset_index()
+            if all(col in columnas_finalizadas for col in columnas_necesarias_distribucion) and col_fecha in columnas_finalizadas:
+                 # Asegurarse que 'Fecha' es datetime
+                 if pd.api.types.is_datetime64_any_dtype(data[col_fecha]):
+                      distribucion_auditorias = seccion('distribucion_empresas', lambda: secciones.distribucion_empresas(data))
 
                       if not distribucion_auditorias.empty:
                            st.dataframe(distribucion_auditorias, use_container_width=True)
@@ -782,41 +636,27 @@ if 'data' in st.session_state:
             col_region = 'Region' # Asegurarse que este nombre es correcto
 
             # Verificar columna necesaria
-            if col_region in data_finalizadas.columns:
-                 # Asegurarse que la columna de región no tiene valores vacíos/NaN para agrupar
-                 data_finalizadas_region = data_finalizadas.dropna(subset=[col_region]).copy()
-
-                 if not data_finalizadas_region.empty:
-                      # Agrupar datos por Región y contar cantidad de auditorías finalizadas
-                      auditorias_por_region = (
-                          data_finalizadas_region.groupby(col_region)
-                          .size()
-                          .reset_index(name='Cantidad de Auditorías Finalizadas')
-                          .sort_values(by='Cantidad de Auditorías Finalizadas', ascending=False)
+            if col_region in columnas_finalizadas:
+                 # Agrupar por Región (sin vacíos/NaN) y contar cantidad de auditorías finalizadas
+                 auditorias_por_region = seccion('auditorias_region', lambda: secciones.auditorias_por_region(data))
+
+                 if not auditorias_por_region.empty:
+                      fig_auditorias_region = px.bar(
+                          auditorias_por_region,
+                          x='Cantidad de Auditorías Finalizadas',
+                          y=col_region,
+                          orientation='h',
+                          color=col_region,
+                          text='Cantidad de Auditorías Finalizadas',
+                          color_discrete_sequence=px.colors.qualitative.Set2
                       )
-                      auditorias_por_region = auditorias_por_region[auditorias_por_region[col_region].str.strip() != '']
-
-
-                      if not auditorias_por_region.empty:
-                           fig_auditorias_region = px.bar(
-                               auditorias_por_region,
-                               x='Cantidad de Auditorías Finalizadas',
-                               y=col_region,
-                               orientation='h',
-                               color=col_region,
-                               text='Cantidad de Auditorías Finalizadas',
-                               color_discrete_sequence=px.colors.qualitative.Set2
-                           )
-                           fig_auditorias_region.update_layout(
-                               xaxis_title="Cantidad de Auditorías Finalizadas",
-                               yaxis_title=col_region,
-                               yaxis=dict(autorange="reversed"),
-                               plot_bgcolor='white'
-                           )
-                           st.plotly_chart(fig_auditorias_region, use_container_width=True)
-                      else:
-                           st.info(f"No hay auditorías finalizadas con información de '{col_region}'.")
-
+                      fig_auditorias_region.update_layout(
+                          xaxis_title="Cantidad de Auditorías Finalizadas",
+                          yaxis_title=col_region,
+                          yaxis=dict(autorange="reversed"),
+                          plot_bgcolor='white'
+                      )
+                      st.plotly_chart(fig_auditorias_region, use_container_width=True)
                  else:
                       st.info(f"No hay auditorías finalizadas con información de '{col_region}'.")
             else:
@@ -826,7 +666,7 @@ if 'data' in st.session_state:
             # Calcular el total de auditorías finalizadas (ya lo tenías)
             st.markdown("---")
             if 'Estado de Auditoria' in data.columns:
-                 total_auditorias_finalizadas = len(data[data['Estado de Auditoria'] == 'finalizada'])
+                 total_auditorias_finalizadas = total_finalizadas
                  st.markdown(f"""
                       <div style="background-color: #f0f0f5; padding: 15px 25px; border-radius: 8px; font-size: 24px; font-weight: bold; color: #333;">
                           <span style="color: #007bff;">Total de Auditorías Finalizadas en el archivo: </span><span style="color: #28a745;">{total_auditorias_finalizadas}</span>
@@ -842,16 +682,12 @@ if 'data' in st.session_state:
 
             columnas_completitud = [col_auditor, col_estado] # Estado ya usado
 
-            if col_auditor in data_finalizadas.columns: # Verificar si el auditor existe en data_finalizadas
-
-                 if not data_finalizadas.empty:
-                      data_finalizadas_completitud = data_finalizadas.copy()
-                      total_columnas = data_finalizadas_completitud.shape[1]
-                      if total_columnas > 0:
-                           data_finalizadas_completitud["% Completitud"] = data_finalizadas_completitud.notna().sum(axis=1) / total_columnas * 100
+            if col_auditor in columnas_finalizadas: # Verificar si el auditor existe (y hay columna de estado)
 
-                           ranking_completitud = data_finalizadas_completitud.groupby(col_auditor)["% Completitud"].mean().reset_index()
-                           ranking_completitud = ranking_completitud.sort_values(by="% Completitud", ascending=False)
+                 if total_finalizadas > 0:
+                      # Promedio por auditor del % de columnas con dato, leído del perfil de nulos; None si no hay columnas
+                      ranking_completitud = seccion('ranking_completitud', lambda: secciones.ranking_completitud(perfil_nulos))
+                      if ranking_completitud is not None:
 
                            def formato_porcentaje(valor):
                                 if pd.isna(valor): return ""
@@ -869,6 +705,13 @@ if 'data' in st.session_state:
                       else:
                            st.warning("No hay columnas en los datos para calcular el porcentaje de completitud.")
 
+                      with st.expander("🧮 Completitud por columna (todo el archivo)"):
+                           resumen_calidad = seccion('resumen_calidad', lambda: secciones.resumen_calidad(perfil_nulos))
+                           st.dataframe(
+                               resumen_calidad.style.format({"% Con dato": formato_porcentaje}),
+                               use_container_width=True, hide_index=True
+                           )
+
                  else:
                       st.info(f"No hay auditorías marcadas como '{'finalizada'}' para calcular el Ranking de Auditores por Información Completa.")
 
@@ -876,6 +719,12 @@ if 'data' in st.session_state:
                  st.error(f"Falta la columna '{col_auditor}' para calcular el Ranking de Auditores por Información Completa.")
 
 
+        # --- Estado de la cache de secciones (aciertos/fallos acumulados del proceso) ---
+        with st.sidebar.expander("⚡ Cache de secciones"):
+             st.caption(f"Memoria usada: {cache_secciones.bytes_usados / (1024 * 1024):,.1f} MB de {cache_secciones.limite_bytes / (1024 * 1024):,.0f} MB")
+             st.dataframe(cache_secciones.estadisticas(), use_container_width=True, hide_index=True)
+
+
     else:
         # Este mensaje se muestra si el DataFrame está vacío después de recuperarlo de session_state
         st.warning("⚠️ El archivo Excel cargado está vacío o no contiene datos procesables después de la limpieza inicial.")
@@ -885,6 +734,9 @@ else:
     # Este mensaje se muestra si 'data' NO está en session_state (es decir, nunca se ha cargado un archivo válido)
     st.warning("⚠️ Por favor, sube un archivo Excel con los datos de auditoría para comenzar el análisis.")
 
+# --- Tiempo de arranque del script frente al presupuesto ---
+reportar_inicio(st, _inicio_script, "app.py")
+
 # --- Fin del script ---
     
 
@@ -0,0 +1,45 @@
+import logging
+import os
+import sys
+import time
+
+# Presupuesto (ms) para la primera ejecución del script en una sesión, configurable por variable de entorno
+PRESUPUESTO_INICIO_MS = float(os.environ.get("AUDITORIAS_PRESUPUESTO_INICIO_MS", "1500"))
+
+# Módulos pesados que la página vacía no debería necesitar (streamlit ya carga plotly.graph_objects por su cuenta)
+MODULOS_PESADOS = ("pandas", "numpy", "pyarrow", "openpyxl", "plotly.express", "pt", "secciones")
+
+_log = logging.getLogger(__name__)
+
+# Scripts que ya informaron su arranque en este proceso (el primero de cada uno es el arranque en frío)
+_informados = set()
+
+
+def modulos_pesados_cargados():
+    """Módulos de MODULOS_PESADOS ya importados en el proceso."""
+    return [nombre for nombre in MODULOS_PESADOS if nombre in sys.modules]
+
+
+def reportar_inicio(st, inicio, script):
+    """
+    Informa el tiempo de la ejecución del script (desde `inicio`, un time.perf_counter()).
+
+    La primera ejecución de la sesión es su arranque: se guarda en session_state, se compara con
+    PRESUPUESTO_INICIO_MS y se muestra en la barra lateral. La primera del proceso se registra además
+    con logging (nivel INFO), con los módulos pesados que ya estaban cargados.
+    """
+    transcurrido_ms = (time.perf_counter() - inicio) * 1000
+    clave = f"arranque_ms_{script}"
+    if clave not in st.session_state:
+        st.session_state[clave] = transcurrido_ms
+    arranque_ms = st.session_state[clave]
+
+    if script not in _informados:
+        _informados.add(script)
+        pesados = ", ".join(modulos_pesados_cargados()) or "ninguno"
+        _log.info("[%s] arranque en %.0f ms (presupuesto %.0f ms); módulos pesados cargados: %s",
+                  script, transcurrido_ms, PRESUPUESTO_INICIO_MS, pesados)
+
+    st.sidebar.caption(f"⏱️ Arranque: {arranque_ms:,.0f} ms (presupuesto {PRESUPUESTO_INICIO_MS:,.0f} ms) · esta ejecución: {transcurrido_ms:,.0f} ms")
+    if arranque_ms > PRESUPUESTO_INICIO_MS:
+        st.sidebar.warning(f"⚠️ El arranque superó el presupuesto de {PRESUPUESTO_INICIO_MS:,.0f} ms.")
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import time
+from contextlib import suppress
+
+import pandas as pd
+
+# Carpeta y tamaño máximo de la cache (configurables por variables de entorno)
+DIRECTORIO_CACHE = os.environ.get(
+    "AUDITORIAS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_auditorias"),
+)
+LIMITE_CACHE_MB = float(os.environ.get("AUDITORIAS_CACHE_MAX_MB", "512"))
+EDAD_MAX_TEMPORAL_S = 10 * 60 # Un .tmp más antiguo quedó de una escritura interrumpida
+
+
+class CacheParquet:
+    """
+    Cache en disco de DataFrames ya normalizados, direccionada por el hash del contenido.
+
+    Cada entrada es un archivo '<huella>-v<version>.parquet'. Las entradas de otra versión de
+    normalización se descartan, y al superar el límite se eliminan las menos usadas (LRU por mtime).
+    """
+
+    def __init__(self, directorio=None, limite_mb=None):
+        self.directorio = directorio or DIRECTORIO_CACHE
+        limite_mb = LIMITE_CACHE_MB if limite_mb is None else limite_mb
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+
+    def _ruta(self, huella, version):
+        return os.path.join(self.directorio, f"{huella}-v{version}.parquet")
+
+    def obtener(self, huella, version):
+        """Devuelve el DataFrame guardado para (huella, version) o None si no existe."""
+        ruta = self._ruta(huella, version)
+        try:
+            data = pd.read_parquet(ruta)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        # Marcar la entrada como usada recientemente para el orden LRU
+        os.utime(ruta, None)
+        return data
+
+    def guardar(self, huella, version, data):
+        """Guarda el DataFrame en la cache. Devuelve False si no se pudo serializar."""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(huella, version)
+        # Nombre temporal único: las sesiones de Streamlit son hilos del mismo proceso
+        fd, ruta_temporal = tempfile.mkstemp(dir=self.directorio, prefix=f"{huella}-", suffix=".tmp")
+        os.close(fd)
+        try:
+            data.to_parquet(ruta_temporal)
+            os.replace(ruta_temporal, ruta) # Escritura atómica: nunca se lee un archivo a medias
+        except Exception:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            return False
+        self._recortar(version)
+        return True
+
+    def _recortar(self, version):
+        """
+        Elimina entradas de otras versiones y, si se supera el límite, las menos usadas.
+
+        Los .tmp de más de EDAD_MAX_TEMPORAL_S (escrituras interrumpidas) se eliminan; los recientes son
+        escrituras en curso de otra sesión: no se tocan, pero cuentan para el límite.
+        """
+        sufijo = f"-v{version}.parquet"
+        entradas = []
+        en_curso = 0
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            with suppress(FileNotFoundError): # Otra sesión pudo borrarla en paralelo
+                if nombre.endswith(".tmp"):
+                    info = os.stat(ruta)
+                    if time.time() - info.st_mtime > EDAD_MAX_TEMPORAL_S:
+                        os.remove(ruta)
+                    else:
+                        en_curso += info.st_size
+                    continue
+                if not nombre.endswith(".parquet"):
+                    continue
+                if not nombre.endswith(sufijo):
+                    os.remove(ruta) # Normalización obsoleta
+                    continue
+                info = os.stat(ruta)
+                entradas.append((info.st_mtime, info.st_size, ruta))
+
+        total = en_curso + sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.limite_bytes:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(ruta)
+            total -= tamano
+
+    def limpiar(self):
+        """Elimina todas las entradas de la cache, también los .tmp (una escritura en curso solo falla)."""
+        if not os.path.isdir(self.directorio):
+            return
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith((".parquet", ".tmp")):
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directorio, nombre))
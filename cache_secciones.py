@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memoria máxima para resultados de secciones (configurable por variable de entorno)
+LIMITE_SECCIONES_MB = float(os.environ.get("AUDITORIAS_CACHE_SECCIONES_MB", "256"))
+
+
+def tamano_aproximado(valor):
+    """Bytes aproximados que ocupa un resultado (DataFrames, Series, arreglos y contenedores de ellos)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheSecciones:
+    """
+    Cache en memoria de los resultados de cada sección, por (huella del dataset, sección, parámetros).
+
+    Se comparte entre reruns y sesiones del mismo proceso. Al superar el límite de memoria se
+    descartan los resultados usados hace más tiempo (LRU). Lleva aciertos y fallos por sección.
+    Los resultados se comparten: quien los usa no debe modificarlos.
+    """
+
+    def __init__(self, limite_mb=None):
+        limite_mb = LIMITE_SECCIONES_MB if limite_mb is None else limite_mb
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.entradas = OrderedDict() # clave -> (valor, tamaño)
+        self.bytes_usados = 0
+        self.aciertos = {}
+        self.fallos = {}
+        self._candado = threading.Lock()
+
+    def obtener(self, huella, seccion, parametros, calcular):
+        """
+        Devuelve el resultado de la sección, calculándolo con calcular() solo si no está guardado.
+
+        Sin huella (dataset no identificado) se calcula siempre y no se guarda.
+        """
+        clave = (huella, seccion, parametros)
+        with self._candado:
+            if huella is not None and clave in self.entradas:
+                self.entradas.move_to_end(clave)
+                self.aciertos[seccion] = self.aciertos.get(seccion, 0) + 1
+                return self.entradas[clave][0]
+            self.fallos[seccion] = self.fallos.get(seccion, 0) + 1
+
+        valor = calcular()
+        if huella is None:
+            return valor
+
+        tamano = tamano_aproximado(valor)
+        with self._candado:
+            if tamano > self.limite_bytes: # No cabe: se devuelve sin guardar
+                return valor
+            if clave in self.entradas: # Otra sesión lo calculó en paralelo
+                self.bytes_usados -= self.entradas.pop(clave)[1]
+            self.entradas[clave] = (valor, tamano)
+            self.bytes_usados += tamano
+            while self.bytes_usados > self.limite_bytes:
+                _, (_, tamano_descartado) = self.entradas.popitem(last=False)
+                self.bytes_usados -= tamano_descartado
+        return valor
+
+    def estadisticas(self):
+        """DataFrame con aciertos, fallos y resultados guardados por sección."""
+        with self._candado:
+            guardadas = {}
+            for (_, seccion, _), _ in self.entradas.items():
+                guardadas[seccion] = guardadas.get(seccion, 0) + 1
+            secciones = sorted(set(self.aciertos) | set(self.fallos))
+            return pd.DataFrame({
+                "Sección": secciones,
+                "Aciertos": [self.aciertos.get(s, 0) for s in secciones],
+                "Fallos": [self.fallos.get(s, 0) for s in secciones],
+                "Guardados": [guardadas.get(s, 0) for s in secciones],
+            })
+
+    def limpiar(self):
+        """Elimina todos los resultados guardados (los contadores se mantienen)."""
+        with self._candado:
+            self.entradas.clear()
+            self.bytes_usados = 0
+
+
+# Instancia única del proceso (compartida por la app y el reporte de pt)
+cache_secciones = CacheSecciones()
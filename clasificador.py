@@ -0,0 +1,74 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class ClasificadorObservaciones:
+    """
+    Clasificador de observaciones en una sola pasada (autómata Aho-Corasick).
+
+    Se construye una vez con todas las listas de palabras clave, cada una asociada a un bit.
+    `buscar` recorre el texto una sola vez y devuelve la máscara con los bits de todas las listas
+    que tienen alguna palabra contenida en el texto. Los `exactos` se comparan con el texto
+    completo (sin espacios en los extremos) en lugar de buscarse como subcadena.
+    """
+
+    def __init__(self, patrones, exactos=None):
+        self.transiciones = [{}]
+        self.fallos = [0]
+        self.salidas = [0]
+        for bit, palabras in patrones.items():
+            for palabra in palabras:
+                self._agregar(palabra, bit)
+        self._construir_fallos()
+
+        self.exactos = {}
+        for bit, textos in (exactos or {}).items():
+            for texto in textos:
+                self.exactos[texto] = self.exactos.get(texto, 0) | bit
+
+    def _agregar(self, palabra, bit):
+        nodo = 0
+        for caracter in palabra:
+            siguiente = self.transiciones[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self.transiciones)
+                self.transiciones[nodo][caracter] = siguiente
+                self.transiciones.append({})
+                self.fallos.append(0)
+                self.salidas.append(0)
+            nodo = siguiente
+        self.salidas[nodo] |= bit
+
+    def _construir_fallos(self):
+        """Enlaces de fallo por BFS; cada nodo hereda las salidas de su enlace de fallo."""
+        cola = deque(self.transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self.transiciones[nodo].items():
+                fallo = self.fallos[nodo]
+                while fallo and caracter not in self.transiciones[fallo]:
+                    fallo = self.fallos[fallo]
+                self.fallos[hijo] = self.transiciones[fallo].get(caracter, 0)
+                self.salidas[hijo] |= self.salidas[self.fallos[hijo]]
+                cola.append(hijo)
+
+    def buscar(self, texto):
+        """Devuelve la máscara de bits de las categorías presentes en el texto."""
+        transiciones, fallos, salidas = self.transiciones, self.fallos, self.salidas
+        nodo = 0
+        bits = 0
+        for caracter in texto:
+            while nodo and caracter not in transiciones[nodo]:
+                nodo = fallos[nodo]
+            nodo = transiciones[nodo].get(caracter, 0)
+            bits |= salidas[nodo]
+        return bits | self.exactos.get(texto.strip(), 0)
+
+    def clasificar(self, serie):
+        """Máscara de bits por fila (np.uint32). Cada texto distinto se recorre una sola vez."""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+        mascaras = [self.buscar(texto) if isinstance(texto, str) else 0 for texto in unicos]
+        mascaras.append(self.buscar('')) # NaN se trata como texto vacío
+        return np.asarray(mascaras, dtype=np.uint32)[codigos]
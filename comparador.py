@@ -1,12 +1,15 @@
+import time
+_inicio_script = time.perf_counter()
 import os
-import pandas as pd
 import streamlit as st
+from arranque import reportar_inicio
 
 st.title("Comparador de Estructura de Archivos XLSX con Progreso")
 
 folder_path = st.text_input("Ingrese la ruta de la carpeta con los archivos XLSX:")
 
 if folder_path:
+    from esquemas import CatalogoEsquemas, clases_equivalencia, diferencias_entre_clases, tipos_distintos
     try:
         st.write("🔄 Buscando archivos XLSX en la carpeta...")
         xlsx_files = [f for f in os.listdir(folder_path) if f.endswith(".xlsx")]
@@ -19,51 +22,53 @@ if folder_path:
             progress_bar = st.progress(0)
             status_text = st.empty()  # Espacio para mostrar el mensaje dinámico
 
-            def compare_structure(file1, file2):
-                df1 = pd.read_excel(os.path.join(folder_path, file1), sheet_name="Datos")
-                df2 = pd.read_excel(os.path.join(folder_path, file2), sheet_name="Datos")
-
-                missing_in_df1 = set(df2.columns) - set(df1.columns)
-                missing_in_df2 = set(df1.columns) - set(df2.columns)
-
-                diff_report = []
-                if missing_in_df1:
-                    diff_report.append(f"⚠️ Columnas faltantes en **{file1}**: {missing_in_df1}")
-                if missing_in_df2:
-                    diff_report.append(f"⚠️ Columnas faltantes en **{file2}**: {missing_in_df2}")
-
-                return diff_report if diff_report else "✅ Estructura idéntica."
-
-            differences_report = []
-            total_comparisons = len(xlsx_files) * (len(xlsx_files) - 1) // 2
-            comparison_count = 0
-
-            with st.status("Comparando estructura de archivos XLSX...", expanded=True) as status:
-                for i in range(len(xlsx_files)):
-                    for j in range(i + 1, len(xlsx_files)):
-                        file1, file2 = xlsx_files[i], xlsx_files[j]
-
-                        # Actualizar mensaje en pantalla
-                        comparison_count += 1
-                        progress_bar.progress(comparison_count / total_comparisons)
-                        status_text.write(f"🔍 Comparando archivo {comparison_count} de {total_comparisons}: **{file1} vs {file2}**")
-
-                        differences = compare_structure(file1, file2)
-                        if isinstance(differences, list):
-                            differences_report.append((file1, file2, differences))
-
-                status.update(label="✅ Comparación completa.", state="complete", expanded=False)
-
-            if differences_report:
+            # El catálogo de la carpeta recuerda el esquema de cada archivo (por mtime y tamaño): solo los
+            # archivos nuevos o modificados se leen, en paralelo y solo su encabezado y una muestra de filas
+            catalogo = CatalogoEsquemas(folder_path)
+            pendientes = catalogo.pendientes(xlsx_files)
+
+            def al_avanzar(hechos, total, file):
+                progress_bar.progress(hechos / total)
+                status_text.write(f"🔍 Leído archivo {hechos} de {total}: **{file}**")
+
+            with st.status(f"Leyendo encabezados de {len(pendientes)} archivos nuevos o modificados...", expanded=True) as status:
+                entradas = catalogo.escanear(xlsx_files, al_avanzar)
+                progress_bar.progress(1.0)
+                status.update(label=f"✅ Comparación completa ({len(pendientes)} archivos leídos, {len(xlsx_files) - len(pendientes)} desde el catálogo).", state="complete", expanded=False)
+
+            esquemas = {}
+            for file, entrada in entradas.items():
+                if "error" in entrada:
+                    st.error(f"❌ No se pudo leer **{file}**: {entrada['error']}")
+                else:
+                    esquemas[file] = entrada
+
+            # Archivos con las mismas columnas forman una clase: las diferencias se informan entre clases
+            clases = clases_equivalencia({file: esquema["columnas"] for file, esquema in esquemas.items()})
+            if len(clases) > 1:
+                st.warning(f"⚠️ Se encontraron {len(clases)} estructuras distintas:")
+                for i, (columnas, archivos) in enumerate(clases, start=1):
+                    with st.expander(f"Estructura {i}: {len(archivos)} archivos, {len(columnas)} columnas"):
+                        for file in archivos:
+                            st.write(f" - {file}")
                 st.warning("⚠️ Detalles de diferencias estructurales encontradas:")
-                for file1, file2, details in differences_report:
-                    st.write(f"🔍 **{file1} vs {file2}**")
-                    for detail in details:
-                        st.write(f" - {detail}")
-            else:
+                for i, j, faltan_en_i, faltan_en_j in diferencias_entre_clases(clases):
+                    st.write(f"🔍 **Estructura {i + 1} vs Estructura {j + 1}**")
+                    if faltan_en_i:
+                        st.write(f" - ⚠️ Columnas faltantes en **Estructura {i + 1}**: {set(faltan_en_i)}")
+                    if faltan_en_j:
+                        st.write(f" - ⚠️ Columnas faltantes en **Estructura {j + 1}**: {set(faltan_en_j)}")
+            elif clases:
                 st.success("✅ Todos los archivos tienen la misma estructura.")
 
+            # Misma columna con distinto tipo de dato entre archivos (según la muestra de filas del catálogo)
+            distintos = tipos_distintos(esquemas)
+            if distintos:
+                with st.expander(f"⚠️ {len(distintos)} columnas con tipos de dato distintos entre archivos"):
+                    for columna, tipos in distintos.items():
+                        st.write(f"**{columna}**: " + "; ".join(f"{tipo} en {len(archivos)} archivos" for tipo, archivos in tipos.items()))
+
     except Exception as e:
         st.error(f"❌ Error al procesar archivos: {e}")
 
-
+reportar_inicio(st, _inicio_script, "comparador.py")
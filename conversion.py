@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import suppress
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Conversión masiva de CSV, compartida por convert.py y verificar_formato.py (sin Streamlit).
+# Cada CSV se lee por bloques con pyarrow.csv y cada bloque se escribe en cuanto llega, calculando su suma
+# de control en esa misma pasada. Parquet y Arrow se verifican releyendo la salida contra esa suma; XLSX
+# solo por los errores de escritura y la pérdida de precisión que registra el escritor.
+
+FORMATOS = ("xlsx", "parquet", "arrow")
+EXTENSIONES = {"xlsx": ".xlsx", "parquet": ".parquet", "arrow": ".arrow"}
+CARPETA_SALIDA = "archivos_convertidos"
+HOJA_DATOS = "Datos"
+TAMANO_BLOQUE = 4 * 1024 * 1024 # Bytes de CSV por bloque leído
+MAX_FILAS_XLSX = 1048576 # Límite de filas de una hoja de Excel (incluye el encabezado)
+MAX_ENTERO_EXACTO_XLSX = 2 ** 53 # Excel guarda números como double: enteros mayores pierden precisión
+
+_COLUMNA_CON_ERROR = re.compile(r"In CSV column #(\d+)")
+
+
+class SumaControl:
+    """
+    Suma de control de una tabla que se escribe por lotes: filas, y por columna nulos y SHA-256 de sus valores.
+
+    El hash se calcula sobre el texto de cada valor (cast a string de Arrow) y sus largos, así no depende
+    de cómo se dividieron los lotes.
+    """
+
+    def __init__(self, columnas):
+        self.filas = 0
+        self.nulos = dict.fromkeys(columnas, 0)
+        self._hashes = {columna: hashlib.sha256() for columna in columnas}
+
+    def agregar(self, lote):
+        self.filas += lote.num_rows
+        for columna, arreglo in zip(lote.schema.names, lote.columns):
+            self.nulos[columna] += arreglo.null_count
+            texto = pc.fill_null(pc.cast(arreglo, pa.string()), "\x00") # Nulo distinto de ""
+            desplazamientos = np.frombuffer(texto.buffers()[1], dtype=np.int32)[texto.offset:texto.offset + len(texto) + 1]
+            hash_columna = self._hashes[columna]
+            hash_columna.update(np.diff(desplazamientos).tobytes())
+            if len(texto):
+                hash_columna.update(memoryview(texto.buffers()[2])[desplazamientos[0]:desplazamientos[-1]])
+
+    def como_dict(self):
+        return {
+            "filas": self.filas,
+            "columnas": {
+                columna: {"nulos": self.nulos[columna], "sha256": self._hashes[columna].hexdigest()}
+                for columna in self.nulos
+            },
+        }
+
+
+def _lector_csv(ruta, como_texto):
+    return pacsv.open_csv(
+        ruta,
+        read_options=pacsv.ReadOptions(block_size=TAMANO_BLOQUE),
+        # Celdas vacías como nulos, como pd.read_csv
+        convert_options=pacsv.ConvertOptions(
+            strings_can_be_null=True,
+            column_types={columna: pa.string() for columna in como_texto},
+        ),
+    )
+
+
+class _EscritorXlsx:
+    """
+    Escritor por lotes a la hoja "Datos" con xlsxwriter en constant_memory, que registra lo que se pierde.
+
+    Lo que se pierde sale de los códigos de retorno de xlsxwriter (valores truncados o fuera de rango) y
+    de los enteros mayores que MAX_ENTERO_EXACTO_XLSX; el archivo escrito no se vuelve a leer.
+    """
+
+    def __init__(self, ruta, esquema):
+        import xlsxwriter
+
+        self.libro = xlsxwriter.Workbook(ruta, {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            "strings_to_urls": False,
+            "strings_to_numbers": False,
+            "nan_inf_to_errors": True,
+            # pyarrow lee '2024-01-01T10:00:00Z' como timestamp con zona horaria, que Excel no admite:
+            # se escribe la hora tal cual (UTC), sin la zona
+            "remove_timezone": True,
+        })
+        self.hoja = self.libro.add_worksheet(HOJA_DATOS)
+        self.hoja.write_row(0, 0, esquema.names)
+        self.fila = 1
+        self.problemas = []
+
+    def escribir(self, lote):
+        if self.fila + lote.num_rows > MAX_FILAS_XLSX:
+            raise ValueError(f"El archivo supera el máximo de {MAX_FILAS_XLSX:,} filas de Excel: usa Parquet o Arrow.")
+        columnas = lote.schema.names
+        valores = [arreglo.to_pylist() for arreglo in lote.columns]
+        for columna, valores_columna in zip(columnas, valores):
+            if any(isinstance(valor, int) and abs(valor) > MAX_ENTERO_EXACTO_XLSX for valor in valores_columna):
+                self.problemas.append(f"'{columna}' tiene enteros mayores que {MAX_ENTERO_EXACTO_XLSX:,}, que Excel no guarda exactos")
+        for valores_fila in zip(*valores):
+            for j, valor in enumerate(valores_fila):
+                if valor is not None and self.hoja.write(self.fila, j, valor) < 0:
+                    self.problemas.append(f"Fila {self.fila + 1}, columna '{columnas[j]}': valor truncado o fuera de rango en Excel")
+            self.fila += 1
+
+    def cerrar(self):
+        self.libro.close()
+
+
+def _convertir_una_vez(ruta_csv, ruta_temporal, formato, como_texto):
+    """Una pasada de lectura y escritura. Devuelve (suma de control, escritor)."""
+    import pyarrow.parquet as pq
+
+    lector = _lector_csv(ruta_csv, como_texto)
+    esquema = lector.schema
+    suma = SumaControl(esquema.names)
+    if formato == "xlsx":
+        escritor = _EscritorXlsx(ruta_temporal, esquema)
+    elif formato == "parquet":
+        escritor = pq.ParquetWriter(ruta_temporal, esquema)
+    else:
+        escritor = pa.ipc.new_file(ruta_temporal, esquema)
+    try:
+        for lote in lector:
+            suma.agregar(lote)
+            if formato == "xlsx":
+                escritor.escribir(lote)
+            else:
+                escritor.write_batch(lote)
+    finally:
+        if formato == "xlsx":
+            escritor.cerrar()
+        else:
+            escritor.close()
+    return suma, escritor
+
+
+def _verificar(suma, escritor, ruta, formato):
+    """
+    Compara lo que quedó en el archivo con la suma de control de lo leído del CSV.
+
+    Parquet y Arrow: el archivo se vuelve a leer lote a lote (Arrow mapeado en memoria, Parquet con
+    iter_batches) y se comparan filas, nulos y SHA-256 por columna con los del CSV.
+    XLSX: no hay suma de control de lo escrito; solo se informa lo que registró el escritor (valores que
+    xlsxwriter rechazó o truncó y enteros que Excel no guarda exactos).
+    Devuelve la lista de diferencias (vacía si no se detectó pérdida de datos).
+    """
+    import pyarrow.parquet as pq
+
+    if formato == "xlsx":
+        return list(escritor.problemas)
+
+    escrita = SumaControl(list(suma.nulos))
+    if formato == "parquet":
+        esquema = escritor.schema
+        for lote in pq.ParquetFile(ruta).iter_batches():
+            # Parquet guarda timestamp[s] como [ms]: el lote vuelve al tipo leído del CSV antes del hash
+            escrita.agregar(lote.cast(esquema))
+    else:
+        with pa.memory_map(ruta) as fuente:
+            lector = pa.ipc.open_file(fuente)
+            for i in range(lector.num_record_batches):
+                escrita.agregar(lector.get_batch(i))
+
+    diferencias = []
+    if escrita.filas != suma.filas:
+        diferencias.append(f"Se leyeron {suma.filas:,} filas y se escribieron {escrita.filas:,}")
+    leidas = suma.como_dict()["columnas"]
+    for columna, datos in escrita.como_dict()["columnas"].items():
+        if datos["nulos"] != leidas[columna]["nulos"]:
+            diferencias.append(f"'{columna}': {leidas[columna]['nulos']:,} celdas vacías en el CSV y {datos['nulos']:,} en la salida")
+        elif datos["sha256"] != leidas[columna]["sha256"]:
+            diferencias.append(f"'{columna}': los valores escritos no coinciden con los leídos")
+    return diferencias
+
+
+def convertir_csv(ruta_csv, carpeta_salida, formato):
+    """
+    Convierte un CSV al formato indicado en carpeta_salida y verifica la salida (ver _verificar).
+
+    Si una columna que pyarrow dedujo numérica con el primer bloque trae texto más adelante, la
+    conversión se repite con esa columna como texto. Junto a la salida queda '<archivo>.sumas.json'
+    con la suma de control. Devuelve un dict con archivo, salida, filas, columnas y diferencias.
+    """
+    nombre = os.path.splitext(os.path.basename(ruta_csv))[0]
+    ruta = os.path.join(carpeta_salida, nombre + EXTENSIONES[formato])
+    # Nombre temporal único: dos sesiones de Streamlit (hilos del mismo proceso) pueden convertir el mismo CSV
+    fd, ruta_temporal = tempfile.mkstemp(dir=carpeta_salida, prefix=nombre + "-", suffix=".tmp")
+    os.close(fd)
+    como_texto = set()
+    try:
+        while True:
+            try:
+                suma, escritor = _convertir_una_vez(ruta_csv, ruta_temporal, formato, como_texto)
+                break
+            except pa.ArrowInvalid as e:
+                coincidencia = _COLUMNA_CON_ERROR.search(str(e))
+                if coincidencia is None:
+                    raise
+                columna = _lector_csv(ruta_csv, como_texto).schema.names[int(coincidencia.group(1))]
+                if columna in como_texto:
+                    raise
+                como_texto.add(columna)
+        diferencias = _verificar(suma, escritor, ruta_temporal, formato)
+        os.replace(ruta_temporal, ruta) # Escritura atómica: nunca queda un archivo a medias
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(ruta_temporal)
+
+    resultado = {
+        "archivo": os.path.basename(ruta_csv),
+        "salida": ruta,
+        "filas": suma.filas,
+        # Qué se verificó: la suma de control releyendo la salida, o solo los errores de escritura (XLSX)
+        "verificacion": "escritura" if formato == "xlsx" else "sha256",
+        "columnas_como_texto": sorted(como_texto),
+        "diferencias": diferencias,
+        "suma_control": suma.como_dict(),
+    }
+    with open(f"{ruta}.sumas.json", "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=1)
+    return resultado
+
+
+def _convertir_seguro(ruta_csv, carpeta_salida, formato):
+    """convertir_csv para el pool de procesos: los errores vuelven en el resultado."""
+    try:
+        return convertir_csv(ruta_csv, carpeta_salida, formato)
+    except Exception as e:
+        return {"archivo": os.path.basename(ruta_csv), "error": str(e)}
+
+
+def convertir_carpeta(carpeta, formato, al_avanzar=None, max_procesos=None):
+    """
+    Convierte todos los CSV de la carpeta en carpeta/archivos_convertidos, un archivo por proceso del pool.
+
+    al_avanzar(hechos, total, resultado) se llama cada vez que termina uno. Devuelve
+    (carpeta de salida, resultados en orden de archivo).
+    """
+    archivos = sorted(f for f in os.listdir(carpeta) if f.endswith(".csv"))
+    carpeta_salida = os.path.join(carpeta, CARPETA_SALIDA)
+    os.makedirs(carpeta_salida, exist_ok=True)
+    max_procesos = max_procesos or min(len(archivos), os.cpu_count() or 1)
+
+    resultados = []
+    if max_procesos <= 1:
+        for hechos, archivo in enumerate(archivos, start=1):
+            resultados.append(_convertir_seguro(os.path.join(carpeta, archivo), carpeta_salida, formato))
+            if al_avanzar is not None:
+                al_avanzar(hechos, len(archivos), resultados[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+            futuros = [pool.submit(_convertir_seguro, os.path.join(carpeta, archivo), carpeta_salida, formato) for archivo in archivos]
+            for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                resultados.append(futuro.result())
+                if al_avanzar is not None:
+                    al_avanzar(hechos, len(archivos), resultados[-1])
+    return carpeta_salida, sorted(resultados, key=lambda resultado: resultado["archivo"])
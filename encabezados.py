@@ -0,0 +1,33 @@
+from openpyxl.cell.cell import ERROR_CODES
+
+# Lectura de celdas y encabezados como la hace pd.read_excel, sin pandas: la comparten ingesta.py
+# (carga de la app) y esquemas.py (comparador y unificador), así todos nombran igual las columnas.
+
+
+def convertir_celda(valor):
+    """Convierte el valor de una celda igual que el lector openpyxl de pandas."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str) and valor in ERROR_CODES:
+        return float("nan")
+    return valor
+
+
+def nombres_columnas(encabezado):
+    """Nombres de columna al estilo de pd.read_excel ('Unnamed: i' para vacías, '.1' para duplicadas)."""
+    encabezado = [convertir_celda(v) for v in encabezado]
+    while encabezado and encabezado[-1] == "":
+        encabezado.pop()
+    nombres = []
+    vistos = {}
+    for i, nombre in enumerate(encabezado):
+        nombre = f"Unnamed: {i}" if nombre == "" else nombre
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import suppress
+from datetime import date, datetime, time
+
+import openpyxl
+
+from encabezados import nombres_columnas
+
+HOJA_DATOS = "Datos"
+MUESTRA_TIPOS = 200 # Filas de datos que se leen para deducir el tipo de cada columna
+
+# Catálogo de esquemas: archivo JSON dentro de la carpeta escaneada
+NOMBRE_CATALOGO = ".catalogo_esquemas.json"
+VERSION_CATALOGO = 2 # 2: nombres de columna compartidos con ingesta (encabezados.py)
+
+
+def _nombres_texto(encabezado):
+    """Nombres de columna como en la carga de la app, convertidos a texto como hace df.columns.map(str)."""
+    return [str(nombre) for nombre in nombres_columnas(encabezado)]
+
+
+def _tipo_valores(valores):
+    """Tipo de una columna según una muestra de sus valores: int, float, bool, datetime, str, mixto o vacío."""
+    tipos = set()
+    for valor in valores:
+        if valor is None:
+            continue
+        if isinstance(valor, bool):
+            tipos.add("bool")
+        elif isinstance(valor, int):
+            tipos.add("int")
+        elif isinstance(valor, float):
+            tipos.add("float")
+        elif isinstance(valor, (datetime, date, time)):
+            tipos.add("datetime")
+        else:
+            tipos.add("str")
+    if tipos == {"int", "float"}:
+        return "float"
+    if len(tipos) == 1:
+        return tipos.pop()
+    return "mixto" if tipos else "vacío"
+
+
+def _abrir_hoja(ruta, hoja):
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    if hoja not in libro.sheetnames:
+        libro.close()
+        raise ValueError(f"El archivo no tiene la hoja '{hoja}'.")
+    return libro, libro[hoja]
+
+
+def leer_esquema(ruta, hoja=HOJA_DATOS):
+    """
+    Columnas de la hoja y tipo de cada una según las primeras MUESTRA_TIPOS filas de datos.
+
+    Se lee con openpyxl en modo read_only, sin cargar el resto de la hoja. Los nombres de columna
+    quedan como los deja pd.read_excel: vacíos como 'Unnamed: i' y repetidos con sufijo '.1', '.2'...
+    """
+    libro, hoja = _abrir_hoja(ruta, hoja)
+    try:
+        filas = hoja.iter_rows(min_row=1, max_row=MUESTRA_TIPOS + 1, values_only=True)
+        columnas = _nombres_texto(next(filas, ()))
+        muestra = [fila[:len(columnas)] for fila in filas]
+    finally:
+        libro.close()
+    return {
+        "columnas": columnas,
+        "tipos": {
+            columna: _tipo_valores(fila[i] if i < len(fila) else None for fila in muestra)
+            for i, columna in enumerate(columnas)
+        },
+    }
+
+
+def huella_esquema(columnas):
+    """Hash del conjunto de columnas: dos archivos con las mismas columnas (en cualquier orden) comparten huella."""
+    return hashlib.sha256("\x1f".join(sorted(set(columnas))).encode()).hexdigest()
+
+
+def clases_equivalencia(esquemas):
+    """
+    Agrupa archivos por huella de esquema.
+
+    Recibe {archivo: columnas} y devuelve una lista de (columnas, [archivos]), de la clase con más
+    archivos a la con menos (los archivos de cada clase, en orden alfabético).
+    """
+    clases = {}
+    for archivo, columnas in esquemas.items():
+        clase = clases.setdefault(huella_esquema(columnas), (columnas, []))
+        clase[1].append(archivo)
+    return sorted(
+        ((columnas, sorted(archivos)) for columnas, archivos in clases.values()),
+        key=lambda clase: (-len(clase[1]), clase[1][0]),
+    )
+
+
+def diferencias_entre_clases(clases):
+    """Por cada par de clases distintas: (i, j, columnas solo en la clase j, columnas solo en la clase i)."""
+    diferencias = []
+    for i in range(len(clases)):
+        for j in range(i + 1, len(clases)):
+            columnas_i, columnas_j = set(clases[i][0]), set(clases[j][0])
+            diferencias.append((i, j, sorted(columnas_j - columnas_i), sorted(columnas_i - columnas_j)))
+    return diferencias
+
+
+def _leer_esquema_seguro(ruta, hoja):
+    """
+    leer_esquema para el pool de procesos: los errores vuelven como {'error': mensaje}.
+
+    Los de OSError (por ejemplo, un libro bloqueado porque está abierto en Excel en Windows) no dependen
+    del contenido: vuelven marcados con 'reintentar' para que el próximo escaneo lo lea de nuevo.
+    """
+    try:
+        return leer_esquema(ruta, hoja)
+    except OSError as e:
+        return {"error": str(e), "reintentar": True}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+class CatalogoEsquemas:
+    """
+    Catálogo persistente de esquemas de una carpeta: archivo -> columnas y tipos.
+
+    Se guarda como JSON dentro de la carpeta. Cada entrada recuerda el mtime y el tamaño del archivo
+    que la generó; si alguno cambió, el archivo se vuelve a leer. Los errores de contenido (sin hoja
+    "Datos", no es un xlsx válido) también se guardan, así un archivo inválido que no cambió no se
+    reintenta; los de acceso al archivo se reintentan en cada escaneo.
+    """
+
+    def __init__(self, carpeta, hoja=HOJA_DATOS):
+        self.carpeta = carpeta
+        self.hoja = hoja
+        self.ruta = os.path.join(carpeta, NOMBRE_CATALOGO)
+        self.entradas = {}
+        with suppress(FileNotFoundError, ValueError, OSError):
+            with open(self.ruta, encoding="utf-8") as f:
+                guardado = json.load(f)
+            if guardado.get("version") == VERSION_CATALOGO and guardado.get("hoja") == hoja:
+                self.entradas = guardado.get("archivos", {})
+
+    def _firma(self, archivo):
+        info = os.stat(os.path.join(self.carpeta, archivo))
+        return info.st_mtime_ns, info.st_size
+
+    def pendientes(self, archivos):
+        """Archivos sin entrada, con un error de acceso o cuya entrada es de otra versión del archivo (mtime o tamaño distintos)."""
+        pendientes = []
+        for archivo in archivos:
+            entrada = self.entradas.get(archivo)
+            if entrada is None or entrada.get("reintentar") or (entrada["mtime_ns"], entrada["tamano"]) != self._firma(archivo):
+                pendientes.append(archivo)
+        return pendientes
+
+    def escanear(self, archivos, al_avanzar=None, max_procesos=None):
+        """
+        Actualiza el catálogo para `archivos` y devuelve {archivo: entrada} de todos ellos.
+
+        Solo se leen los pendientes, en un pool de procesos. al_avanzar(hechos, total, archivo) se llama
+        cada vez que termina uno. Las entradas de archivos que ya no están en la carpeta se descartan.
+        """
+        pendientes = self.pendientes(archivos)
+        firmas = {archivo: self._firma(archivo) for archivo in pendientes}
+        max_procesos = max_procesos or min(len(pendientes), os.cpu_count() or 1)
+
+        def registrar(archivo, esquema, hechos):
+            mtime_ns, tamano = firmas[archivo]
+            self.entradas[archivo] = {"mtime_ns": mtime_ns, "tamano": tamano, **esquema}
+            if al_avanzar is not None:
+                al_avanzar(hechos, len(pendientes), archivo)
+
+        if max_procesos <= 1:
+            for hechos, archivo in enumerate(pendientes, start=1):
+                registrar(archivo, _leer_esquema_seguro(os.path.join(self.carpeta, archivo), self.hoja), hechos)
+        else:
+            with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+                futuros = {
+                    pool.submit(_leer_esquema_seguro, os.path.join(self.carpeta, archivo), self.hoja): archivo
+                    for archivo in pendientes
+                }
+                for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                    registrar(futuros[futuro], futuro.result(), hechos)
+
+        presentes = set(archivos)
+        descartadas = [archivo for archivo in self.entradas if archivo not in presentes]
+        for archivo in descartadas:
+            del self.entradas[archivo]
+        if pendientes or descartadas:
+            self.guardar()
+        return {archivo: self.entradas[archivo] for archivo in archivos}
+
+    def guardar(self):
+        """Escribe el catálogo (escritura atómica). Devuelve False si la carpeta no admite escritura."""
+        ruta_temporal = None
+        try:
+            # Nombre temporal único: dos sesiones (hilos del mismo proceso) pueden escanear la misma carpeta
+            fd, ruta_temporal = tempfile.mkstemp(dir=self.carpeta, prefix=NOMBRE_CATALOGO + ".", suffix=".tmp")
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION_CATALOGO, "hoja": self.hoja, "archivos": self.entradas}, f, ensure_ascii=False)
+            os.replace(ruta_temporal, self.ruta)
+        except OSError:
+            if ruta_temporal is not None:
+                with suppress(OSError):
+                    os.remove(ruta_temporal)
+            return False
+        return True
+
+
+def tipos_distintos(esquemas):
+    """Columnas con tipo distinto entre archivos: {columna: {tipo: [archivos]}} (sin contar 'vacío')."""
+    por_columna = {}
+    for archivo, esquema in esquemas.items():
+        for columna, tipo in esquema.get("tipos", {}).items():
+            if tipo != "vacío":
+                por_columna.setdefault(columna, {}).setdefault(tipo, []).append(archivo)
+    return {columna: tipos for columna, tipos in por_columna.items() if len(tipos) > 1}
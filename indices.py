@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+
+def _codigos_y_valores(serie, nulos_como_texto=False):
+    """
+    Códigos por fila y valores distintos (como texto) de una columna.
+
+    Las categóricas ya traen ambos. Con nulos_como_texto=True los nulos se tratan como el texto
+    'nan', igual que `.astype(str)`; si no, quedan con código -1.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        valores = [str(valor) for valor in serie.cat.categories]
+        if nulos_como_texto and (codigos == -1).any():
+            codigos = np.where(codigos == -1, len(valores), codigos)
+            valores.append('nan')
+        return codigos, valores
+    if nulos_como_texto:
+        serie = serie.astype(str)
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    return codigos, [str(valor) for valor in unicos]
+
+
+def _posiciones_por_codigo(codigos, cantidad):
+    """Lista con el arreglo ordenado de posiciones de fila de cada código 0..cantidad-1."""
+    orden = np.argsort(codigos, kind='stable')
+    # Cortes del arreglo ordenado donde empieza cada código (los -1, nulos, quedan al inicio y se omiten)
+    cortes = np.searchsorted(codigos[orden], np.arange(cantidad + 1))
+    return [orden[cortes[i]:cortes[i + 1]] for i in range(cantidad)]
+
+
+def construir_indice_invertido(serie):
+    """
+    Índice invertido de una columna: valor -> arreglo ordenado de posiciones de fila.
+
+    Para columnas categóricas se usa directamente el arreglo de códigos: un argsort estable
+    agrupa las posiciones de cada categoría ya ordenadas, sin comparar strings.
+    """
+    codigos, valores = _codigos_y_valores(serie)
+    posiciones = _posiciones_por_codigo(codigos, len(valores))
+    return {valor: filas for valor, filas in zip(valores, posiciones) if len(filas)}
+
+
+class IndiceTrigramas:
+    """
+    Índice de trigramas para búsquedas por subcadena (sin distinguir mayúsculas) en una columna.
+
+    Se indexan los valores distintos: cada trigrama apunta a los valores que lo contienen.
+    Una consulta intersecta las listas de sus trigramas para obtener candidatos y luego verifica
+    la subcadena solo sobre ellos. Consultas de menos de 3 caracteres recorren los valores distintos.
+    """
+
+    def __init__(self, serie):
+        codigos, valores = _codigos_y_valores(serie, nulos_como_texto=True) # Igual que .astype(str)
+        self.textos = [valor.lower() for valor in valores]
+        self.filas = _posiciones_por_codigo(codigos, len(valores))
+
+        trigramas = {}
+        for id_valor, texto in enumerate(self.textos):
+            for trigrama in {texto[i:i + 3] for i in range(len(texto) - 2)}:
+                trigramas.setdefault(trigrama, []).append(id_valor)
+        self.trigramas = {trigrama: np.asarray(ids, dtype=np.intp) for trigrama, ids in trigramas.items()}
+
+    def _candidatos(self, consulta):
+        if len(consulta) < 3:
+            return range(len(self.textos))
+        listas = []
+        for trigrama in {consulta[i:i + 3] for i in range(len(consulta) - 2)}:
+            ids = self.trigramas.get(trigrama)
+            if ids is None:
+                return []
+            listas.append(ids)
+        listas.sort(key=len)
+        candidatos = listas[0]
+        for otra in listas[1:]:
+            candidatos = np.intersect1d(candidatos, otra, assume_unique=True)
+        return candidatos
+
+    def buscar(self, consulta):
+        """Posiciones de fila (ordenadas) cuyo valor contiene la consulta."""
+        consulta = consulta.lower()
+        encontrados = [self.filas[i] for i in self._candidatos(consulta) if consulta in self.textos[i]]
+        if not encontrados:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(encontrados))
+
+
+def construir_indices(data, columnas):
+    """Índices invertidos de las columnas indicadas que existan en data."""
+    return {col: construir_indice_invertido(data[col]) for col in columnas if col in data.columns}
+
+
+def construir_indices_trigramas(data, columnas):
+    """Índices de trigramas de las columnas indicadas que existan en data."""
+    return {col: IndiceTrigramas(data[col]) for col in columnas if col in data.columns}
+
+
+def intersectar(posiciones, otras):
+    """Intersección de dos conjuntos de posiciones ordenadas (None significa todas las filas)."""
+    if posiciones is None:
+        return otras
+    return np.intersect1d(posiciones, otras, assume_unique=True)
+
+
+def filtrar_posiciones(indices, filtros):
+    """
+    Posiciones de fila que cumplen todos los filtros {columna: valor} (igualdad).
+
+    Devuelve None si no hay filtros (todas las filas). Se intersecta empezando por la lista
+    más corta, así el costo depende del tamaño del resultado y no del dataset.
+    """
+    listas = [indices[col].get(valor, np.empty(0, dtype=np.intp)) for col, valor in filtros.items()]
+    if not listas:
+        return None
+    listas.sort(key=len)
+    posiciones = listas[0]
+    for otra in listas[1:]:
+        if not len(posiciones):
+            break
+        posiciones = np.intersect1d(posiciones, otra, assume_unique=True)
+    return posiciones
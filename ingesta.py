@@ -0,0 +1,308 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from cache_parquet import CacheParquet
+from encabezados import convertir_celda, nombres_columnas
+from normalizacion import normalizar_columna
+
+# Versión del bloque de normalización. Cambiarla invalida los datos ya guardados en la cache Parquet,
+# así que hay que incrementarla cada vez que se modifique preparar_datos o la normalización de texto.
+VERSION_NORMALIZACION = 2
+
+# Lectura por bloques: filas por bloque y tamaño (MB) a partir del cual cargar_datos la usa automáticamente
+TAMANO_BLOQUE = 5000
+UMBRAL_STREAMING_MB = float(os.environ.get("AUDITORIAS_UMBRAL_STREAMING_MB", "50"))
+
+# Identificadores que se manejan como texto
+COLUMNAS_ID = ['Número de Orden de Trabajo/ ID externo', 'Rut / tecnico']
+
+# Dimensiones de baja cardinalidad que se guardan como categóricas (códigos enteros + diccionario ordenado)
+COLUMNAS_CATEGORICAS = [
+    'Nombre de Técnico/Copiar el del Wfm', 'Empresa', 'Region', 'Tipo de Auditoria',
+    'Estado de Auditoria', 'Información del Auditor', 'Patente Camioneta',
+]
+
+
+def huella_contenido(contenido):
+    """Devuelve el hash SHA-256 (hex) del contenido binario de un archivo subido."""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def _parsear_hoja(contenido, hoja):
+    """Parsea una sola hoja del libro (se ejecuta en un proceso del pool)."""
+    return pd.read_excel(io.BytesIO(contenido), sheet_name=hoja)
+
+
+def iterar_hojas(archivo, avisos, max_procesos=None):
+    """
+    Genera (hoja, df) en el orden del libro, parseando las hojas en un pool de procesos.
+
+    Las hojas que fallan no detienen la lectura: se agrega un aviso a `avisos` y se saltan.
+    Cada resultado se entrega en cuanto está listo, así pd.concat puede consumirlo sin esperar al resto.
+    """
+    contenido = _leer_bytes(archivo)
+    hojas = pd.ExcelFile(io.BytesIO(contenido)).sheet_names
+    max_procesos = max_procesos or min(len(hojas), os.cpu_count() or 1)
+
+    if max_procesos <= 1:
+        # Con una sola hoja (o un solo núcleo) el pool solo agrega costo
+        for hoja in hojas:
+            try:
+                yield hoja, _parsear_hoja(contenido, hoja)
+            except Exception as e:
+                avisos.append(f"No se pudo leer la hoja '{hoja}': {e}")
+        return
+
+    with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+        futuros = [(hoja, pool.submit(_parsear_hoja, contenido, hoja)) for hoja in hojas]
+        for hoja, futuro in futuros:
+            try:
+                yield hoja, futuro.result()
+            except Exception as e:
+                avisos.append(f"No se pudo leer la hoja '{hoja}': {e}")
+
+
+def leer_hojas(archivo, max_procesos=None):
+    """Lee todas las hojas del Excel y las concatena. Devuelve (data, avisos)."""
+    avisos = []
+    df_list = [df for _, df in iterar_hojas(archivo, avisos, max_procesos)]
+
+    if df_list:
+        data = pd.concat(df_list, ignore_index=True)
+    else:
+        data = pd.DataFrame() # DataFrame vacío si no se cargó nada
+    return data, avisos
+
+
+def _leer_bytes(archivo):
+    """Devuelve el contenido binario de un UploadedFile/BytesIO o de una ruta."""
+    if hasattr(archivo, "getvalue"):
+        return archivo.getvalue()
+    with open(archivo, "rb") as f:
+        return f.read()
+
+
+def iterar_bloques_excel(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera (hoja, df) con bloques de a lo más `tamano_bloque` filas, hoja por hoja.
+
+    Usa openpyxl en modo read_only, así que nunca se materializa el libro completo en memoria.
+    Los tipos se infieren por bloque con el mismo TextParser que usa pd.read_excel.
+    """
+    libro = openpyxl.load_workbook(io.BytesIO(_leer_bytes(archivo)), read_only=True, data_only=True, keep_links=False)
+    try:
+        for hoja in libro.worksheets:
+            hoja.reset_dimensions()
+            filas = hoja.iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                continue
+            columnas = nombres_columnas(encabezado)
+            ancho = len(columnas)
+            if not ancho:
+                continue
+
+            # IDs y Rut se mantienen como objetos: inferir por bloque los convertiría a float ('123.0')
+            # solo en los bloques donde falte algún valor
+            tipos = {col: object for col in columnas if str(col).strip() in COLUMNAS_ID}
+            bloque = []
+            filas_leidas = 0
+            vacias_pendientes = 0 # Filas vacías al final de la hoja se descartan, como en pd.read_excel
+            for fila in filas:
+                fila = [convertir_celda(v) for v in fila[:ancho]]
+                if all(v == "" for v in fila):
+                    vacias_pendientes += 1
+                    continue
+                bloque.extend([[""] * ancho for _ in range(vacias_pendientes)])
+                vacias_pendientes = 0
+                bloque.append(fila + [""] * (ancho - len(fila)))
+                if len(bloque) >= tamano_bloque:
+                    filas_leidas += len(bloque)
+                    yield hoja.title, TextParser(bloque, names=columnas, header=None, dtype=tipos).read()
+                    bloque = []
+            if bloque:
+                yield hoja.title, TextParser(bloque, names=columnas, header=None, dtype=tipos).read()
+            elif not filas_leidas:
+                # Hoja solo con encabezado: sus columnas igual forman parte del resultado
+                yield hoja.title, pd.DataFrame(columns=columnas)
+    finally:
+        libro.close()
+
+
+def normalizar_bloque(data):
+    """Normaliza columnas, textos, estado, fecha, kilometraje e IDs de un DataFrame (o de un bloque)."""
+    # Normalizar nombres de columnas
+    data.columns = data.columns.str.strip()
+
+    # Normalizar columnas clave que se usarán en varios análisis
+    cols_to_normalize_str = ['Nombre de Técnico/Copiar el del Wfm', 'Información del Auditor']
+    for col in cols_to_normalize_str:
+        if col in data.columns:
+            # Equivale a .apply(normalizar_texto) (no-strings y NaN quedan como ''),
+            # pero normalizando solo los valores distintos
+            data[col] = normalizar_columna(data[col])
+        else:
+            # Añadir la columna si falta para evitar KeyErrors posteriores
+            data[col] = ''
+
+    # Normalizar y limpiar estado de auditoría
+    if 'Estado de Auditoria' in data.columns:
+        data['Estado de Auditoria'] = data['Estado de Auditoria'].astype(str).str.strip().str.lower()
+        data['Estado de Auditoria'] = data['Estado de Auditoria'].replace({'nan': 'desconocido', '': 'desconocido'})
+    else:
+        data['Estado de Auditoria'] = 'desconocido' # Añadir si falta
+
+    # Convertir la columna de fecha a datetime (NaT si falla)
+    if 'Fecha' in data.columns:
+        data['Fecha'] = pd.to_datetime(data['Fecha'], errors='coerce')
+
+    col_km = 'Kilometraje Camioneta'
+    if col_km in data.columns:
+        # errors='coerce' convierte valores no válidos a NaN.
+        data[col_km] = pd.to_numeric(data[col_km], errors='coerce')
+    else:
+        data[col_km] = pd.NA
+
+    # Número de Orden de Trabajo y Rut se manejan como texto, con '' en lugar de 'nan'
+    for col_texto in COLUMNAS_ID:
+        if col_texto in data.columns:
+            data[col_texto] = data[col_texto].astype(str).replace('nan', '')
+        else:
+            data[col_texto] = ''
+    return data
+
+
+def finalizar_datos(data):
+    """Pasos finales sobre el DataFrame completo (tipos mixtos y filas vacías). Devuelve (data, avisos)."""
+    avisos = []
+
+    # Columnas de texto con valores mixtos (p. ej. números y strings) se pasan a string,
+    # conservando los nulos. Así el resultado es idéntico leído desde Excel o desde la cache Parquet.
+    for col in data.columns[data.dtypes == object]:
+        no_nulos = data[col].dropna()
+        if no_nulos.map(type).nunique() > 1:
+            data[col] = data[col].where(data[col].isna(), data[col].astype(str))
+
+    # Limpiar filas completamente vacías que podrían venir de hojas extra
+    original_rows = len(data)
+    data.dropna(how='all', inplace=True)
+    if len(data) < original_rows:
+        avisos.append(f"Se eliminaron {original_rows - len(data)} filas completamente vacías.")
+
+    a_categoricas(data)
+    return data, avisos
+
+
+def a_categoricas(data):
+    """
+    Convierte las dimensiones de COLUMNAS_CATEGORICAS a categóricas con categorías ordenadas.
+
+    El diccionario queda fijo al cargar: todos los DataFrames derivados (filtros, finalizadas, últimas
+    auditorías) lo comparten y los filtros y groupby trabajan sobre códigos enteros.
+    """
+    for col in COLUMNAS_CATEGORICAS:
+        if col in data.columns and not isinstance(data[col].dtype, pd.CategoricalDtype):
+            valores = data[col].dropna().unique()
+            data[col] = pd.Categorical(data[col], categories=sorted(valores, key=str))
+    return data
+
+
+def preparar_datos(data):
+    """Aplica la preparación general (columnas, textos, fechas, kilometraje, IDs). Devuelve (data, avisos)."""
+    if data.empty:
+        return data, []
+    return finalizar_datos(normalizar_bloque(data))
+
+
+class BufferColumnar:
+    """Acumula bloques normalizados columna por columna y arma el DataFrame final una sola vez."""
+
+    def __init__(self):
+        self.partes = {} # columna -> lista de Series
+        self.originales = {} # columnas que venían en el archivo, en orden de aparición
+        self.filas = 0
+
+    def agregar(self, bloque, columnas_originales=()):
+        for col in columnas_originales:
+            self.originales.setdefault(col, None)
+        bloque.index = pd.RangeIndex(self.filas, self.filas + len(bloque))
+        for col in bloque.columns:
+            self.partes.setdefault(col, []).append(bloque[col])
+        self.filas += len(bloque)
+
+    def a_dataframe(self):
+        if not self.filas:
+            return pd.DataFrame()
+        indice = pd.RangeIndex(self.filas)
+        # Igual que al concatenar el libro completo: primero las columnas del archivo y al final
+        # las que agregó la normalización
+        orden = [col for col in self.originales if col in self.partes]
+        orden += [col for col in self.partes if col not in self.originales]
+        columnas = {}
+        for col in orden:
+            partes = self.partes.pop(col) # Se libera cada lista apenas se usa
+            # Los bloques vacíos o sin ningún dato no se concatenan (pandas dejará de ignorarlos al decidir
+            # el dtype): sus filas quedan como nulos en el reindex. El dtype sale solo de los bloques con datos.
+            con_datos = [parte for parte in partes if parte.notna().any()]
+            if con_datos:
+                serie = pd.concat(con_datos) if len(con_datos) > 1 else con_datos[0]
+            else:
+                tipos = {parte.dtype for parte in partes}
+                serie = pd.Series(dtype=tipos.pop() if len(tipos) == 1 else object)
+            columnas[col] = serie if len(serie) == self.filas else serie.reindex(indice)
+        return pd.DataFrame(columnas, index=indice)
+
+
+def leer_excel_por_bloques(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee y normaliza el libro por bloques de filas. Devuelve (data, avisos).
+
+    Cada bloque se normaliza apenas se lee y se acumula en un BufferColumnar, así el pico de
+    memoria queda acotado por el tamaño del bloque y no por el del archivo.
+    """
+    buffer = BufferColumnar()
+    for _, bloque in iterar_bloques_excel(archivo, tamano_bloque):
+        originales = bloque.columns.str.strip()
+        buffer.agregar(normalizar_bloque(bloque), originales)
+    data = buffer.a_dataframe()
+    if data.empty:
+        return data, []
+    return finalizar_datos(data)
+
+
+def cargar_datos(archivo, cache=None, por_bloques=None, max_procesos=None):
+    """
+    Devuelve (data, huella, avisos) para un archivo subido.
+
+    Si el contenido ya fue procesado con la versión actual de normalización, el DataFrame
+    se lee desde la cache Parquet; si no, se parsea el Excel, se normaliza y se guarda.
+    Con por_bloques=None, los archivos sobre UMBRAL_STREAMING_MB se leen con leer_excel_por_bloques.
+    max_procesos limita el pool que parsea las hojas (1 = sin pool, por ejemplo dentro de otro pool).
+    """
+    cache = cache if cache is not None else CacheParquet()
+    contenido = archivo.getvalue()
+    huella = huella_contenido(contenido)
+
+    data = cache.obtener(huella, VERSION_NORMALIZACION)
+    if data is not None:
+        return data, huella, []
+
+    if por_bloques is None:
+        por_bloques = len(contenido) > UMBRAL_STREAMING_MB * 1024 * 1024
+
+    if por_bloques:
+        data, avisos = leer_excel_por_bloques(archivo)
+    else:
+        data, avisos = leer_hojas(archivo, max_procesos)
+        data, avisos_preparacion = preparar_datos(data)
+        avisos += avisos_preparacion
+
+    if not data.empty and not cache.guardar(huella, VERSION_NORMALIZACION, data):
+        avisos.append("No se pudo guardar el archivo procesado en la cache local.")
+    return data, huella, avisos
@@ -0,0 +1,71 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# --- Función de Normalización ---
+def normalizar_texto(texto):
+    """Normaliza texto: elimina espacios, acentos, tildes y convierte a minúsculas."""
+    if isinstance(texto, str):
+        texto = str(texto).strip().lower() # Convertir explícitamente a string por seguridad
+        nfd_form = unicodedata.normalize('NFD', texto)
+        return ''.join(c for c in nfd_form if unicodedata.category(c) != 'Mn')
+    # Maneja casos donde el input no sea string, como NaN o None
+    return '' # Devuelve string vacío si no es string para evitar errores en operaciones de string
+
+
+def normalize_text(text):
+    """Normaliza texto: minúsculas, elimina acentos, convierte a string si es necesario."""
+    if isinstance(text, str):
+        text = text.lower()
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
+    else:
+        text = ""
+    return text
+
+
+def _normalizar_unicos(unicos, ascii_estricto):
+    """Versión vectorizada de normalizar_texto / normalize_text sobre una Serie de strings."""
+    if ascii_estricto:
+        # normalize_text: minúsculas + NFKD, descartando todo lo que no sea ASCII
+        return unicos.str.lower().str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('utf-8')
+
+    # normalizar_texto: strip + minúsculas + NFD, eliminando solo las marcas combinantes (categoría Mn).
+    # La tabla de traducción se arma con los caracteres presentes, no con todo Unicode.
+    descompuestos = unicos.str.strip().str.lower().str.normalize('NFD')
+    caracteres = set(''.join(descompuestos))
+    marcas = {ord(c): None for c in caracteres if unicodedata.category(c) == 'Mn'}
+    return descompuestos.str.translate(marcas) if marcas else descompuestos
+
+
+def normalizar_columna(serie, ascii_estricto=False, convertir_a_texto=False):
+    """
+    Normaliza una columna completa factorizándola primero.
+
+    Solo se normalizan los valores distintos (con operaciones vectorizadas de pandas) y el resultado
+    se expande con los códigos, así el costo depende de la cardinalidad y no del número de filas.
+    Da el mismo resultado que `serie.apply(normalizar_texto)` o, con ascii_estricto=True, que
+    `serie.apply(normalize_text)`. Con convertir_a_texto=True equivale a aplicar antes `.astype(str)`.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Ya está factorizada: se normaliza el diccionario de categorías
+        codigos = serie.cat.codes.to_numpy()
+        unicos = pd.Series(np.asarray(serie.cat.categories, dtype=object))
+        if convertir_a_texto:
+            unicos = pd.concat([unicos.map(str), pd.Series(['nan'])], ignore_index=True)
+            codigos = np.where(codigos == -1, len(unicos) - 1, codigos)
+    else:
+        if convertir_a_texto:
+            serie = serie.astype(str) # NaN -> 'nan', None -> 'None', igual que antes
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+        unicos = pd.Series(np.asarray(unicos, dtype=object))
+    es_texto = unicos.map(lambda valor: isinstance(valor, str)).astype(bool)
+
+    normalizados = pd.Series('', index=unicos.index, dtype=object)
+    if es_texto.any():
+        normalizados[es_texto] = _normalizar_unicos(unicos[es_texto], ascii_estricto)
+
+    # El código -1 (NaN y no-strings) apunta al último elemento, que es ''
+    valores = np.append(normalizados.to_numpy(dtype=object), '')
+    return pd.Series(valores[codigos], index=serie.index, name=serie.name, dtype=object)
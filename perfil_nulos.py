@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+COL_AUDITOR = 'Información del Auditor'
+COL_ESTADO = 'Estado de Auditoria'
+
+
+class PerfilNulos:
+    """
+    Perfil de datos faltantes de un dataset, calculado una sola vez al cargarlo.
+
+    - bits: validez (notna) de cada columna, empaquetada a 1 bit por fila (np.packbits).
+    - validos_por_fila: cantidad de columnas con dato en cada fila.
+    - auditores: por auditor, filas finalizadas y suma de su % de columnas con dato (para completitud).
+    """
+
+    def __init__(self, data):
+        validos = data.notna().to_numpy()
+        self.columnas = list(data.columns)
+        self.n_filas = len(data)
+        self.bits = np.packbits(validos, axis=0)
+        self.validos_por_fila = validos.sum(axis=1).astype(np.int32)
+
+        self.auditores = None
+        if COL_AUDITOR in data.columns and COL_ESTADO in data.columns:
+            finalizadas = (data[COL_ESTADO] == 'finalizada').to_numpy()
+            porcentaje_fila = self.validos_por_fila[finalizadas] / len(self.columnas) * 100
+            self.auditores = (
+                pd.Series(porcentaje_fila)
+                .groupby(data[COL_AUDITOR].array[finalizadas], observed=True)
+                .agg(['size', 'sum'])
+                .rename(columns={'size': 'Filas', 'sum': 'Suma % completitud'})
+                .rename_axis(COL_AUDITOR)
+            )
+
+    def validos(self, columna, posiciones=None):
+        """Arreglo booleano: True donde la columna tiene dato (opcionalmente solo en esas posiciones)."""
+        j = self.columnas.index(columna)
+        validos = np.unpackbits(self.bits[:, j], count=self.n_filas).astype(bool)
+        return validos if posiciones is None else validos[posiciones]
+
+    def completitud_auditores(self):
+        """% promedio de columnas con dato por auditor en sus auditorías finalizadas, de mayor a menor."""
+        if self.auditores is None or not self.columnas:
+            return None
+        completitud = self.auditores['Suma % completitud'] / self.auditores['Filas']
+        ranking = completitud.rename("% Completitud").reset_index()
+        return ranking.sort_values(by="% Completitud", ascending=False)
+
+    def resumen_columnas(self):
+        """% de filas con dato por columna (resumen de calidad de datos), de menor a mayor."""
+        con_dato = np.unpackbits(self.bits, axis=0, count=self.n_filas).sum(axis=0)
+        resumen = pd.DataFrame({
+            "Columna": self.columnas,
+            "Filas con dato": con_dato,
+            "% Con dato": con_dato / self.n_filas * 100 if self.n_filas else 0.0,
+        })
+        return resumen.sort_values(by="% Con dato", kind='stable')
@@ -1,7 +1,8 @@
+import numpy as np
 import pandas as pd
-import streamlit as st
-import plotly.express as px
-import unicodedata
+from cache_secciones import cache_secciones
+from clasificador import ClasificadorObservaciones
+from normalizacion import normalizar_columna
 
 # Palabras clave por categoría
 tools_keywords = ["herramienta", "falta de herramienta", "herramientas"]
@@ -14,88 +15,138 @@ epp_ausencia_keywords = ["no utiliza", "sin legnionario", "sin lentes", "sin cas
 cumple_keywords = ["sin observacion", "sin obs", "sin comentarios", "sin observaciónes", "sin observaciones", "so", "s/o", "so,", "s/o,", "s/o.", "."]
 observaciones_a_excluir = ["sin obs", "sin comentarios", "sin observaciónes", "sin observaciones", "so", "s/o", "so,", "s/o,", "s/o.", "."]
 
-def normalize_text(text):
-    """Normaliza texto: minúsculas, elimina acentos, convierte a string si es necesario."""
-    if isinstance(text, str):
-        text = text.lower()
-        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
-    else:
-        text = ""
-    return text
-
-def process_data(uploaded_file):
-    df = pd.read_excel(uploaded_file)
-
-    # Normalización de campos clave
-    df['Observaciones'] = df['Observaciones /  Separe con comas los temas'].fillna('').apply(normalize_text)
-    df['Nombre de Técnico/Copiar el del Wfm'] = df['Nombre de Técnico/Copiar el del Wfm'].astype(str).apply(normalize_text)
-    df['Empresa'] = df['Empresa'].astype(str).apply(normalize_text)
-    df['Region'] = df['Region'].astype(str).apply(normalize_text)
-    df['Estado de Auditoria'] = df['Estado de Auditoria'].astype(str).apply(normalize_text)
+# Bits de categoría de cada observación
+BIT_HERRAMIENTAS = 1 << 0
+BIT_CAMIONETA = 1 << 1
+BIT_AGENDA = 1 << 2
+BIT_GPON = 1 << 3
+BIT_EPP_AUSENCIA = 1 << 4
+BIT_MALAS_PRACTICAS = 1 << 5
+BIT_CUMPLE = 1 << 6
+
+# Autómata construido una sola vez con todas las listas de palabras clave
+clasificador = ClasificadorObservaciones(
+    {
+        BIT_HERRAMIENTAS: tools_keywords,
+        BIT_CAMIONETA: vehicle_order_keywords,
+        BIT_AGENDA: agenda_keywords,
+        BIT_GPON: gpon_keywords,
+        BIT_EPP_AUSENCIA: epp_ausencia_keywords,
+        BIT_MALAS_PRACTICAS: malas_practicas_keywords,
+    },
+    exactos={BIT_CUMPLE: cumple_keywords},
+)
+
+# KPI -> bit sobre las auditorías finalizadas (None: KPI de auditorías no finalizadas)
+kpi_bits = {
+    "Falta de Herramientas": BIT_HERRAMIENTAS,
+    "Problemas de Orden en Camioneta": BIT_CAMIONETA,
+    "Auditorías No Realizadas": None,
+    "Técnicos con Malas Prácticas": BIT_MALAS_PRACTICAS,
+    "Técnicos que No Cumplen Agenda": BIT_AGENDA,
+    "Técnicos que No Utilizan Kit GPON Completo": BIT_GPON,
+    "Técnicos que No Utilizan EPP Completo": BIT_EPP_AUSENCIA,
+    "Técnicos que Cumplen": BIT_CUMPLE,
+}
+
+
+def clasificar_observaciones(observaciones):
+    """
+    Máscara de categorías por fila para observaciones ya normalizadas.
+
+    Malas prácticas solo cuenta si la observación no está vacía y no es un cumplimiento explícito.
+    """
+    categorias = clasificador.clasificar(observaciones)
+    no_aplica = ((categorias & BIT_CUMPLE) != 0) | (observaciones.to_numpy() == "")
+    categorias[no_aplica] &= ~np.uint32(BIT_MALAS_PRACTICAS)
+    return categorias
+
+
+def tiene_categoria(categorias, bit):
+    """Filas cuya máscara incluye el bit."""
+    return (categorias & bit) != 0
+
+
+def calcular_matriz_kpis(df):
+    """Matriz booleana filas x KPIs (columnas en el orden de kpi_bits), alineada con df."""
+    finalizada = (df['Estado de Auditoria'] == "finalizada").to_numpy()
+    categorias = np.asarray(df['Categorias'])
+    return pd.DataFrame(
+        {
+            label: ~finalizada if bit is None else finalizada & tiene_categoria(categorias, bit)
+            for label, bit in kpi_bits.items()
+        },
+        index=df.index,
+    )
+
+
+def agrupar_kpis(matriz, claves):
+    """Casos por KPI agrupados por una o más columnas, con 'Total Casos' y orden descendente."""
+    resumen = matriz.groupby(claves, sort=False).sum()
+    resumen['Total Casos'] = resumen.sum(axis=1)
+    return resumen.sort_values(by="Total Casos", ascending=False)
+
+
+# Columnas que usa el reporte (el resto del dataset no se copia)
+columnas_reporte = ['Nombre de Técnico/Copiar el del Wfm', 'Observaciones /  Separe con comas los temas', 'Información del Auditor', 'Empresa', 'Region', 'Estado de Auditoria']
+
+
+def calcular_kpis(data, huella=None):
+    """
+    Etapa de cálculo del reporte (sin UI). Devuelve un dict con df, kpis, matriz y vistas agrupadas.
+
+    `data` es el DataFrame ya cargado y normalizado de la sesión y `huella` su identificador
+    (hash del contenido). Con la misma huella se reutiliza el resultado guardado en cache_secciones.
+    """
+    return cache_secciones.obtener(huella, 'reporte_kpis', (), lambda: _calcular_kpis(data))
+
+
+def _calcular_kpis(data):
+    df = data.reindex(columns=columnas_reporte) # Copia solo de las columnas necesarias
+
+    # Normalización de campos clave (factorizada: solo se normalizan los valores distintos)
+    df['Observaciones'] = normalizar_columna(df['Observaciones /  Separe con comas los temas'], ascii_estricto=True)
+    for col in ['Nombre de Técnico/Copiar el del Wfm', 'Empresa', 'Region', 'Estado de Auditoria']:
+        df[col] = normalizar_columna(df[col], ascii_estricto=True, convertir_a_texto=True)
+
+    # Una sola pasada sobre las observaciones: máscara de categorías por fila
+    df['Categorias'] = clasificar_observaciones(df['Observaciones'])
 
     # Dividir por estado de auditoría
     df_finalizadas = df[df['Estado de Auditoria'] == "finalizada"]
     df_no_realizadas = df[df['Estado de Auditoria'] != "finalizada"]
-    total_auditorias = len(df)
-
-    # Funciones de evaluación
-    def match_keywords(x, keywords):
-        return any(keyword in x for keyword in keywords)
-
-    def match_cumple(x):
-        """Detecta si una observación es cumplimiento explícito."""
-        x = normalize_text(x)
-        return x.strip() in cumple_keywords
-
-    def match_malas_practicas(x):
-        """Detecta malas prácticas si no cumple y contiene malas prácticas."""
-        x = normalize_text(x)
-        if x.strip() in cumple_keywords or x == "":
-            return False
-        return any(keyword in x for keyword in malas_practicas_keywords)
-
-    def match_gpon(x):
-        """Detecta si la observación menciona elementos del kit GPON"""
-        return match_keywords(x, gpon_keywords)
-
-    def match_epp_incompleto(x):
-        """Detecta si falta EPP (Equipo de Protección Personal)"""
-        return match_keywords(x, epp_ausencia_keywords)
-
-    # KPIs globales
-    kpis = {
-        "Falta de Herramientas": df_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, tools_keywords)),
-        "Problemas de Orden en Camioneta": df_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, vehicle_order_keywords)),
-        "Auditorías No Realizadas": df_no_realizadas['Estado de Auditoria'].apply(lambda x: True),
-        "Técnicos con Malas Prácticas": df_finalizadas['Observaciones'].apply(match_malas_practicas),
-        "Técnicos que No Cumplen Agenda": df_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, agenda_keywords)),
-        "Técnicos que No Utilizan Kit GPON Completo": df_finalizadas['Observaciones'].apply(match_gpon),
-        "Técnicos que No Utilizan EPP Completo": df_finalizadas['Observaciones'].apply(match_epp_incompleto),
-        "Técnicos que Cumplen": df_finalizadas['Observaciones'].apply(match_cumple),
+
+    # Matriz de KPIs calculada una sola vez; los KPIs globales, los expanders y cada vista salen de ella
+    matriz_kpis = calcular_matriz_kpis(df)
+
+    resultado = {
+        "df": df,
+        "total_auditorias": len(df),
+        "matriz_kpis": matriz_kpis,
+        # KPIs globales (sobre finalizadas, o sobre no finalizadas para "Auditorías No Realizadas")
+        "kpis": {
+            label: matriz_kpis.loc[df_no_realizadas.index if bit is None else df_finalizadas.index, label]
+            for label, bit in kpi_bits.items()
+        },
+        # Vistas agrupadas
+        "empresa_kpis_df": agrupar_kpis(matriz_kpis, df['Empresa']).rename_axis(None),
+        "region_kpis_df": agrupar_kpis(matriz_kpis, df['Region']),
+        "tecnico_kpis_df": agrupar_kpis(matriz_kpis, [df['Empresa'], df['Nombre de Técnico/Copiar el del Wfm']]),
     }
+    return resultado
 
-    # Inicialización de KPIs por empresa
-    empresa_kpis = {empresa: {k: 0 for k in kpis} for empresa in df['Empresa'].unique()}
-
-    # Recuento de casos por empresa
-    for empresa in empresa_kpis:
-        empresa_df = df[df['Empresa'] == empresa]
-        empresa_finalizadas = empresa_df[empresa_df['Estado de Auditoria'] == "finalizada"]
-        empresa_no_finalizadas = empresa_df[empresa_df['Estado de Auditoria'] != "finalizada"]
-
-        empresa_kpis[empresa]["Falta de Herramientas"] = empresa_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, tools_keywords)).sum()
-        empresa_kpis[empresa]["Problemas de Orden en Camioneta"] = empresa_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, vehicle_order_keywords)).sum()
-        empresa_kpis[empresa]["Auditorías No Realizadas"] = len(empresa_no_finalizadas)
-        empresa_kpis[empresa]["Técnicos con Malas Prácticas"] = empresa_finalizadas['Observaciones'].apply(match_malas_practicas).sum()
-        empresa_kpis[empresa]["Técnicos que No Cumplen Agenda"] = empresa_finalizadas['Observaciones'].apply(lambda x: match_keywords(x, agenda_keywords)).sum()
-        empresa_kpis[empresa]["Técnicos que No Utilizan Kit GPON Completo"] = empresa_finalizadas['Observaciones'].apply(match_gpon).sum()
-        empresa_kpis[empresa]["Técnicos que No Utilizan EPP Completo"] = empresa_finalizadas['Observaciones'].apply(match_epp_incompleto).sum()
-        empresa_kpis[empresa]["Técnicos que Cumplen"] = empresa_finalizadas['Observaciones'].apply(match_cumple).sum()
-
-    # DataFrame de resumen por empresa
-    empresa_kpis_df = pd.DataFrame(empresa_kpis).T.fillna(0)
-    empresa_kpis_df['Total Casos'] = empresa_kpis_df.sum(axis=1)
-    empresa_kpis_df = empresa_kpis_df.sort_values(by="Total Casos", ascending=False)
+
+def mostrar_kpis(resultado):
+    """Etapa de presentación: dibuja métricas, expanders y gráficos a partir de calcular_kpis."""
+    # Importados aquí: el cálculo (calcular_kpis) se usa también sin Streamlit, en reporte_lote.py
+    import streamlit as st
+    import plotly.express as px
+
+    df = resultado["df"]
+    kpis = resultado["kpis"]
+    matriz_kpis = resultado["matriz_kpis"]
+    total_auditorias = resultado["total_auditorias"]
+    empresa_kpis_df = resultado["empresa_kpis_df"]
 
     # UI - Métricas generales
     st.title("📊 Reporte de Auditorías Técnicas")
@@ -112,24 +163,21 @@ def process_data(uploaded_file):
 
     # Expanders por KPI
     expander_info = [
-        ("🔴 Técnicos que No Utilizan Kit GPON Completo", match_gpon),
-        ("🔴 Técnicos que No Cumplen Agenda", lambda x: match_keywords(x, agenda_keywords)),
-        ("🔴 Técnicos que No Utilizan EPP Completo", match_epp_incompleto),
-        ("🔴 Falta de Herramientas", lambda x: match_keywords(x, tools_keywords)),
-        ("🔴 Problemas de Orden en Camioneta", lambda x: match_keywords(x, vehicle_order_keywords)),
-        ("🔴 Auditorías No Realizadas", lambda x: True),
-        ("🔴 Técnicos con Malas Prácticas", match_malas_practicas),
-        ("🔴 Técnicos que Cumplen", match_cumple),
+        "🔴 Técnicos que No Utilizan Kit GPON Completo",
+        "🔴 Técnicos que No Cumplen Agenda",
+        "🔴 Técnicos que No Utilizan EPP Completo",
+        "🔴 Falta de Herramientas",
+        "🔴 Problemas de Orden en Camioneta",
+        "🔴 Auditorías No Realizadas",
+        "🔴 Técnicos con Malas Prácticas",
+        "🔴 Técnicos que Cumplen",
     ]
 
-    for title, func in expander_info:
+    for title in expander_info:
         with st.expander(title):
-            if title == "🔴 Auditorías No Realizadas":
-                df_filtered = df_no_realizadas
-            else:
-                df_filtered = df_finalizadas[df_finalizadas['Observaciones'].apply(func)]
+            df_filtered = df[matriz_kpis[title.split('🔴 ')[1]]]
             st.write(f"- {title.split('🔴 ')[1]}: {len(df_filtered)} casos")
-            st.dataframe(df_filtered[['Nombre de Técnico/Copiar el del Wfm', 'Observaciones /  Separe con comas los temas', 'Información del Auditor', 'Empresa', 'Region']].fillna(''))
+            st.dataframe(df_filtered[['Nombre de Técnico/Copiar el del Wfm', 'Observaciones /  Separe con comas los temas', 'Información del Auditor', 'Empresa', 'Region']].astype(object).fillna(''))
 
     # Gráfico por empresa
     st.markdown("---")
@@ -147,7 +195,18 @@ def process_data(uploaded_file):
     )
     st.plotly_chart(fig)
 
-    return kpis, empresa_kpis_df, total_auditorias, df
+    # Mismos KPIs por región y por técnico
+    with st.expander("📍 Casos por Región"):
+        st.dataframe(resultado["region_kpis_df"])
+    with st.expander("👷 Casos por Técnico"):
+        st.dataframe(resultado["tecnico_kpis_df"])
+
+
+def process_data(data, huella=None):
+    """Calcula (memoizado por huella) y muestra el reporte. Devuelve (kpis, empresa_kpis_df, total_auditorias, df)."""
+    resultado = calcular_kpis(data, huella)
+    mostrar_kpis(resultado)
+    return resultado["kpis"], resultado["empresa_kpis_df"], resultado["total_auditorias"], resultado["df"]
 
 
 
@@ -0,0 +1,221 @@
+"""
+Reporte de auditorías por lotes, sin Streamlit.
+
+Procesa varios libros de auditoría (carpeta, glob o rutas) en un pool de procesos con la misma
+normalización y los mismos cálculos que la app, y escribe las tablas en Parquet y/o XLSX:
+una salida por archivo y un consolidado con la columna 'Archivo'.
+
+    python reporte_lote.py auditorias/ --salida reportes --formato ambos
+    python reporte_lote.py "auditorias/2024-*.xlsx" --procesos 4
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import secciones
+from ingesta import cargar_datos
+from perfil_nulos import PerfilNulos
+from pt import calcular_kpis
+from stock_critico import HERRAMIENTAS_CRITICAS, EPP_CRITICOS, EPP_VITALES
+from ultima_auditoria import construir_ultima_auditoria
+
+FORMATOS = ("parquet", "xlsx", "ambos")
+NOMBRE_CONSOLIDADO = "consolidado" # Reservado: ningún libro puede usarlo como nombre de salida
+
+
+def expandir_entradas(entradas):
+    """Lista ordenada y sin repetidos de libros .xlsx a partir de carpetas, globs o rutas."""
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas.extend(glob.glob(os.path.join(entrada, "*.xlsx")))
+        else:
+            rutas.extend(glob.glob(entrada) or [entrada])
+    # Los '~$...' son archivos de bloqueo de Excel, no libros
+    return sorted({os.path.abspath(r) for r in rutas if not os.path.basename(r).startswith("~$")})
+
+
+def nombres_salida(rutas):
+    """
+    Nombre de salida único por libro: su nombre sin extensión, con sufijo '-2', '-3'... si ya está en uso.
+
+    Dos libros con el mismo nombre en carpetas distintas, o uno llamado como el consolidado, no se
+    sobrescriben. La comparación no distingue mayúsculas (Windows tampoco). Devuelve ({ruta: nombre}, avisos).
+    """
+    usados = {NOMBRE_CONSOLIDADO}
+    nombres, avisos = {}, []
+    for ruta in rutas:
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        nombre, n = base, 1
+        while nombre.lower() in usados:
+            n += 1
+            nombre = f"{base}-{n}"
+        usados.add(nombre.lower())
+        nombres[ruta] = nombre
+        if nombre != base:
+            avisos.append(f"{ruta}: el nombre '{base}' ya está en uso, su reporte se escribe como '{nombre}'")
+    return nombres, avisos
+
+
+def calcular_tablas(data, huella=None):
+    """
+    Todas las tablas del reporte para un dataset ya cargado, en el orden de la app.
+
+    Usa las mismas funciones que la app (secciones y calcular_kpis), sin filtros de la UI:
+    ranking sin rango de fechas y stock crítico con todas las empresas.
+    """
+    tablas = {}
+    resultado = calcular_kpis(data, huella)
+    total = resultado["total_auditorias"]
+    tablas["kpis"] = pd.DataFrame({
+        "KPI": list(resultado["kpis"]),
+        "Casos": [int(valores.sum()) for valores in resultado["kpis"].values()],
+        "Porcentaje": [valores.sum() / total * 100 if total else 0 for valores in resultado["kpis"].values()],
+    })
+    tablas["kpis_empresa"] = resultado["empresa_kpis_df"].rename_axis("Empresa").reset_index()
+    tablas["kpis_region"] = resultado["region_kpis_df"].reset_index()
+    tablas["kpis_tecnico"] = resultado["tecnico_kpis_df"].reset_index()
+
+    columnas = data.columns
+    hay_estado = secciones.COL_ESTADO in columnas
+    perfil = PerfilNulos(data)
+
+    if hay_estado and all(col in columnas for col in (secciones.COL_TECNICO, secciones.COL_EMPRESA, secciones.COL_FECHA)):
+        ranking = secciones.ranking_tecnicos(data)
+        if ranking is not None:
+            tablas["ranking_tecnicos"] = ranking
+    if hay_estado and secciones.COL_EMPRESA in columnas:
+        tablas["auditorias_empresa"] = secciones.auditorias_por_empresa(data)
+
+    vista = construir_ultima_auditoria(data)
+    if vista is not None and secciones.COL_EMPRESA in columnas:
+        for nombre, items, columna_faltantes, nombre_conteo, vitales in (
+            ("stock_herramientas", HERRAMIENTAS_CRITICAS, "Herramientas Faltantes", 'Cantidad de Técnicos con Stock Crítico Herramientas', None),
+            ("stock_epp", EPP_CRITICOS, "EPP Faltantes", 'Cantidad de Técnicos con Stock Crítico EPP', EPP_VITALES),
+        ):
+            existentes = [item for item in items if item in columnas]
+            stock = secciones.stock_critico(data, vista, existentes, columna_faltantes, nombre_conteo, vitales, perfil) if existentes else None
+            if stock is not None:
+                tabla, por_empresa = stock
+                # Mismas columnas que la descarga de la app
+                tablas[nombre] = tabla[["Técnico Con Icono", secciones.COL_EMPRESA, secciones.COL_FECHA, columna_faltantes]].rename(columns={"Técnico Con Icono": "Técnico"})
+                tablas[f"{nombre}_empresa"] = por_empresa
+
+    if hay_estado and secciones.COL_AUDITOR in columnas:
+        tablas["ranking_auditores"] = secciones.ranking_auditores(data)
+    if all(col in columnas for col in (secciones.COL_FECHA, secciones.COL_AUDITOR, secciones.COL_ID_TRABAJO)):
+        conteo = secciones.conteo_auditorias_diario(data)
+        if conteo is not None and not conteo.empty:
+            tablas["conteo_diario"] = conteo
+    if hay_estado and all(col in columnas for col in (secciones.COL_AUDITOR, secciones.COL_EMPRESA, secciones.COL_FECHA)):
+        tablas["distribucion_empresas"] = secciones.distribucion_empresas(data)
+    if hay_estado and secciones.COL_REGION in columnas:
+        tablas["auditorias_region"] = secciones.auditorias_por_region(data)
+    if hay_estado and secciones.COL_AUDITOR in columnas:
+        completitud = secciones.ranking_completitud(perfil)
+        if completitud is not None:
+            tablas["completitud_auditores"] = completitud
+    tablas["completitud_columnas"] = secciones.resumen_calidad(perfil)
+    return tablas
+
+
+def escribir_tablas(tablas, destino, formato):
+    """Escribe las tablas en destino/<tabla>.parquet y/o destino.xlsx (una hoja por tabla)."""
+    if formato in ("parquet", "ambos"):
+        os.makedirs(destino, exist_ok=True)
+        for nombre, tabla in tablas.items():
+            # Una columna object con tipos mezclados no se puede escribir en Parquet: esa tabla va como texto
+            try:
+                tabla.to_parquet(os.path.join(destino, f"{nombre}.parquet"), index=False)
+            except (TypeError, ValueError):
+                tabla.astype(str).to_parquet(os.path.join(destino, f"{nombre}.parquet"), index=False)
+    if formato in ("xlsx", "ambos"):
+        os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+        with pd.ExcelWriter(f"{destino}.xlsx", engine="xlsxwriter") as writer:
+            for nombre, tabla in tablas.items():
+                tabla.to_excel(writer, index=False, sheet_name=nombre[:31])
+
+
+def procesar_archivo(ruta, salida, nombre, formato):
+    """Carga, calcula y escribe el reporte de un libro como salida/nombre (se ejecuta en un proceso del pool)."""
+    with open(ruta, "rb") as f:
+        archivo = io.BytesIO(f.read())
+    # Las hojas se leen sin pool propio: el paralelismo es entre archivos
+    data, huella, avisos = cargar_datos(archivo, max_procesos=1)
+    if data.empty:
+        return ruta, {}, avisos + ["El archivo está vacío o no contiene datos procesables."]
+    tablas = calcular_tablas(data, huella)
+    escribir_tablas(tablas, os.path.join(salida, nombre), formato)
+    return ruta, tablas, avisos
+
+
+def consolidar(resultados):
+    """
+    Une las tablas de todos los archivos por nombre, agregando la columna 'Archivo'.
+
+    'Archivo' es el nombre del libro, o su ruta completa si hay otro libro con el mismo nombre.
+    """
+    repetidos = pd.Series([os.path.basename(ruta) for ruta, _, _ in resultados]).value_counts()
+    por_tabla = {}
+    for ruta, tablas, _ in resultados:
+        archivo = os.path.basename(ruta)
+        etiqueta = ruta if repetidos[archivo] > 1 else archivo
+        for nombre, tabla in tablas.items():
+            por_tabla.setdefault(nombre, []).append(tabla.assign(Archivo=etiqueta))
+    return {
+        nombre: pd.concat(partes, ignore_index=True)
+        for nombre, partes in por_tabla.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reporte de auditorías por lotes (sin Streamlit).")
+    parser.add_argument("entradas", nargs="+", help="Carpetas, globs o rutas de libros .xlsx")
+    parser.add_argument("--salida", default="reportes", help="Carpeta de salida (por defecto: reportes)")
+    parser.add_argument("--formato", choices=FORMATOS, default="ambos", help="Formato de las tablas")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto: núcleos disponibles)")
+    args = parser.parse_args(argv)
+
+    rutas = expandir_entradas(args.entradas)
+    if not rutas:
+        print("No se encontraron libros .xlsx en las entradas indicadas.", file=sys.stderr)
+        return 1
+
+    nombres, avisos = nombres_salida(rutas)
+    for aviso in avisos:
+        print(f"⚠️ {aviso}", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    procesos = args.procesos or min(len(rutas), os.cpu_count() or 1)
+    resultados, errores = [], 0
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {pool.submit(procesar_archivo, ruta, args.salida, nombres[ruta], args.formato): ruta for ruta in rutas}
+        for futuro in as_completed(futuros):
+            ruta = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                errores += 1
+                print(f"❌ {os.path.basename(ruta)}: {e}", file=sys.stderr)
+                continue
+            resultados.append(resultado)
+            for aviso in resultado[2]:
+                print(f"⚠️ {os.path.basename(ruta)}: {aviso}", file=sys.stderr)
+            print(f"✅ {os.path.basename(ruta)}: {len(resultado[1])} tablas")
+
+    resultados.sort(key=lambda resultado: resultado[0]) # Consolidado en orden de archivo, no de término
+    consolidado = consolidar(resultados)
+    if consolidado:
+        escribir_tablas(consolidado, os.path.join(args.salida, NOMBRE_CONSOLIDADO), args.formato)
+    print(f"{len(resultados)} archivos procesados, {errores} con error, en {time.perf_counter() - inicio:.1f} s")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from stock_critico import calcular_stock_critico, contar_por_empresa
+from ultima_auditoria import posiciones_ultima_auditoria
+
+# Cálculo de cada sección de la app, sin Streamlit: reciben el dataset completo y devuelven tablas
+# pequeñas listas para mostrar. La app los envuelve con cache_secciones.
+
+COL_TECNICO = 'Nombre de Técnico/Copiar el del Wfm'
+COL_EMPRESA = 'Empresa'
+COL_FECHA = 'Fecha'
+COL_ESTADO = 'Estado de Auditoria'
+COL_AUDITOR = 'Información del Auditor'
+COL_ID_TRABAJO = 'Número de Orden de Trabajo/ ID externo'
+COL_REGION = 'Region'
+
+
+def _finalizadas(data):
+    return data[data[COL_ESTADO] == 'finalizada']
+
+
+def _agrupar_con_fechas(df, claves):
+    """
+    Cantidad de filas y lista de fechas 'dd/mm/YYYY, ...' por grupo, con las columnas de claves.
+
+    Equivale a agregar con `', '.join(sorted(x.dt.strftime('%d/%m/%Y')))` por grupo, sin una lambda
+    por grupo: cada fecha distinta se formatea una vez, un solo ordenamiento global deja las filas
+    agrupadas y con sus textos en orden, y las listas salen de una concatenación agrupada.
+    """
+    grupos = df.groupby(claves, observed=True)
+    resultado = grupos.size().to_frame('Cantidad_de_Auditorias')
+
+    fechas = df[COL_FECHA]
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        resultado['Fechas_de_Auditoria'] = 'Fechas no válidas'
+        return resultado.reset_index()
+
+    id_grupo = grupos.ngroup().to_numpy()
+    codigos, unicas = pd.factorize(fechas, use_na_sentinel=True)
+    textos = pd.DatetimeIndex(unicas).strftime('%d/%m/%Y').to_numpy(dtype=object)
+    # Posición de cada texto en orden lexicográfico (el mismo orden que sorted() sobre los strings)
+    rango_texto = np.empty(len(textos), dtype=np.intp)
+    rango_texto[np.argsort(textos, kind='stable')] = np.arange(len(textos))
+
+    validas = (codigos >= 0) & ~np.isnan(id_grupo) # Sin fecha (NaT) o sin grupo (clave nula) no se listan
+    id_grupo = id_grupo[validas].astype(np.intp)
+    codigos = codigos[validas]
+    orden = np.lexsort((rango_texto[codigos], id_grupo))
+    listas = pd.Series(textos[codigos[orden]]).groupby(id_grupo[orden], sort=True).agg(', '.join)
+
+    resultado['Fechas_de_Auditoria'] = listas.reindex(np.arange(len(resultado)), fill_value='').to_numpy()
+    return resultado.reset_index()
+
+
+def total_finalizadas(data):
+    """Cantidad de auditorías finalizadas."""
+    return int((data[COL_ESTADO] == 'finalizada').sum())
+
+
+def rango_fechas_finalizadas(data):
+    """(fecha mínima, fecha máxima) de las auditorías finalizadas con fecha válida, o None si no hay."""
+    fechas = _finalizadas(data)[COL_FECHA].dropna()
+    if fechas.empty:
+        return None
+    return fechas.min().date(), fechas.max().date()
+
+
+def ranking_tecnicos(data, fecha_inicio=None, fecha_fin=None):
+    """Ranking de técnicos por auditorías finalizadas (opcionalmente en un rango de fechas)."""
+    finalizadas = _finalizadas(data)
+    finalizadas = finalizadas[finalizadas[COL_FECHA].notna()]
+    if fecha_inicio is not None and fecha_fin is not None:
+        mask = (finalizadas[COL_FECHA] >= pd.to_datetime(fecha_inicio)) & (finalizadas[COL_FECHA] <= pd.to_datetime(fecha_fin))
+        finalizadas = finalizadas.loc[mask]
+    if finalizadas.empty:
+        return None
+    return (
+        _agrupar_con_fechas(finalizadas, [COL_TECNICO, COL_EMPRESA])
+        .rename(columns={
+            COL_TECNICO: "Técnico",
+            COL_EMPRESA: "Empresa",
+            "Cantidad_de_Auditorias": "Cantidad de Auditorías",
+            "Fechas_de_Auditoria": "Fechas de Auditoría"
+        })
+        .sort_values(by="Cantidad de Auditorías", ascending=False)
+    )
+
+
+def auditorias_por_empresa(data):
+    """Auditorías finalizadas por empresa (sin empresas vacías ni sin auditorías)."""
+    auditorias_empresa = (
+        _finalizadas(data)[COL_EMPRESA]
+        .value_counts()
+        .loc[lambda conteo: conteo > 0] # Categorías sin auditorías finalizadas no se muestran
+        .rename_axis(COL_EMPRESA)
+        .reset_index(name='Cantidad de Auditorías Finalizadas')
+    )
+    return auditorias_empresa[auditorias_empresa[COL_EMPRESA].str.strip() != '']
+
+
+def stock_critico(data, vista_ultima, items, columna_faltantes, nombre_conteo, items_severidad=None, perfil=None):
+    """
+    Stock crítico sobre la última auditoría de cada técnico.
+
+    Devuelve (tabla de técnicos con faltantes, conteo por empresa) o None si no hay auditorías
+    finalizadas con fecha válida. Con `perfil` (PerfilNulos) las celdas vacías se leen de sus bits.
+    """
+    posiciones = posiciones_ultima_auditoria(vista_ultima)
+    if not len(posiciones):
+        return None
+    ultimas = data.iloc[posiciones].reset_index(drop=True)
+    validos = None
+    if perfil is not None:
+        validos = np.column_stack([perfil.validos(item, posiciones) for item in items])
+    tabla = calcular_stock_critico(ultimas, items, COL_TECNICO, COL_EMPRESA, COL_FECHA, columna_faltantes, items_severidad, validos)
+    return tabla, contar_por_empresa(tabla, COL_EMPRESA, nombre_conteo)
+
+
+def exportar_excel(df, hoja):
+    """Contenido .xlsx (bytes) de un DataFrame, para los botones de descarga."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name=hoja)
+    return buffer.getvalue()
+
+
+def ranking_auditores(data):
+    """Ranking de auditores por auditorías finalizadas."""
+    return (
+        _finalizadas(data).groupby(COL_AUDITOR, observed=True)
+        .size()
+        .reset_index(name="Cantidad de Auditorías Finalizadas")
+        .rename(columns={COL_AUDITOR: "Auditor"})
+        .sort_values(by="Cantidad de Auditorías Finalizadas", ascending=False)
+    )
+
+
+def conteo_auditorias_diario(data):
+    """
+    Órdenes de trabajo distintas por día y auditor (filas con fecha, auditor e ID).
+
+    Devuelve None si no quedan filas, o un DataFrame vacío si la fecha no es datetime.
+    """
+    data_para_conteo_diario = data.dropna(subset=[COL_FECHA, COL_AUDITOR, COL_ID_TRABAJO])
+    if data_para_conteo_diario.empty:
+        return None
+    if not pd.api.types.is_datetime64_any_dtype(data_para_conteo_diario[COL_FECHA]):
+        return pd.DataFrame()
+
+    conteo = data_para_conteo_diario.groupby([
+        data_para_conteo_diario[COL_FECHA].dt.date, # Agrupar solo por la fecha (el día)
+        data_para_conteo_diario[COL_AUDITOR]
+    ], observed=True)[COL_ID_TRABAJO].nunique().reset_index() # nunique() cuenta valores únicos por grupo
+    conteo.columns = ['Fecha', 'Auditor', 'Total_Auditorias']
+    return conteo.sort_values(by=['Fecha', 'Auditor'])
+
+
+def distribucion_empresas(data):
+    """Auditorías finalizadas por auditor y empresa, con la lista de fechas."""
+    return _agrupar_con_fechas(_finalizadas(data), [COL_AUDITOR, COL_EMPRESA])
+
+
+def auditorias_por_region(data):
+    """Auditorías finalizadas por región (sin regiones vacías), de mayor a menor."""
+    finalizadas_region = _finalizadas(data).dropna(subset=[COL_REGION])
+    auditorias_region = (
+        finalizadas_region.groupby(COL_REGION, observed=True)
+        .size()
+        .reset_index(name='Cantidad de Auditorías Finalizadas')
+        .sort_values(by='Cantidad de Auditorías Finalizadas', ascending=False)
+    )
+    return auditorias_region[auditorias_region[COL_REGION].str.strip() != '']
+
+
+def ranking_completitud(perfil):
+    """Promedio de % de columnas con dato por auditor (auditorías finalizadas), o None si no hay columnas."""
+    return perfil.completitud_auditores()
+
+
+def resumen_calidad(perfil):
+    """% de filas con dato por columna, de la columna más vacía a la más completa."""
+    return perfil.resumen_columnas()
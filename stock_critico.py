@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Valores que cuentan como item faltante (además de las celdas vacías)
+VALORES_FALTANTE = ["no", "falta", "0"]
+
+HERRAMIENTAS_CRITICAS = [
+    "Power meter GPON", "VFL Luz visible para localizar fallas", "Limpiador de conectores tipo “One Click”",
+    "Deschaquetador de primera cubierta para DROP", "Deschaquetador de recubrimiento de FO 125micras Tipo Miller",
+    "Cortadora de precisión 3 pasos", "Regla de corte", "Alcohol isopropilico 99%",
+    "Paños secos para FO", "Crimper para cable UTP", "Deschaquetador para cables con cubierta redonda (UTP, RG6 )",
+    "Tester para cable UTP"
+]
+
+EPP_CRITICOS = [
+    "Conos de seguridad", "Refugio de PVC", "Casco de Altura", "Barbiquejo",
+    "Legionario Para Casco", "Guantes Cabritilla", "Guantes Dielectricos",
+    "Guantes trabajo Fino", "Zapatos de Seguridad Dielectricos",
+    "LENTE DE SEGURIDAD (CLAROS Y OSCUROS)", "Arnes Dielectrico",
+    "Estrobo Dielectrico", "Cuerda de vida /Dielectrico", "Chaleco reflectante",
+    "DETECTOR DE TENSION TIPO LAPIZ CON LINTERNA", "Bloqueador Solar"
+]
+# Con 2 o más de estos faltantes el técnico se marca 🔴, con 1 🟡
+EPP_VITALES = ["Casco de Altura", "Zapatos de Seguridad Dielectricos", "Arnes Dielectrico", "Estrobo Dielectrico"]
+
+
+def matriz_faltantes(df, items, validos=None):
+    """
+    Matriz booleana (filas x items): True si el item falta en esa fila.
+
+    Un item falta si la celda está vacía o su texto (sin espacios, en minúsculas) es "no", "falta"
+    o "0". La regla de texto se evalúa una vez por valor distinto de cada columna y se expande con
+    los códigos. Las celdas vacías salen de `validos` (matriz filas x items del perfil de nulos)
+    si se entrega; si no, del factorize.
+    """
+    matriz = np.empty((len(df), len(items)), dtype=bool)
+    for j, item in enumerate(items):
+        codigos, unicos = pd.factorize(df[item], use_na_sentinel=True)
+        textos = pd.Series(np.asarray(unicos, dtype=object)).astype(str).str.strip().str.lower()
+        falta_texto = textos.isin(VALORES_FALTANTE).to_numpy()
+        if validos is None:
+            matriz[:, j] = np.append(falta_texto, True)[codigos] # El código -1 (vacío) es faltante
+        else:
+            matriz[:, j] = ~validos[:, j] | np.append(falta_texto, False)[codigos]
+    return matriz
+
+
+def listas_faltantes(matriz, items):
+    """Texto 'item1, item2, ...' por fila. Se arma una sola vez por combinación distinta de faltantes."""
+    if not len(matriz):
+        return np.empty(0, dtype=object)
+    patrones, inversa = np.unique(np.packbits(matriz, axis=1), axis=0, return_inverse=True)
+    nombres = np.asarray(items, dtype=object)
+    textos = np.array(
+        [", ".join(nombres[np.unpackbits(patron)[:len(items)].astype(bool)]) for patron in patrones],
+        dtype=object,
+    )
+    return textos[inversa.ravel()]
+
+
+def calcular_stock_critico(ultimas, items, col_tecnico, col_empresa, col_fecha, columna_faltantes, items_severidad=None, validos=None):
+    """
+    Técnicos con al menos un item faltante en su última auditoría.
+
+    Devuelve un DataFrame con 'Técnico', empresa, fecha, la lista de faltantes (columna_faltantes),
+    'Cantidad Faltantes' y 'Técnico Con Icono', ordenado por cantidad descendente. El icono es 🔴 con
+    2 o más faltantes entre items_severidad (por defecto todos los items) y 🟡 con 1.
+    `validos` (opcional) es la matriz de celdas con dato de esas filas, tomada del perfil de nulos.
+    """
+    matriz = matriz_faltantes(ultimas, items, validos)
+    cantidad = matriz.sum(axis=1)
+    con_faltantes = cantidad > 0
+
+    stock_critico = ultimas.loc[con_faltantes, [col_tecnico, col_empresa, col_fecha]].copy()
+    stock_critico[columna_faltantes] = listas_faltantes(matriz[con_faltantes], items)
+    stock_critico["Cantidad Faltantes"] = cantidad[con_faltantes]
+
+    severidad = items if items_severidad is None else [item for item in items if item in items_severidad]
+    columnas_severidad = [items.index(item) for item in severidad]
+    cantidad_severidad = matriz[con_faltantes][:, columnas_severidad].sum(axis=1)
+    iconos = np.select([cantidad_severidad >= 2, cantidad_severidad == 1], ["🔴 ", "🟡 "], "")
+    stock_critico["Técnico Con Icono"] = iconos.astype(object) + stock_critico[col_tecnico].astype(str).to_numpy(dtype=object)
+
+    stock_critico = stock_critico.sort_values(by="Cantidad Faltantes", ascending=False)
+    return stock_critico.rename(columns={col_tecnico: "Técnico"})
+
+
+def contar_por_empresa(stock_critico, col_empresa, nombre_conteo):
+    """Cantidad de técnicos con stock crítico por empresa (sin empresas vacías), de mayor a menor."""
+    por_empresa = (
+        stock_critico.groupby(col_empresa, observed=True)
+        .size()
+        .reset_index(name=nombre_conteo)
+        .sort_values(by=nombre_conteo, ascending=False)
+    )
+    return por_empresa[por_empresa[col_empresa].astype(str).str.strip() != '']
@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+
+from cache_parquet import CacheParquet
+
+
+def _guardar(cache, huella, mtime, version=1):
+    cache.guardar(huella, version, pd.DataFrame({"x": range(1000), "huella": huella}))
+    os.utime(cache._ruta(huella, version), (mtime, mtime))
+
+
+def test_descarta_las_menos_usadas_y_respeta_el_limite(tmp_path):
+    tamano = CacheParquet(str(tmp_path / "medida"), limite_mb=100)
+    _guardar(tamano, "medida", 0)
+    bytes_entrada = os.path.getsize(tamano._ruta("medida", 1))
+
+    # Caben tres entradas
+    cache = CacheParquet(str(tmp_path / "cache"), limite_mb=3.5 * bytes_entrada / (1024 * 1024))
+    _guardar(cache, "a", 1000)
+    _guardar(cache, "b", 2000)
+    _guardar(cache, "c", 3000)
+    assert cache.obtener("a", 1) is not None # 'a' pasa a ser la más reciente
+
+    _guardar(cache, "d", 4000)
+
+    assert cache.obtener("b", 1) is None
+    assert all(cache.obtener(huella, 1) is not None for huella in ("a", "c", "d"))
+    total = sum(os.path.getsize(os.path.join(cache.directorio, nombre)) for nombre in os.listdir(cache.directorio))
+    assert total <= cache.limite_bytes
+
+
+def test_descarta_entradas_de_otra_version(tmp_path):
+    cache = CacheParquet(str(tmp_path), limite_mb=100)
+    _guardar(cache, "a", 1000, version=1)
+    _guardar(cache, "a", 2000, version=2)
+
+    assert cache.obtener("a", 1) is None
+    pd.testing.assert_frame_equal(cache.obtener("a", 2), pd.DataFrame({"x": range(1000), "huella": "a"}))
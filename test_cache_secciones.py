@@ -0,0 +1,49 @@
+import numpy as np
+
+from cache_secciones import CacheSecciones
+
+MB = 1024 * 1024
+
+
+def _arreglo(mb):
+    return lambda: np.zeros(int(mb * MB), dtype=np.uint8)
+
+
+def test_descarta_los_menos_usados_y_respeta_el_limite():
+    cache = CacheSecciones(limite_mb=3.5)
+    for huella in ("a", "b", "c"):
+        cache.obtener(huella, "seccion", (), _arreglo(1))
+    cache.obtener("a", "seccion", (), _arreglo(1)) # 'a' pasa a ser el más reciente
+
+    cache.obtener("d", "seccion", (), _arreglo(1))
+
+    assert [huella for huella, _, _ in cache.entradas] == ["c", "a", "d"]
+    assert cache.bytes_usados == 3 * MB <= cache.limite_bytes
+
+
+def test_cuenta_aciertos_y_fallos_por_seccion():
+    cache = CacheSecciones(limite_mb=10)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return np.arange(10)
+
+    for _ in range(3):
+        cache.obtener("a", "kpis", (1,), calcular)
+    cache.obtener("a", "kpis", (2,), calcular)
+
+    assert len(calculos) == 2
+    assert cache.aciertos == {"kpis": 2}
+    assert cache.fallos == {"kpis": 2}
+
+
+def test_no_guarda_resultados_sin_huella_ni_mayores_que_el_limite():
+    cache = CacheSecciones(limite_mb=1)
+    cache.obtener("a", "chica", (), _arreglo(0.5))
+
+    assert cache.obtener(None, "sin huella", (), _arreglo(0.1)) is not None
+    assert cache.obtener("b", "grande", (), _arreglo(2)) is not None
+
+    assert [seccion for _, seccion, _ in cache.entradas] == ["chica"]
+    assert cache.bytes_usados == MB // 2
@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pt
+from normalizacion import normalize_text
+
+
+# Reglas fila a fila anteriores al autómata
+def _match_keywords(texto, palabras):
+    return any(palabra in texto for palabra in palabras)
+
+
+def _match_cumple(texto):
+    return normalize_text(texto).strip() in pt.cumple_keywords
+
+
+def _match_malas_practicas(texto):
+    texto = normalize_text(texto)
+    if texto.strip() in pt.cumple_keywords or texto == "":
+        return False
+    return _match_keywords(texto, pt.malas_practicas_keywords)
+
+
+def _mascara_esperada(texto):
+    reglas = {
+        pt.BIT_HERRAMIENTAS: _match_keywords(texto, pt.tools_keywords),
+        pt.BIT_CAMIONETA: _match_keywords(texto, pt.vehicle_order_keywords),
+        pt.BIT_AGENDA: _match_keywords(texto, pt.agenda_keywords),
+        pt.BIT_GPON: _match_keywords(texto, pt.gpon_keywords),
+        pt.BIT_EPP_AUSENCIA: _match_keywords(texto, pt.epp_ausencia_keywords),
+        pt.BIT_MALAS_PRACTICAS: _match_malas_practicas(texto),
+        pt.BIT_CUMPLE: _match_cumple(texto),
+    }
+    return sum(bit for bit, cumple in reglas.items() if cumple)
+
+
+def _observaciones(cantidad, semilla):
+    """Textos ya normalizados armados con trozos de palabras clave, relleno y espacios."""
+    azar = random.Random(semilla)
+    palabras = (
+        pt.tools_keywords + pt.vehicle_order_keywords + pt.agenda_keywords + pt.gpon_keywords
+        + pt.epp_ausencia_keywords + pt.malas_practicas_keywords + pt.cumple_keywords
+    )
+    relleno = ["", " ", ",", "ok", "tecnico", "sin", "no", "usa", "s", "o", "/", ".", "cumple"]
+    textos = ["", " ", "so", " so ", "s/o.", ".", "sin", "sin ", "no usa", "sin obs", "sin observacion"]
+    for _ in range(cantidad):
+        trozos = []
+        for _ in range(azar.randint(1, 4)):
+            palabra = azar.choice(palabras)
+            if azar.random() < 0.3:
+                inicio = azar.randrange(len(palabra))
+                palabra = palabra[inicio:azar.randint(inicio + 1, len(palabra))]
+            trozos.append(palabra if azar.random() < 0.7 else azar.choice(relleno))
+        textos.append(normalize_text(azar.choice([" ", ", ", ""]).join(trozos)))
+    return textos
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_clasificar_observaciones_coincide_con_las_reglas(semilla):
+    textos = _observaciones(2000, semilla)
+    categorias = pt.clasificar_observaciones(pd.Series(textos, dtype=object))
+
+    esperado = np.array([_mascara_esperada(texto) for texto in textos], dtype=np.uint32)
+    distintas = [(t, int(c), int(e)) for t, c, e in zip(textos, categorias, esperado) if c != e]
+    assert distintas == []
+
+
+def test_buscar_devuelve_los_bits_de_las_palabras_presentes():
+    bits = pt.clasificador.buscar("falta de herramienta y no usa casco en camioneta")
+
+    assert bits & pt.BIT_HERRAMIENTAS
+    assert bits & pt.BIT_CAMIONETA
+    assert bits & pt.BIT_EPP_AUSENCIA
+    assert bits & pt.BIT_MALAS_PRACTICAS
+    assert not bits & pt.BIT_CUMPLE
@@ -0,0 +1,55 @@
+import openpyxl
+
+from conversion import convertir_csv
+
+
+def test_xlsx_con_fechas_con_zona_horaria(tmp_path):
+    # pyarrow deduce timestamp[s, tz=UTC] para ISO con 'Z'; xlsxwriter rechaza fechas con zona horaria
+    ruta_csv = tmp_path / "fechas.csv"
+    ruta_csv.write_text("id,marca\n1,2024-01-01T10:00:00Z\n2,\n3,2024-03-05T23:59:59Z\n", encoding="utf-8")
+
+    resultado = convertir_csv(str(ruta_csv), str(tmp_path), "xlsx")
+
+    assert resultado["diferencias"] == []
+    assert resultado["verificacion"] == "escritura"
+    assert resultado["filas"] == 3
+    hoja = openpyxl.load_workbook(resultado["salida"], read_only=True)["Datos"]
+    filas = list(hoja.iter_rows(values_only=True))
+    assert filas[0] == ("id", "marca")
+    assert str(filas[1][1]) == "2024-01-01 10:00:00"
+    assert filas[2][1] is None
+
+
+def test_xlsx_avisa_enteros_que_excel_no_guarda_exactos(tmp_path):
+    ruta_csv = tmp_path / "enteros.csv"
+    ruta_csv.write_text("rut,grande\n1,9007199254740992\n2,9007199254740993\n", encoding="utf-8")
+
+    resultado = convertir_csv(str(ruta_csv), str(tmp_path), "xlsx")
+
+    assert resultado["diferencias"] == ["'grande' tiene enteros mayores que 9,007,199,254,740,992, que Excel no guarda exactos"]
+
+
+def test_parquet_y_arrow_se_verifican_releyendo_la_salida(tmp_path):
+    ruta_csv = tmp_path / "mixto.csv"
+    ruta_csv.write_text("id,marca,monto\n1,2024-01-01 10:00:00,1.5\n2,,\n3,2024-03-05 23:59:59,-2\n", encoding="utf-8")
+
+    for formato in ("parquet", "arrow"):
+        resultado = convertir_csv(str(ruta_csv), str(tmp_path), formato)
+        assert resultado["verificacion"] == "sha256"
+        assert resultado["diferencias"] == []
+
+
+def test_verificacion_parquet_detecta_valores_distintos(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from conversion import SumaControl, _verificar
+
+    leida = pa.record_batch({"id": [1, 2, 3]})
+    suma = SumaControl(leida.schema.names)
+    suma.agregar(leida)
+    ruta = tmp_path / "salida.parquet"
+    with pq.ParquetWriter(ruta, leida.schema) as escritor:
+        escritor.write_batch(pa.record_batch({"id": [1, 2, 4]}))
+
+    assert _verificar(suma, escritor, str(ruta), "parquet") == ["'id': los valores escritos no coinciden con los leídos"]
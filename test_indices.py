@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import IndiceTrigramas, construir_indices, filtrar_posiciones
+
+
+def _datos(filas, semilla):
+    azar = random.Random(semilla)
+    regiones = ["Norte", "Sur", "Centro", "Oriente"]
+    empresas = ["Alfa", "Beta", "Gamma", "Delta", "Épsilon"]
+    tecnicos = [f"Técnico {i}" for i in range(40)]
+    return pd.DataFrame({
+        "Region": [azar.choice(regiones) for _ in range(filas)],
+        "Empresa": pd.Categorical([azar.choice(empresas + [None]) for _ in range(filas)]),
+        "Técnico": [azar.choice(tecnicos + [None]) for _ in range(filas)],
+    })
+
+
+def _filtrar_con_igualdad(df, filtros):
+    resultado = df
+    for col, valor in filtros.items():
+        resultado = resultado[resultado[col] == valor]
+    return resultado
+
+
+@pytest.mark.parametrize("filtros", [
+    {"Region": "Sur"},
+    {"Empresa": "Épsilon"},
+    {"Técnico": "Técnico 7"},
+    {"Region": "Norte", "Empresa": "Beta"},
+    {"Region": "Centro", "Empresa": "Alfa", "Técnico": "Técnico 3"},
+    {"Region": "Inexistente"},
+    {"Empresa": "Gamma", "Técnico": "Inexistente"},
+])
+def test_filtrar_posiciones_coincide_con_la_igualdad(filtros):
+    df = _datos(3000, semilla=0)
+    indices = construir_indices(df, ["Region", "Empresa", "Técnico"])
+
+    posiciones = filtrar_posiciones(indices, filtros)
+
+    pd.testing.assert_frame_equal(df.iloc[posiciones], _filtrar_con_igualdad(df, filtros))
+
+
+def test_sin_filtros_devuelve_todas_las_filas():
+    df = _datos(50, semilla=1)
+    assert filtrar_posiciones(construir_indices(df, ["Region"]), {}) is None
+
+
+def test_los_nulos_no_se_indexan():
+    df = _datos(500, semilla=2)
+    indices = construir_indices(df, ["Empresa", "Técnico"])
+
+    for col in ("Empresa", "Técnico"):
+        indexadas = np.concatenate(list(indices[col].values()))
+        assert len(indexadas) == df[col].notna().sum()
+
+
+def _observaciones(filas, semilla):
+    azar = random.Random(semilla)
+    palabras = ["Falta", "herramienta", "CAMIONETA", "sin casco", "no usa", "GPON", "ok", "s/o", "Ñandú", "revisión"]
+    valores = [" ".join(azar.sample(palabras, azar.randint(1, 3))) for _ in range(200)] + [None, ""]
+    return pd.Series([azar.choice(valores) for _ in range(filas)], dtype=object)
+
+
+@pytest.mark.parametrize("consulta", [
+    "herramienta", "HERRAMIENTA", "sin c", "o u", "ok", "s/", "a", "ñan", "REVISIÓN", "nan", "na", "", "xyz", "camioneta sin casco",
+])
+def test_trigramas_coinciden_con_str_contains(consulta):
+    serie = _observaciones(3000, semilla=3)
+
+    posiciones = IndiceTrigramas(serie).buscar(consulta)
+
+    esperado = np.flatnonzero(serie.astype(str).str.contains(consulta, case=False, na=False, regex=False))
+    np.testing.assert_array_equal(posiciones, esperado)
+
+
+def test_trigramas_sobre_categoricas_con_nulos():
+    serie = _observaciones(1000, semilla=4).astype("category")
+
+    for consulta in ("no usa", "nan", "gp"):
+        esperado = np.flatnonzero(serie.astype(str).str.contains(consulta, case=False, na=False, regex=False))
+        np.testing.assert_array_equal(IndiceTrigramas(serie).buscar(consulta), esperado)
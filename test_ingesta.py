@@ -0,0 +1,26 @@
+import os
+import warnings
+
+import pandas as pd
+import pytest
+
+from ingesta import leer_excel_por_bloques, leer_hojas, preparar_datos
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+LIBROS = [
+    "DatosRobertoNormalizados.xlsx",
+    "Equipos y Herramientas 3Play _ Provision _ Mantencion_2023 (respuestas) (14).xlsx",
+]
+
+
+@pytest.mark.parametrize("libro", LIBROS)
+@pytest.mark.parametrize("tamano_bloque", [7, 5000])
+def test_lectura_por_bloques_igual_a_lectura_completa(libro, tamano_bloque):
+    ruta = os.path.join(CARPETA, libro)
+    completo, _ = preparar_datos(leer_hojas(ruta, max_procesos=1)[0])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        por_bloques, _ = leer_excel_por_bloques(ruta, tamano_bloque)
+
+    pd.testing.assert_frame_equal(por_bloques, completo)
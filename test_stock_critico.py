@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_critico import EPP_VITALES, calcular_stock_critico, contar_por_empresa
+
+
+def _ultimas(items, filas, semilla):
+    azar = random.Random(semilla)
+    valores = ["si", "Sí", "no", " NO ", "Falta", "0", 0, 1, "ok", "", None, np.nan]
+    datos = {
+        "Técnico": [f"Técnico {i}" for i in range(filas)],
+        "Empresa": [azar.choice(["Alfa", "Beta", " ", "Gamma"]) for _ in range(filas)],
+        "Fecha": pd.date_range("2024-01-01", periods=filas, freq="D"),
+    }
+    for item in items:
+        datos[item] = [azar.choice(valores) for _ in range(filas)]
+    datos = pd.DataFrame(datos)
+    datos["Empresa"] = datos["Empresa"].astype("category")
+    return datos
+
+
+def _stock_critico_por_fila(ultimas, items, columna_faltantes, vitales=None):
+    """Regla fila a fila anterior al motor vectorizado."""
+    def obtener_faltantes(row):
+        faltantes = []
+        for item in items:
+            valor = row.get(item)
+            if pd.isna(valor) or str(valor).strip().lower() in ["no", "falta", "0"]:
+                faltantes.append(item)
+        return faltantes
+
+    def agregar_icono(row):
+        cantidad = len(row[columna_faltantes]) if vitales is None else len([i for i in row[columna_faltantes] if i in vitales])
+        if cantidad >= 2: return f"🔴 {row['Técnico']}"
+        elif cantidad == 1: return f"🟡 {row['Técnico']}"
+        else: return row['Técnico']
+
+    stock = ultimas[["Técnico", "Empresa", "Fecha"] + items].copy()
+    stock[columna_faltantes] = stock.apply(obtener_faltantes, axis=1)
+    stock = stock[stock[columna_faltantes].map(len) > 0]
+    stock["Cantidad Faltantes"] = stock[columna_faltantes].map(len)
+    stock = stock.sort_values(by="Cantidad Faltantes", ascending=False)
+    stock["Técnico Con Icono"] = stock.apply(agregar_icono, axis=1)
+    stock[columna_faltantes] = stock[columna_faltantes].apply(lambda x: ", ".join(x))
+    return stock.drop(columns=items)
+
+
+@pytest.mark.parametrize("con_validos", [False, True])
+def test_herramientas_coincide_con_la_regla_por_fila(con_validos):
+    items = [f"Herramienta {i}" for i in range(9)]
+    ultimas = _ultimas(items, 400, semilla=0)
+    validos = ultimas[items].notna().to_numpy() if con_validos else None
+
+    resultado = calcular_stock_critico(ultimas, items, "Técnico", "Empresa", "Fecha", "Herramientas Faltantes", validos=validos)
+
+    esperado = _stock_critico_por_fila(ultimas, items, "Herramientas Faltantes")
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize("con_validos", [False, True])
+def test_epp_usa_los_vitales_para_el_icono(con_validos):
+    items = ["Conos de seguridad", "Casco de Altura", "Barbiquejo", "Arnes Dielectrico", "Estrobo Dielectrico", "Bloqueador Solar"]
+    ultimas = _ultimas(items, 400, semilla=1)
+    validos = ultimas[items].notna().to_numpy() if con_validos else None
+
+    resultado = calcular_stock_critico(
+        ultimas, items, "Técnico", "Empresa", "Fecha", "EPP Faltantes", items_severidad=EPP_VITALES, validos=validos,
+    )
+
+    esperado = _stock_critico_por_fila(ultimas, items, "EPP Faltantes", vitales=EPP_VITALES)
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+    assert not resultado["Técnico Con Icono"].str[0].isin(["🔴", "🟡"]).all() # Hay filas sin vitales faltantes
+
+
+def test_contar_por_empresa_omite_empresas_vacias():
+    items = [f"Herramienta {i}" for i in range(4)]
+    stock = calcular_stock_critico(_ultimas(items, 200, semilla=2), items, "Técnico", "Empresa", "Fecha", "Faltantes")
+
+    conteo = contar_por_empresa(stock, "Empresa", "Técnicos")
+
+    esperado = stock[stock["Empresa"].astype(str).str.strip() != ""]["Empresa"].value_counts()
+    assert dict(zip(conteo["Empresa"], conteo["Técnicos"])) == {k: v for k, v in esperado.items() if v}
+    assert conteo["Técnicos"].is_monotonic_decreasing
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from esquemas import HOJA_DATOS
+from unificacion import columnas_superconjunto, unificar_parquet
+
+
+def _escribir(carpeta, archivo, df):
+    df.to_excel(os.path.join(carpeta, archivo), sheet_name=HOJA_DATOS, index=False)
+
+
+def _unificar(carpeta, salida):
+    archivos = sorted(nombre for nombre in os.listdir(carpeta) if nombre.endswith(".xlsx"))
+    columnas = columnas_superconjunto(
+        [pd.read_excel(os.path.join(carpeta, archivo), sheet_name=HOJA_DATOS, nrows=0).columns for archivo in archivos]
+    )
+    filas, _, resumen = unificar_parquet(str(carpeta), archivos, columnas, str(salida))
+    return archivos, columnas, filas, resumen
+
+
+def _esperado(carpeta, archivos, columnas):
+    """Concatenación directa de las hojas, como la haría una unificación desde cero."""
+    partes = []
+    for archivo in archivos:
+        df = pd.read_excel(os.path.join(carpeta, archivo), sheet_name=HOJA_DATOS)
+        df["Fuente"] = archivo
+        partes.append(df.reindex(columns=columnas))
+    return _nulos_como_none(pd.concat(partes, ignore_index=True))
+
+
+def _nulos_como_none(df):
+    return df.astype(object).where(df.notna(), None)
+
+
+def _dataset(salida):
+    df = pq.read_table(str(salida)).to_pandas()
+    return _nulos_como_none(df.sort_values("Fuente", kind="stable").reset_index(drop=True))
+
+
+@pytest.fixture
+def origen(tmp_path):
+    carpeta = tmp_path / "origen"
+    carpeta.mkdir()
+    _escribir(carpeta, "a.xlsx", pd.DataFrame({"id": [1, 2, 3], "zona": ["norte", "sur", None]}))
+    _escribir(carpeta, "b.xlsx", pd.DataFrame({"id": [4, 5], "estado": ["ok", "falta"]}))
+    return carpeta
+
+
+def test_unificacion_incremental_agrega_modifica_y_elimina(origen, tmp_path):
+    salida = tmp_path / "salida"
+
+    archivos, columnas, filas, resumen = _unificar(origen, salida)
+    assert resumen == {"nuevos": 2, "modificados": 0, "sin cambios": 0, "eliminados": 0}
+    assert filas == 5
+    pd.testing.assert_frame_equal(_dataset(salida), _esperado(origen, archivos, columnas))
+
+    _, _, _, resumen = _unificar(origen, salida)
+    assert resumen == {"nuevos": 0, "modificados": 0, "sin cambios": 2, "eliminados": 0}
+
+    _escribir(origen, "a.xlsx", pd.DataFrame({"id": [1, 2, 3, 6], "zona": ["norte", "sur", "centro", "este"]}))
+    _escribir(origen, "c.xlsx", pd.DataFrame({"id": [7], "zona": ["oeste"], "nota": [2.5]}))
+    os.remove(origen / "b.xlsx")
+
+    archivos, columnas, filas, resumen = _unificar(origen, salida)
+    assert resumen == {"nuevos": 1, "modificados": 1, "sin cambios": 0, "eliminados": 1}
+    assert filas == 5
+    pd.testing.assert_frame_equal(_dataset(salida), _esperado(origen, archivos, columnas))
+    assert len([nombre for nombre in os.listdir(salida) if nombre.endswith(".parquet")]) == 2
+
+
+def test_rechaza_una_carpeta_ajena_sin_manifiesto(origen, tmp_path):
+    salida = tmp_path / "datos"
+    salida.mkdir()
+    (salida / "ventas.csv").write_text("x\n1\n")
+
+    with pytest.raises(ValueError):
+        _unificar(origen, salida)
+    assert os.listdir(salida) == ["ventas.csv"]
+
+
+def test_conserva_los_archivos_ajenos_de_la_salida(origen, tmp_path):
+    salida = tmp_path / "salida"
+    _unificar(origen, salida)
+    (salida / "notas.txt").write_text("no tocar")
+    (salida / "fuente-0000000000000000.parquet").write_bytes(b"") # Partición propia sin registrar
+
+    _unificar(origen, salida)
+
+    assert (salida / "notas.txt").read_text() == "no tocar"
+    assert not (salida / "fuente-0000000000000000.parquet").exists()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Columnas que definen la vista
+COL_TECNICO = 'Nombre de Técnico/Copiar el del Wfm'
+COL_FECHA = 'Fecha'
+COL_ESTADO = 'Estado de Auditoria'
+
+
+def construir_ultima_auditoria(data, desplazamiento=0):
+    """
+    Vista materializada "última auditoría por técnico": índice = técnico, columnas Fecha y 'posicion'.
+
+    'posicion' es la posición de fila (en data, más el desplazamiento) de la última auditoría
+    finalizada con fecha válida del técnico. En empates de fecha queda la primera fila, como idxmax.
+    Devuelve None si faltan columnas.
+    """
+    if not all(col in data.columns for col in (COL_TECNICO, COL_FECHA, COL_ESTADO)):
+        return None
+    fechas = data[COL_FECHA]
+    finalizadas = ((data[COL_ESTADO] == 'finalizada') & fechas.notna()).to_numpy()
+    candidatas = pd.DataFrame({
+        COL_TECNICO: data[COL_TECNICO].to_numpy(dtype=object)[finalizadas],
+        COL_FECHA: fechas.to_numpy()[finalizadas],
+        'posicion': np.flatnonzero(finalizadas) + desplazamiento,
+    })
+    if candidatas.empty:
+        return candidatas.set_index(COL_TECNICO)
+    idx_ultima = candidatas.groupby(COL_TECNICO, sort=False)[COL_FECHA].idxmax()
+    return candidatas.loc[idx_ultima].set_index(COL_TECNICO)
+
+
+def actualizar_ultima_auditoria(vista, nuevas, desplazamiento):
+    """
+    Incorpora filas nuevas (que en el dataset completo empiezan en la posición desplazamiento).
+
+    Solo se revisan los técnicos presentes en las filas nuevas: su fila cambia si la nueva
+    auditoría es estrictamente más reciente que la guardada.
+    """
+    candidatas = construir_ultima_auditoria(nuevas, desplazamiento)
+    if candidatas is None or candidatas.empty:
+        return vista
+    actuales = vista[COL_FECHA].reindex(candidatas.index)
+    reemplazar = (actuales.isna() | (candidatas[COL_FECHA] > actuales)).to_numpy()
+    cambios = candidatas[reemplazar]
+    return pd.concat([vista.drop(index=cambios.index, errors='ignore'), cambios])
+
+
+def renovar_ultima_auditoria(data, data_anterior=None, vista_anterior=None):
+    """
+    Vista para un dataset recién cargado.
+
+    Si el dataset anterior es un prefijo del nuevo en las columnas de la vista (por ejemplo, la misma
+    planilla de respuestas con auditorías agregadas al final), solo se procesan las filas nuevas;
+    en otro caso se construye desde cero.
+    """
+    if vista_anterior is not None and data_anterior is not None and len(data) >= len(data_anterior):
+        n = len(data_anterior)
+        columnas = [COL_TECNICO, COL_FECHA, COL_ESTADO]
+        if all(col in data.columns and col in data_anterior.columns for col in columnas) and all(
+            data[col].iloc[:n].astype(object).reset_index(drop=True).equals(
+                data_anterior[col].astype(object).reset_index(drop=True))
+            for col in columnas
+        ):
+            return actualizar_ultima_auditoria(vista_anterior, data.iloc[n:], n)
+    return construir_ultima_auditoria(data)
+
+
+def posiciones_ultima_auditoria(vista):
+    """Posiciones de fila de la última auditoría de cada técnico, ordenadas por técnico (como un groupby)."""
+    vista = vista.sort_index(key=lambda tecnicos: tecnicos.map(str))
+    return vista['posicion'].to_numpy()
+
+
+def filas_ultima_auditoria(data, vista):
+    """Filas de data con la última auditoría de cada técnico, en el orden de posiciones_ultima_auditoria."""
+    return data.iloc[posiciones_ultima_auditoria(vista)].reset_index(drop=True)
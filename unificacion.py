@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import suppress
+
+import pandas as pd
+
+from esquemas import HOJA_DATOS
+
+FORMATOS = ("xlsx", "parquet")
+MAX_FILAS_XLSX = 1048576 # Límite de filas de una hoja de Excel (incluye el encabezado)
+
+# Manifiesto del dataset Parquet: qué archivo de origen generó cada partición
+NOMBRE_MANIFIESTO = "_manifiesto.json"
+VERSION_MANIFIESTO = 1
+PREFIJOS_PARTICION = ("fuente-", "parte-") # 'parte-' es el formato sin manifiesto anterior
+EDAD_MAX_TEMPORAL_S = 10 * 60 # Un .tmp más antiguo quedó de una escritura interrumpida
+
+
+def columnas_superconjunto(columnas_por_archivo):
+    """Unión de las columnas de todos los archivos, en orden de primera aparición, con 'Fuente' al final."""
+    columnas = {}
+    for lista in columnas_por_archivo:
+        columnas.update(dict.fromkeys(lista))
+    columnas.pop("Fuente", None)
+    return list(columnas) + ["Fuente"]
+
+
+def _leer_alineado(carpeta, archivo, columnas, avisos):
+    """Hoja "Datos" de un archivo con la columna Fuente, alineada a las columnas del superconjunto."""
+    df = pd.read_excel(os.path.join(carpeta, archivo), sheet_name=HOJA_DATOS)
+    df.columns = df.columns.map(str)
+    # Columnas con datos pero sin encabezado no aparecen en el superconjunto (que sale de los encabezados)
+    sobrantes = [columna for columna in df.columns if columna not in set(columnas)]
+    if sobrantes:
+        avisos.append(f"{archivo}: se omitieron columnas sin encabezado {sobrantes}")
+    df["Fuente"] = archivo
+    return df.reindex(columns=columnas)
+
+
+def _valor_celda(valor):
+    """Valor de pandas/numpy listo para xlsxwriter (los nulos quedan como celdas vacías)."""
+    try:
+        if valor is None or bool(valor != valor): # NaN, NaT
+            return None
+    except TypeError: # pd.NA
+        return None
+    if hasattr(valor, "item") and not isinstance(valor, pd.Timestamp): # Escalares de numpy
+        return valor.item()
+    return valor
+
+
+def unificar_xlsx(carpeta, archivos, columnas, salida, al_avanzar=None):
+    """
+    Escribe los archivos uno tras otro en la hoja "Datos" de salida, con xlsxwriter en modo constant_memory.
+
+    En memoria hay a lo sumo un archivo leído: las filas se escriben y se descartan. Devuelve
+    (filas escritas, avisos).
+    """
+    import xlsxwriter
+
+    avisos = []
+    # Nombre temporal único: las sesiones de Streamlit son hilos del mismo proceso
+    fd, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(salida) or ".", prefix=os.path.basename(salida) + ".", suffix=".tmp")
+    os.close(fd)
+    libro = xlsxwriter.Workbook(ruta_temporal, {
+        "constant_memory": True, # Cada fila se vuelca a disco al pasar a la siguiente
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "strings_to_urls": False,
+        "nan_inf_to_errors": True,
+    })
+    try:
+        hoja = libro.add_worksheet(HOJA_DATOS)
+        hoja.write_row(0, 0, columnas)
+        fila = 1
+        for hechos, archivo in enumerate(archivos, start=1):
+            df = _leer_alineado(carpeta, archivo, columnas, avisos)
+            if fila + len(df) > MAX_FILAS_XLSX:
+                raise ValueError(f"El resultado supera el máximo de {MAX_FILAS_XLSX:,} filas de Excel al agregar {archivo}: usa el formato Parquet.")
+            valores = [[_valor_celda(valor) for valor in df[columna].tolist()] for columna in df.columns]
+            del df
+            for valores_fila in zip(*valores):
+                hoja.write_row(fila, 0, valores_fila)
+                fila += 1
+            if al_avanzar is not None:
+                al_avanzar(hechos, len(archivos), archivo)
+        libro.close()
+        os.replace(ruta_temporal, salida) # Escritura atómica: nunca queda un archivo a medias
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(ruta_temporal)
+    return fila - 1, avisos
+
+
+def _tabla_arrow(df):
+    """Tabla Arrow de un DataFrame: columnas object con tipos mezclados pasan a texto."""
+    import pyarrow as pa
+
+    for columna in df.columns[df.dtypes == object]:
+        tipos = {type(valor) for valor in df[columna].dropna()}
+        if len(tipos) > 1:
+            df[columna] = df[columna].map(lambda valor: valor if _valor_celda(valor) is None else str(valor))
+    tabla = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    # Columnas sin ningún dato (por ejemplo, las que este archivo no tiene) quedan con tipo null,
+    # para que no le impongan su tipo a la misma columna de otras partes
+    for i, columna in enumerate(tabla.columns):
+        if columna.null_count == len(columna) and not pa.types.is_null(columna.type):
+            tabla = tabla.set_column(i, tabla.field(i).name, pa.nulls(len(columna)))
+    return tabla
+
+
+def _tipo_unificado(tipos):
+    """Tipo común de una columna entre partes: el mismo tipo, float64 entre números distintos, o texto."""
+    import pyarrow as pa
+
+    tipos = [tipo for tipo in tipos if not pa.types.is_null(tipo)]
+    if not tipos:
+        return pa.null()
+    if all(tipo == tipos[0] for tipo in tipos):
+        return tipos[0]
+    if all(pa.types.is_integer(tipo) or pa.types.is_floating(tipo) for tipo in tipos):
+        return pa.float64()
+    if all(pa.types.is_timestamp(tipo) for tipo in tipos):
+        return pa.timestamp("ns")
+    return pa.string()
+
+
+def alinear_partes(rutas, columnas):
+    """
+    Lleva todas las partes Parquet a las mismas columnas y tipos, para leerlas como un solo dataset.
+
+    Las columnas son las del superconjunto (a una parte le faltan las agregadas después: quedan nulas;
+    las que ya no están se quitan). Cada columna toma el tipo común de las partes que la tienen
+    (_tipo_unificado). Solo se reescriben las partes que no cumplen el esquema, una a la vez.
+    Devuelve las partes reescritas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquemas = {ruta: pq.read_schema(ruta).remove_metadata() for ruta in rutas}
+    esquema = pa.schema([
+        (columna, _tipo_unificado([
+            esquema_parte.field(columna).type
+            for esquema_parte in esquemas.values() if columna in esquema_parte.names
+        ]))
+        for columna in columnas
+    ])
+    reescritas = []
+    for ruta, esquema_parte in esquemas.items():
+        if esquema_parte.equals(esquema):
+            continue
+        tabla = pq.read_table(ruta)
+        tabla = pa.table({
+            columna: tabla[columna] if columna in tabla.column_names else pa.nulls(tabla.num_rows)
+            for columna in columnas
+        }).cast(esquema)
+        _escribir_parte(tabla, ruta)
+        reescritas.append(ruta)
+    return reescritas
+
+
+def _escribir_parte(tabla, ruta):
+    import pyarrow.parquet as pq
+
+    fd, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=os.path.basename(ruta) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        pq.write_table(tabla, ruta_temporal)
+        os.replace(ruta_temporal, ruta) # Una parte nunca queda escrita a medias
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(ruta_temporal)
+
+
+def huella_archivo(ruta):
+    """Hash SHA-256 (hex) del contenido de un archivo, leído por bloques."""
+    huella = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        while bloque := f.read(1024 * 1024):
+            huella.update(bloque)
+    return huella.hexdigest()
+
+
+def _nombre_particion(archivo):
+    """Nombre estable de la partición de un archivo de origen."""
+    return f"fuente-{hashlib.sha256(archivo.encode()).hexdigest()[:16]}.parquet"
+
+
+def _es_propio(nombre):
+    """True si el archivo lo genera la unificación: manifiesto, particiones 'fuente-*', las 'parte-*' anteriores y sus temporales."""
+    return nombre.startswith((NOMBRE_MANIFIESTO,) + PREFIJOS_PARTICION)
+
+
+def _temporal_abandonado(ruta):
+    """True para un .tmp de más de EDAD_MAX_TEMPORAL_S: quedó de una escritura interrumpida."""
+    try:
+        return ruta.endswith(".tmp") and time.time() - os.stat(ruta).st_mtime > EDAD_MAX_TEMPORAL_S
+    except FileNotFoundError:
+        return False
+
+
+class ManifiestoUnificado:
+    """
+    Manifiesto del dataset Parquet unificado: por archivo de origen, su ruta, huella del contenido,
+    mtime, tamaño, filas y partición.
+
+    Se guarda como JSON dentro de la carpeta de salida, con escritura atómica.
+    """
+
+    def __init__(self, salida):
+        self.ruta = os.path.join(salida, NOMBRE_MANIFIESTO)
+        self.fuentes = {}
+        with suppress(FileNotFoundError, ValueError, OSError):
+            with open(self.ruta, encoding="utf-8") as f:
+                guardado = json.load(f)
+            if guardado.get("version") == VERSION_MANIFIESTO:
+                self.fuentes = guardado.get("fuentes", {})
+
+    def guardar(self):
+        fd, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(self.ruta), prefix=NOMBRE_MANIFIESTO + ".", suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION_MANIFIESTO, "fuentes": self.fuentes}, f, ensure_ascii=False, indent=1)
+            os.replace(ruta_temporal, self.ruta)
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(ruta_temporal)
+
+
+def unificar_parquet(carpeta, archivos, columnas, salida, al_avanzar=None):
+    """
+    Mantiene en la carpeta salida un dataset Parquet con una partición por archivo de origen.
+
+    Es incremental según el manifiesto: los archivos nuevos o con otro contenido se leen y se escriben,
+    los que no cambiaron se saltan (si cambió su mtime pero no su huella, solo se actualiza el
+    manifiesto) y las particiones de archivos que ya no están se eliminan. Al final todas las
+    particiones quedan con las mismas columnas y tipos. Devuelve (filas totales, avisos, resumen).
+
+    Solo se eliminan archivos que genera la unificación (_es_propio). Una carpeta sin manifiesto que ya
+    tiene otros archivos se rechaza: no es una salida anterior y podría ser una carpeta de datos.
+    """
+    if os.path.isdir(salida) and not os.path.exists(os.path.join(salida, NOMBRE_MANIFIESTO)):
+        ajenos = sorted(nombre for nombre in os.listdir(salida) if not _es_propio(nombre))
+        if ajenos:
+            raise ValueError(
+                f"La carpeta de salida {salida} ya tiene archivos que no son de una unificación "
+                f"(por ejemplo, {ajenos[0]}): elige una carpeta nueva o vacía."
+            )
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = ManifiestoUnificado(salida)
+    avisos = []
+    resumen = {"nuevos": 0, "modificados": 0, "sin cambios": 0, "eliminados": 0}
+
+    for archivo in [archivo for archivo in manifiesto.fuentes if archivo not in set(archivos)]:
+        with suppress(FileNotFoundError):
+            os.remove(os.path.join(salida, manifiesto.fuentes.pop(archivo)["particion"]))
+        resumen["eliminados"] += 1
+
+    for hechos, archivo in enumerate(archivos, start=1):
+        ruta = os.path.join(carpeta, archivo)
+        info = os.stat(ruta)
+        entrada = manifiesto.fuentes.get(archivo)
+        particion = os.path.join(salida, _nombre_particion(archivo))
+        vigente = entrada is not None and os.path.exists(particion)
+        if vigente and (entrada["mtime_ns"], entrada["tamano"]) == (info.st_mtime_ns, info.st_size):
+            resumen["sin cambios"] += 1
+        else:
+            huella = huella_archivo(ruta)
+            if vigente and entrada["huella"] == huella:
+                resumen["sin cambios"] += 1 # Mismo contenido (por ejemplo, copiado de nuevo)
+            else:
+                df = _leer_alineado(carpeta, archivo, columnas, avisos)
+                _escribir_parte(_tabla_arrow(df), particion)
+                resumen["modificados" if entrada is not None else "nuevos"] += 1
+                entrada = {"filas": len(df)}
+                del df
+            manifiesto.fuentes[archivo] = {
+                **entrada,
+                "ruta": os.path.abspath(ruta), "huella": huella,
+                "mtime_ns": info.st_mtime_ns, "tamano": info.st_size,
+                "particion": os.path.basename(particion),
+            }
+            manifiesto.guardar() # Lo ya escrito queda registrado aunque la unificación se interrumpa
+        if al_avanzar is not None:
+            al_avanzar(hechos, len(archivos), archivo)
+
+    # Particiones que el manifiesto no conoce (de una salida anterior o interrumpida) no son parte del dataset;
+    # los .tmp recientes pueden ser de otra sesión escribiendo en la misma carpeta y se dejan
+    registradas = {entrada["particion"] for entrada in manifiesto.fuentes.values()}
+    for nombre in os.listdir(salida):
+        ruta = os.path.join(salida, nombre)
+        if not _es_propio(nombre):
+            continue
+        if (nombre.endswith(".parquet") and nombre not in registradas) or _temporal_abandonado(ruta):
+            with suppress(FileNotFoundError):
+                os.remove(ruta)
+
+    alinear_partes([os.path.join(salida, _nombre_particion(archivo)) for archivo in archivos], columnas)
+    manifiesto.guardar()
+    return sum(entrada["filas"] for entrada in manifiesto.fuentes.values()), avisos, resumen
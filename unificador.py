@@ -1,6 +1,8 @@
+import time
+_inicio_script = time.perf_counter()
 import os
-import pandas as pd
 import streamlit as st
+from arranque import reportar_inicio
 
 st.title("Unificador de Archivos XLSX (Nuevo Archivo)")
 
@@ -8,33 +10,53 @@ st.title("Unificador de Archivos XLSX (Nuevo Archivo)")
 folder_path = st.text_input("Ingrese la ruta de la carpeta con los archivos XLSX:")
 
 if folder_path:
+    from esquemas import CatalogoEsquemas
+    from unificacion import FORMATOS, columnas_superconjunto, unificar_xlsx, unificar_parquet
     try:
         st.write("🔄 Buscando archivos XLSX en la carpeta...")
-        xlsx_files = [f for f in os.listdir(folder_path) if f.endswith(".xlsx")]
+        xlsx_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".xlsx") and not f.startswith("~$"))
+
+        # Destino configurable: por defecto, junto a la carpeta (fuera de ella, para no unificarlo la próxima vez)
+        formato = st.radio("Formato de salida", FORMATOS, horizontal=True,
+                           format_func=lambda f: "XLSX (un archivo)" if f == "xlsx" else "Parquet (carpeta con una partición por archivo, incremental)")
+        carpeta_absoluta = os.path.abspath(folder_path).rstrip(os.sep)
+        salida_por_defecto = f"{carpeta_absoluta}_unificado.xlsx" if formato == "xlsx" else f"{carpeta_absoluta}_unificado_parquet"
+        output_file = st.text_input("Ruta de salida:", os.environ.get("AUDITORIAS_UNIFICADO_SALIDA", salida_por_defecto))
+        xlsx_files = [f for f in xlsx_files if os.path.abspath(os.path.join(folder_path, f)) != os.path.abspath(output_file)]
 
         if not xlsx_files:
             st.warning("⚠️ No se encontraron archivos XLSX en la carpeta.")
-        else:
+        elif st.button("🔗 Unificar archivos"):
             st.write(f"📂 Se encontraron {len(xlsx_files)} archivos. Iniciando unificación...")
 
-            all_data = []  # Lista para almacenar los datos de cada archivo
-
-            for file in xlsx_files:
-                file_path = os.path.join(folder_path, file)
-                df = pd.read_excel(file_path, sheet_name="Datos")
-
-                # Agregar una columna con el nombre del archivo para referencia
-                df["Fuente"] = file
-                all_data.append(df)
-
-            # Concatenar todos los DataFrames en uno solo
-            merged_df = pd.concat(all_data, ignore_index=True)
-
-            # Generar un nuevo archivo Excel
-            output_file = "C:/Users/Roger/Downloads/unificado.xlsx"
-            merged_df.to_excel(output_file, index=False)
-
-            st.success(f"✅ Se ha creado un nuevo archivo: **{output_file}**")
+            # Superconjunto de columnas desde los encabezados (catálogo de la carpeta, sin leer los datos)
+            entradas = CatalogoEsquemas(folder_path).escanear(xlsx_files)
+            errores = {file: entrada["error"] for file, entrada in entradas.items() if "error" in entrada}
+            for file, error in errores.items():
+                st.warning(f"⚠️ Se omite **{file}**: {error}")
+            validos = [file for file in xlsx_files if file not in errores]
+            columnas = columnas_superconjunto(entradas[file]["columnas"] for file in validos)
+
+            # Los archivos se leen de a uno y se agregan a la salida: en memoria nunca hay más de uno
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+
+            def al_avanzar(hechos, total, file):
+                progress_bar.progress(hechos / total)
+                status_text.write(f"📄 Agregado archivo {hechos} de {total}: **{file}**")
+
+            if formato == "xlsx":
+                filas, avisos = unificar_xlsx(folder_path, validos, columnas, output_file, al_avanzar)
+            else:
+                # Incremental: solo se leen los archivos nuevos o modificados desde la última unificación
+                filas, avisos, resumen = unificar_parquet(folder_path, validos, columnas, output_file, al_avanzar)
+                st.info("📋 " + ", ".join(f"{cantidad} {estado}" for estado, cantidad in resumen.items()))
+            for aviso in avisos:
+                st.warning(f"⚠️ {aviso}")
+
+            st.success(f"✅ Se ha creado un nuevo archivo: **{output_file}** ({filas:,} filas, {len(columnas)} columnas)")
 
     except Exception as e:
         st.error(f"❌ Error al procesar archivos: {e}")
+
+reportar_inicio(st, _inicio_script, "unificador.py")